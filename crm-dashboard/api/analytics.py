@@ -1,20 +1,37 @@
 """
 Blueprint API pour les analytics (KPIs, secteurs, échéances, performance).
 Expose les endpoints GET /api/kpis, GET /api/analytics/sectors,
-GET /api/analytics/deadlines, GET /api/analytics/performance, GET /api/filters/options.
+GET /api/analytics/deadlines, GET /api/analytics/performance, GET /api/dashboard,
+GET /api/filters/options, GET /api/analytics/cache.
 """
 
-from flask import Blueprint, jsonify, request
-from database.crud import get_all_deals, get_filtered_deals, get_filter_options
+import os
+
+from flask import Blueprint, g, jsonify, request
+from database.crud import (
+    get_all_deals, get_filtered_deals, get_filter_options, get_deal_kpis, get_data_version
+)
+from database.snapshot import deal_snapshot
 from business_logic.calculators import (
     calculate_total_pipeline, calculate_performance_by_assignee,
     calculate_sales_velocity, calculate_velocity_by_group, get_cold_deals
 )
+from utils.cache import LRUCache
+from utils.constants import WON_STATUSES
 from utils.formatters import format_currency
-from datetime import datetime, timedelta
+from .http_cache import register_conditional_get
+from datetime import date, datetime, timedelta
 import pandas as pd
 
 analytics_bp = Blueprint('analytics', __name__)
+register_conditional_get(analytics_bp, exclude=('analytics.get_cache_stats',))
+
+# Cache des payloads analytics, indexé par (panel, filtres, version des données).
+# Toute écriture sur les deals incrémente la version : les anciennes entrées ne sont plus lues.
+analytics_cache = LRUCache(
+    max_entries=int(os.environ.get('ANALYTICS_CACHE_SIZE', 256)),
+    ttl=float(os.environ.get('ANALYTICS_CACHE_TTL', 300))
+)
 
 
 def _extract_filter_params():
@@ -35,393 +52,532 @@ def _extract_filter_params():
     return params
 
 
+# Panels dont le contenu dépend de la date du jour (deals froids, échéances) :
+# leur clé de cache inclut la date, comme l'ETag de http_cache.
+DATE_DEPENDENT_PANELS = ('kpis', 'deadlines', 'cold_deals')
+
+
+def _data_version():
+    """Version des données lue une seule fois par requête (partagée avec l'ETag de http_cache)."""
+    if 'data_version' not in g:
+        g.data_version = get_data_version()
+    return g.data_version
+
+
 def _get_deals():
-    """Récupère les deals en appliquant les filtres si présents."""
+    """Récupère les deals en appliquant les filtres si présents (snapshot mémoire si activé)."""
     params = _extract_filter_params()
+    if deal_snapshot.enabled:
+        return deal_snapshot.select(params, _data_version())
     if params:
         return get_filtered_deals(params)
     return get_all_deals()
 
 
+def _cache_key(panel):
+    """Clé de cache : panel + filtres normalisés + version des données (+ date du jour si le panel en dépend)."""
+    params = _extract_filter_params()
+    normalized = tuple(sorted(
+        (key, tuple(sorted(value)) if isinstance(value, list) else value)
+        for key, value in params.items()
+    ))
+    if panel in DATE_DEPENDENT_PANELS:
+        return (panel, normalized, _data_version(), date.today().isoformat())
+    return (panel, normalized, _data_version())
+
+
+def _cached_panel(panel, build):
+    """Retourne le payload d'un panel depuis le cache, ou le calcule sur les deals filtrés."""
+    return analytics_cache.get_or_compute(_cache_key(panel), lambda: build(_get_deals()))
+
+
+def _count_won_deals(df):
+    """Compte les deals au statut gagné."""
+    return len(df[df['statut'].str.lower().str.strip().isin(WON_STATUSES)])
+
+
+def _build_kpis_data(kpis):
+    """Construit le payload KPIs (montants formatés) depuis les agrégats bruts."""
+    if kpis['nombre_deals'] == 0:
+        return {
+            "pipeline_pondere": 0,
+            "pipeline_pondere_formatted": "0 €",
+            "panier_moyen": 0,
+            "panier_moyen_formatted": "0 €",
+            "nombre_deals": 0,
+            "deals_gagnes": 0,
+            "taux_conversion": 0,
+            "vitesse_vente_moyenne": 0,
+            "vitesse_vente_formatted": "N/A",
+            "nb_cold_deals": 0
+        }
+
+    pipeline = kpis['pipeline_pondere']
+    panier_moyen = kpis['panier_moyen']
+    nombre_deals = kpis['nombre_deals']
+    deals_gagnes = kpis['deals_gagnes']
+    taux_conversion = round((deals_gagnes / nombre_deals) * 100, 1) if nombre_deals > 0 else 0
+
+    # Phase 3 V2 : vitesse de vente et deals froids
+    vitesse_vente = kpis['vitesse_vente_moyenne']
+    nb_cold_deals = kpis['nb_cold_deals']
+
+    # Distinguer "0 jours" (deals gagnés existent) de "N/A" (aucun deal gagné)
+    if deals_gagnes > 0:
+        vitesse_formatted = f"{vitesse_vente} jours" if vitesse_vente > 0 else "< 1 jour"
+    else:
+        vitesse_formatted = "N/A"
+
+    return {
+        "pipeline_pondere": pipeline,
+        "pipeline_pondere_formatted": format_currency(pipeline),
+        "panier_moyen": panier_moyen,
+        "panier_moyen_formatted": format_currency(panier_moyen),
+        "nombre_deals": nombre_deals,
+        "deals_gagnes": deals_gagnes,
+        "taux_conversion": taux_conversion,
+        "vitesse_vente_moyenne": vitesse_vente,
+        "vitesse_vente_formatted": vitesse_formatted,
+        "nb_cold_deals": nb_cold_deals
+    }
+
+
+def _compute_kpis(df):
+    """Calcule les agrégats KPIs en pandas (même format que get_deal_kpis)."""
+    if df.empty:
+        return {"nombre_deals": 0}
+    return {
+        "nombre_deals": len(df),
+        "pipeline_pondere": calculate_total_pipeline(df),
+        "panier_moyen": round(df['montant_brut'].mean(), 2),
+        "deals_gagnes": _count_won_deals(df),
+        "vitesse_vente_moyenne": calculate_sales_velocity(df),
+        "nb_cold_deals": len(get_cold_deals(df))
+    }
+
+
+def _build_kpis_panel(df=None):
+    """
+    Payload KPIs commun à /api/kpis et au panel kpis de /api/dashboard (même clé de cache) :
+    agrégats SQL, ou pandas sur les deals du snapshot mémoire s'il est activé.
+    df : deals filtrés déjà lus (snapshot uniquement), relus sinon.
+    """
+    if deal_snapshot.enabled:
+        return _build_kpis_data(_compute_kpis(df if df is not None else _get_deals()))
+    return _build_kpis_data(get_deal_kpis(_extract_filter_params()))
+
+
 @analytics_bp.route('/kpis', methods=['GET'])
 def get_kpis():
-    """GET /api/kpis - Retourne les KPIs calculés (avec filtres optionnels)"""
+    """GET /api/kpis - Retourne les KPIs calculés en SQL, ou sur le snapshot mémoire (filtres optionnels)"""
     try:
-        df = _get_deals()
-
-        if df.empty:
-            return jsonify({"success": True, "data": {
-                "pipeline_pondere": 0,
-                "pipeline_pondere_formatted": "0 €",
-                "panier_moyen": 0,
-                "panier_moyen_formatted": "0 €",
-                "nombre_deals": 0,
-                "deals_gagnes": 0,
-                "taux_conversion": 0,
-                "vitesse_vente_moyenne": 0,
-                "vitesse_vente_formatted": "N/A",
-                "nb_cold_deals": 0
-            }, "error": None})
-
-        pipeline = calculate_total_pipeline(df)
-        panier_moyen = round(df['montant_brut'].mean(), 2)
-        nombre_deals = len(df)
-        deals_gagnes = len(df[df['statut'].str.lower().str.strip().isin(['gagné', 'gagné - en cours'])])
-        taux_conversion = round((deals_gagnes / nombre_deals) * 100, 1) if nombre_deals > 0 else 0
-
-        # Phase 3 V2 : vitesse de vente et deals froids
-        vitesse_vente = calculate_sales_velocity(df)
-        cold_df = get_cold_deals(df)
-        nb_cold_deals = len(cold_df)
-
-        # Distinguer "0 jours" (deals gagnés existent) de "N/A" (aucun deal gagné)
-        if deals_gagnes > 0:
-            vitesse_formatted = f"{vitesse_vente} jours" if vitesse_vente > 0 else "< 1 jour"
-        else:
-            vitesse_formatted = "N/A"
-
-        return jsonify({"success": True, "data": {
-            "pipeline_pondere": pipeline,
-            "pipeline_pondere_formatted": format_currency(pipeline),
-            "panier_moyen": panier_moyen,
-            "panier_moyen_formatted": format_currency(panier_moyen),
-            "nombre_deals": nombre_deals,
-            "deals_gagnes": deals_gagnes,
-            "taux_conversion": taux_conversion,
-            "vitesse_vente_moyenne": vitesse_vente,
-            "vitesse_vente_formatted": vitesse_formatted,
-            "nb_cold_deals": nb_cold_deals
-        }, "error": None})
+        data = analytics_cache.get_or_compute(_cache_key('kpis'), _build_kpis_panel)
+        return jsonify({"success": True, "data": data, "error": None})
 
     except Exception as e:
         return jsonify({"success": False, "data": None, "error": str(e)}), 500
 
 
+def _build_sectors_data(df):
+    """Construit l'analyse par secteur (montants, paniers moyens, données Chart.js)."""
+    if df.empty:
+        return {
+            "chart_montants": {"labels": [], "datasets": [{"data": []}]},
+            "chart_panier_moyen": {"labels": [], "datasets": [{"data": []}]},
+            "tableau": []
+        }
+
+    # Filtrer les deals sans secteur
+    df_sectors = df[df['secteur'].notna() & (df['secteur'] != '')]
+
+    if df_sectors.empty:
+        return {
+            "chart_montants": {"labels": [], "datasets": [{"data": []}]},
+            "chart_panier_moyen": {"labels": [], "datasets": [{"data": []}]},
+            "tableau": []
+        }
+
+    # Montants totaux par secteur (tri décroissant)
+    montants = df_sectors.groupby('secteur')['montant_brut'].sum().sort_values(ascending=False)
+
+    # Paniers moyens par secteur
+    paniers = df_sectors.groupby('secteur')['montant_brut'].mean()
+
+    # Top 5 paniers moyens (tri décroissant)
+    top5_paniers = paniers.sort_values(ascending=False).head(5)
+
+    # Nombre de deals par secteur
+    nb_deals = df_sectors.groupby('secteur').size()
+
+    # Valeur pondérée par secteur
+    valeur_ponderee = df_sectors.groupby('secteur')['valeur_ponderee'].sum()
+
+    # Tableau récapitulatif
+    tableau = []
+    for secteur in montants.sort_values(ascending=False).index:
+        tableau.append({
+            "secteur": secteur,
+            "montant_total": round(montants[secteur], 2),
+            "montant_total_formatted": format_currency(montants[secteur]),
+            "panier_moyen": round(paniers[secteur], 2),
+            "panier_moyen_formatted": format_currency(paniers[secteur]),
+            "nb_deals": int(nb_deals[secteur]),
+            "valeur_ponderee": round(valeur_ponderee[secteur], 2),
+            "valeur_ponderee_formatted": format_currency(valeur_ponderee[secteur])
+        })
+
+    # Palette de couleurs distinctes pour chaque secteur
+    color_palette = [
+        "rgba(102, 194, 165, 0.7)",  # Turquoise
+        "rgba(252, 141, 98, 0.7)",   # Coral
+        "rgba(141, 160, 203, 0.7)",  # Lavande
+        "rgba(231, 138, 195, 0.7)",  # Rose
+        "rgba(166, 216, 84, 0.7)",   # Vert clair
+        "rgba(255, 217, 47, 0.7)",   # Jaune
+        "rgba(229, 196, 148, 0.7)",  # Beige
+        "rgba(179, 179, 179, 0.7)",  # Gris
+        "rgba(255, 127, 0, 0.7)",    # Orange
+        "rgba(106, 61, 154, 0.7)",   # Violet
+        "rgba(255, 255, 51, 0.7)",   # Jaune vif
+        "rgba(177, 89, 40, 0.7)",    # Marron
+        "rgba(0, 206, 209, 0.7)",    # Turquoise foncé
+        "rgba(255, 105, 180, 0.7)",  # Rose foncé
+        "rgba(34, 139, 34, 0.7)",    # Vert forêt
+    ]
+
+    # Générer couleurs pour montants (répéter si plus de secteurs que de couleurs)
+    bg_colors_montants = [color_palette[i % len(color_palette)] for i in range(len(montants))]
+    border_colors_montants = [c.replace('0.7', '1') for c in bg_colors_montants]
+
+    # Données Chart.js - Montants totaux avec couleurs distinctes
+    chart_montants = {
+        "labels": montants.index.tolist(),
+        "datasets": [{
+            "label": "Montant Total (€)",
+            "data": [round(v, 2) for v in montants.values.tolist()],
+            "backgroundColor": bg_colors_montants,
+            "borderColor": border_colors_montants,
+            "borderWidth": 1
+        }]
+    }
+
+    # Générer couleurs pour panier moyen
+    bg_colors_panier = [color_palette[i % len(color_palette)] for i in range(len(top5_paniers))]
+    border_colors_panier = [c.replace('0.7', '1') for c in bg_colors_panier]
+
+    # Données Chart.js - Top 5 Paniers Moyens avec couleurs distinctes
+    chart_panier_moyen = {
+        "labels": top5_paniers.index.tolist(),
+        "datasets": [{
+            "label": "Panier Moyen (€)",
+            "data": [round(v, 2) for v in top5_paniers.values.tolist()],
+            "backgroundColor": bg_colors_panier,
+            "borderColor": border_colors_panier,
+            "borderWidth": 1
+        }]
+    }
+
+    return {
+        "chart_montants": chart_montants,
+        "chart_panier_moyen": chart_panier_moyen,
+        "tableau": tableau
+    }
+
+
 @analytics_bp.route('/analytics/sectors', methods=['GET'])
 def get_sectors():
     """GET /api/analytics/sectors - Analyse par secteur (avec filtres optionnels)"""
     try:
-        df = _get_deals()
-
-        if df.empty:
-            return jsonify({"success": True, "data": {
-                "chart_montants": {"labels": [], "datasets": [{"data": []}]},
-                "chart_panier_moyen": {"labels": [], "datasets": [{"data": []}]},
-                "tableau": []
-            }, "error": None})
-
-        # Filtrer les deals sans secteur
-        df_sectors = df[df['secteur'].notna() & (df['secteur'] != '')]
-
-        if df_sectors.empty:
-            return jsonify({"success": True, "data": {
-                "chart_montants": {"labels": [], "datasets": [{"data": []}]},
-                "chart_panier_moyen": {"labels": [], "datasets": [{"data": []}]},
-                "tableau": []
-            }, "error": None})
-
-        # Montants totaux par secteur (tri décroissant)
-        montants = df_sectors.groupby('secteur')['montant_brut'].sum().sort_values(ascending=False)
-
-        # Paniers moyens par secteur
-        paniers = df_sectors.groupby('secteur')['montant_brut'].mean()
-
-        # Top 5 paniers moyens (tri décroissant)
-        top5_paniers = paniers.sort_values(ascending=False).head(5)
-
-        # Nombre de deals par secteur
-        nb_deals = df_sectors.groupby('secteur').size()
-
-        # Valeur pondérée par secteur
-        valeur_ponderee = df_sectors.groupby('secteur')['valeur_ponderee'].sum()
-
-        # Tableau récapitulatif
-        tableau = []
-        for secteur in montants.sort_values(ascending=False).index:
-            tableau.append({
-                "secteur": secteur,
-                "montant_total": round(montants[secteur], 2),
-                "montant_total_formatted": format_currency(montants[secteur]),
-                "panier_moyen": round(paniers[secteur], 2),
-                "panier_moyen_formatted": format_currency(paniers[secteur]),
-                "nb_deals": int(nb_deals[secteur]),
-                "valeur_ponderee": round(valeur_ponderee[secteur], 2),
-                "valeur_ponderee_formatted": format_currency(valeur_ponderee[secteur])
-            })
-
-        # Palette de couleurs distinctes pour chaque secteur
-        color_palette = [
-            "rgba(102, 194, 165, 0.7)",  # Turquoise
-            "rgba(252, 141, 98, 0.7)",   # Coral
-            "rgba(141, 160, 203, 0.7)",  # Lavande
-            "rgba(231, 138, 195, 0.7)",  # Rose
-            "rgba(166, 216, 84, 0.7)",   # Vert clair
-            "rgba(255, 217, 47, 0.7)",   # Jaune
-            "rgba(229, 196, 148, 0.7)",  # Beige
-            "rgba(179, 179, 179, 0.7)",  # Gris
-            "rgba(255, 127, 0, 0.7)",    # Orange
-            "rgba(106, 61, 154, 0.7)",   # Violet
-            "rgba(255, 255, 51, 0.7)",   # Jaune vif
-            "rgba(177, 89, 40, 0.7)",    # Marron
-            "rgba(0, 206, 209, 0.7)",    # Turquoise foncé
-            "rgba(255, 105, 180, 0.7)",  # Rose foncé
-            "rgba(34, 139, 34, 0.7)",    # Vert forêt
-        ]
+        data = _cached_panel('sectors', _build_sectors_data)
+        return jsonify({"success": True, "data": data, "error": None})
 
-        # Générer couleurs pour montants (répéter si plus de secteurs que de couleurs)
-        bg_colors_montants = [color_palette[i % len(color_palette)] for i in range(len(montants))]
-        border_colors_montants = [c.replace('0.7', '1') for c in bg_colors_montants]
-
-        # Données Chart.js - Montants totaux avec couleurs distinctes
-        chart_montants = {
-            "labels": montants.index.tolist(),
-            "datasets": [{
-                "label": "Montant Total (€)",
-                "data": [round(v, 2) for v in montants.values.tolist()],
-                "backgroundColor": bg_colors_montants,
-                "borderColor": border_colors_montants,
-                "borderWidth": 1
-            }]
-        }
+    except Exception as e:
+        return jsonify({"success": False, "data": None, "error": str(e)}), 500
 
-        # Générer couleurs pour panier moyen
-        bg_colors_panier = [color_palette[i % len(color_palette)] for i in range(len(top5_paniers))]
-        border_colors_panier = [c.replace('0.7', '1') for c in bg_colors_panier]
-
-        # Données Chart.js - Top 5 Paniers Moyens avec couleurs distinctes
-        chart_panier_moyen = {
-            "labels": top5_paniers.index.tolist(),
-            "datasets": [{
-                "label": "Panier Moyen (€)",
-                "data": [round(v, 2) for v in top5_paniers.values.tolist()],
-                "backgroundColor": bg_colors_panier,
-                "borderColor": border_colors_panier,
-                "borderWidth": 1
-            }]
+
+def _build_deadlines_data(df):
+    """Construit les listes d'échéances dépassées et à venir (30 jours)."""
+    if df.empty:
+        return {
+            "overdue": [], "upcoming": [],
+            "stats": {"nb_overdue": 0, "nb_upcoming": 0, "montant_upcoming": 0}
         }
 
-        return jsonify({"success": True, "data": {
-            "chart_montants": chart_montants,
-            "chart_panier_moyen": chart_panier_moyen,
-            "tableau": tableau
-        }, "error": None})
+    today = datetime.now().date()
+    in_30_days = today + timedelta(days=30)
 
-    except Exception as e:
-        return jsonify({"success": False, "data": None, "error": str(e)}), 500
+    # Filtrer les deals avec date d'échéance
+    df_dated = df[df['date_echeance'].notna() & (df['date_echeance'] != '')].copy()
+
+    if df_dated.empty:
+        return {
+            "overdue": [], "upcoming": [],
+            "stats": {"nb_overdue": 0, "nb_upcoming": 0, "montant_upcoming": 0}
+        }
+
+    df_dated['date_parsed'] = pd.to_datetime(df_dated['date_echeance'], errors='coerce').dt.date
+    df_dated = df_dated.dropna(subset=['date_parsed'])
+
+    # Deals en retard
+    overdue_df = df_dated[df_dated['date_parsed'] < today].sort_values('date_parsed')
+    overdue = []
+    for _, row in overdue_df.iterrows():
+        jours_retard = (today - row['date_parsed']).days
+        overdue.append({
+            "client": row['client'],
+            "statut": row['statut'],
+            "montant_brut": row['montant_brut'],
+            "montant_formatted": format_currency(row['montant_brut']),
+            "date_echeance": row['date_echeance'],
+            "jours_retard": jours_retard,
+            "secteur": row.get('secteur', ''),
+            "assignee": row.get('assignee', '')
+        })
+
+    # Deals à venir (30 jours)
+    upcoming_df = df_dated[(df_dated['date_parsed'] >= today) & (df_dated['date_parsed'] <= in_30_days)].sort_values('date_parsed')
+    upcoming = []
+    for _, row in upcoming_df.iterrows():
+        jours_restants = (row['date_parsed'] - today).days
+        upcoming.append({
+            "client": row['client'],
+            "statut": row['statut'],
+            "montant_brut": row['montant_brut'],
+            "montant_formatted": format_currency(row['montant_brut']),
+            "date_echeance": row['date_echeance'],
+            "jours_restants": jours_restants,
+            "secteur": row.get('secteur', ''),
+            "assignee": row.get('assignee', '')
+        })
+
+    montant_upcoming = sum(d['montant_brut'] for d in upcoming)
+
+    return {
+        "overdue": overdue,
+        "upcoming": upcoming,
+        "stats": {
+            "nb_overdue": len(overdue),
+            "nb_upcoming": len(upcoming),
+            "montant_upcoming": round(montant_upcoming, 2),
+            "montant_upcoming_formatted": format_currency(montant_upcoming)
+        }
+    }
 
 
 @analytics_bp.route('/analytics/deadlines', methods=['GET'])
 def get_deadlines():
     """GET /api/analytics/deadlines - Échéances dépassées et à venir (avec filtres optionnels)"""
     try:
-        df = _get_deals()
-
-        if df.empty:
-            return jsonify({"success": True, "data": {
-                "overdue": [], "upcoming": [],
-                "stats": {"nb_overdue": 0, "nb_upcoming": 0, "montant_upcoming": 0}
-            }, "error": None})
-
-        today = datetime.now().date()
-        in_30_days = today + timedelta(days=30)
-
-        # Filtrer les deals avec date d'échéance
-        df_dated = df[df['date_echeance'].notna() & (df['date_echeance'] != '')].copy()
-
-        if df_dated.empty:
-            return jsonify({"success": True, "data": {
-                "overdue": [], "upcoming": [],
-                "stats": {"nb_overdue": 0, "nb_upcoming": 0, "montant_upcoming": 0}
-            }, "error": None})
-
-        df_dated['date_parsed'] = pd.to_datetime(df_dated['date_echeance'], errors='coerce').dt.date
-        df_dated = df_dated.dropna(subset=['date_parsed'])
-
-        # Deals en retard
-        overdue_df = df_dated[df_dated['date_parsed'] < today].sort_values('date_parsed')
-        overdue = []
-        for _, row in overdue_df.iterrows():
-            jours_retard = (today - row['date_parsed']).days
-            overdue.append({
-                "client": row['client'],
-                "statut": row['statut'],
-                "montant_brut": row['montant_brut'],
-                "montant_formatted": format_currency(row['montant_brut']),
-                "date_echeance": row['date_echeance'],
-                "jours_retard": jours_retard,
-                "secteur": row.get('secteur', ''),
-                "assignee": row.get('assignee', '')
-            })
-
-        # Deals à venir (30 jours)
-        upcoming_df = df_dated[(df_dated['date_parsed'] >= today) & (df_dated['date_parsed'] <= in_30_days)].sort_values('date_parsed')
-        upcoming = []
-        for _, row in upcoming_df.iterrows():
-            jours_restants = (row['date_parsed'] - today).days
-            upcoming.append({
-                "client": row['client'],
-                "statut": row['statut'],
-                "montant_brut": row['montant_brut'],
-                "montant_formatted": format_currency(row['montant_brut']),
-                "date_echeance": row['date_echeance'],
-                "jours_restants": jours_restants,
-                "secteur": row.get('secteur', ''),
-                "assignee": row.get('assignee', '')
-            })
-
-        montant_upcoming = sum(d['montant_brut'] for d in upcoming)
-
-        return jsonify({"success": True, "data": {
-            "overdue": overdue,
-            "upcoming": upcoming,
-            "stats": {
-                "nb_overdue": len(overdue),
-                "nb_upcoming": len(upcoming),
-                "montant_upcoming": round(montant_upcoming, 2),
-                "montant_upcoming_formatted": format_currency(montant_upcoming)
-            }
-        }, "error": None})
+        data = _cached_panel('deadlines', _build_deadlines_data)
+        return jsonify({"success": True, "data": data, "error": None})
 
     except Exception as e:
         return jsonify({"success": False, "data": None, "error": str(e)}), 500
 
 
+def _build_performance_data(df):
+    """Construit la performance par commercial (tableau et données Chart.js)."""
+    if df.empty:
+        return {
+            "performance": [],
+            "chart_data": {"labels": [], "datasets": []},
+            "stats": {"nb_commerciaux": 0}
+        }
+
+    performance = calculate_performance_by_assignee(df)
+
+    # Formater les montants
+    for p in performance:
+        p["montant_total_formatted"] = format_currency(p["montant_total"])
+        p["pipeline_pondere_formatted"] = format_currency(p["pipeline_pondere"])
+        p["panier_moyen_formatted"] = format_currency(p["panier_moyen"])
+
+    # Données Chart.js
+    labels = [p["assignee"] for p in performance]
+    chart_data = {
+        "labels": labels,
+        "datasets": [
+            {
+                "label": "Nombre de Deals",
+                "data": [p["nb_deals"] for p in performance],
+                "backgroundColor": "rgba(59, 130, 246, 0.7)",
+                "borderColor": "rgba(59, 130, 246, 1)",
+                "borderWidth": 1,
+                "yAxisID": "y"
+            },
+            {
+                "label": "Taux de Conversion (%)",
+                "data": [p["taux_conversion"] for p in performance],
+                "backgroundColor": "rgba(34, 197, 94, 0.7)",
+                "borderColor": "rgba(34, 197, 94, 1)",
+                "borderWidth": 1,
+                "yAxisID": "y1"
+            }
+        ]
+    }
+
+    return {
+        "performance": performance,
+        "chart_data": chart_data,
+        "stats": {"nb_commerciaux": len(performance)}
+    }
+
+
 @analytics_bp.route('/analytics/performance', methods=['GET'])
 def get_performance():
     """GET /api/analytics/performance - Performance par commercial (avec filtres optionnels)"""
     try:
-        df = _get_deals()
-
-        if df.empty:
-            return jsonify({"success": True, "data": {
-                "performance": [],
-                "chart_data": {"labels": [], "datasets": []},
-                "stats": {"nb_commerciaux": 0}
-            }, "error": None})
-
-        performance = calculate_performance_by_assignee(df)
-
-        # Formater les montants
-        for p in performance:
-            p["montant_total_formatted"] = format_currency(p["montant_total"])
-            p["pipeline_pondere_formatted"] = format_currency(p["pipeline_pondere"])
-            p["panier_moyen_formatted"] = format_currency(p["panier_moyen"])
-
-        # Données Chart.js
-        labels = [p["assignee"] for p in performance]
-        chart_data = {
-            "labels": labels,
-            "datasets": [
-                {
-                    "label": "Nombre de Deals",
-                    "data": [p["nb_deals"] for p in performance],
-                    "backgroundColor": "rgba(59, 130, 246, 0.7)",
-                    "borderColor": "rgba(59, 130, 246, 1)",
-                    "borderWidth": 1,
-                    "yAxisID": "y"
-                },
-                {
-                    "label": "Taux de Conversion (%)",
-                    "data": [p["taux_conversion"] for p in performance],
-                    "backgroundColor": "rgba(34, 197, 94, 0.7)",
-                    "borderColor": "rgba(34, 197, 94, 1)",
-                    "borderWidth": 1,
-                    "yAxisID": "y1"
-                }
-            ]
-        }
-
-        return jsonify({"success": True, "data": {
-            "performance": performance,
-            "chart_data": chart_data,
-            "stats": {"nb_commerciaux": len(performance)}
-        }, "error": None})
+        data = _cached_panel('performance', _build_performance_data)
+        return jsonify({"success": True, "data": data, "error": None})
 
     except Exception as e:
         return jsonify({"success": False, "data": None, "error": str(e)}), 500
 
 
+def _build_velocity_data(df):
+    """Construit la vitesse de vente globale et ventilée par secteur / commercial."""
+    if df.empty:
+        return {
+            "vitesse_moyenne_jours": 0,
+            "vitesse_moyenne_formatted": "N/A",
+            "velocity_by_sector": {},
+            "velocity_by_assignee": {}
+        }
+
+    vitesse_moyenne = calculate_sales_velocity(df)
+    velocity_by_sector = calculate_velocity_by_group(df, 'secteur')
+    velocity_by_assignee = calculate_velocity_by_group(df, 'assignee')
+
+    # Compter les deals gagnés pour distinguer "0 jours" de "N/A"
+    deals_gagnes = _count_won_deals(df)
+    if deals_gagnes > 0:
+        vitesse_formatted = f"{vitesse_moyenne} jours" if vitesse_moyenne > 0 else "< 1 jour"
+    else:
+        vitesse_formatted = "N/A"
+
+    return {
+        "vitesse_moyenne_jours": vitesse_moyenne,
+        "vitesse_moyenne_formatted": vitesse_formatted,
+        "has_won_deals": deals_gagnes > 0,
+        "velocity_by_sector": velocity_by_sector,
+        "velocity_by_assignee": velocity_by_assignee
+    }
+
+
 @analytics_bp.route('/analytics/velocity', methods=['GET'])
 def get_velocity():
     """GET /api/analytics/velocity - Vitesse de vente (avec filtres optionnels)"""
     try:
-        df = _get_deals()
-
-        if df.empty:
-            return jsonify({"success": True, "data": {
-                "vitesse_moyenne_jours": 0,
-                "vitesse_moyenne_formatted": "N/A",
-                "velocity_by_sector": {},
-                "velocity_by_assignee": {}
-            }, "error": None})
-
-        vitesse_moyenne = calculate_sales_velocity(df)
-        velocity_by_sector = calculate_velocity_by_group(df, 'secteur')
-        velocity_by_assignee = calculate_velocity_by_group(df, 'assignee')
-
-        # Compter les deals gagnés pour distinguer "0 jours" de "N/A"
-        deals_gagnes = len(df[df['statut'].str.lower().str.strip().isin(['gagné', 'gagné - en cours'])])
-        if deals_gagnes > 0:
-            vitesse_formatted = f"{vitesse_moyenne} jours" if vitesse_moyenne > 0 else "< 1 jour"
-        else:
-            vitesse_formatted = "N/A"
-
-        return jsonify({"success": True, "data": {
-            "vitesse_moyenne_jours": vitesse_moyenne,
-            "vitesse_moyenne_formatted": vitesse_formatted,
-            "has_won_deals": deals_gagnes > 0,
-            "velocity_by_sector": velocity_by_sector,
-            "velocity_by_assignee": velocity_by_assignee
-        }, "error": None})
+        data = _cached_panel('velocity', _build_velocity_data)
+        return jsonify({"success": True, "data": data, "error": None})
 
     except Exception as e:
         return jsonify({"success": False, "data": None, "error": str(e)}), 500
 
 
+def _build_cold_deals_data(df):
+    """Construit la liste des deals froids et leurs statistiques."""
+    if df.empty:
+        return {
+            "cold_deals": [],
+            "stats": {"nb_cold_deals": 0, "montant_total_cold": 0, "montant_total_cold_formatted": "0 €"}
+        }
+
+    cold_df = get_cold_deals(df)
+
+    if cold_df.empty:
+        return {
+            "cold_deals": [],
+            "stats": {"nb_cold_deals": 0, "montant_total_cold": 0, "montant_total_cold_formatted": "0 €"}
+        }
+
+    cold_deals = []
+    for _, row in cold_df.iterrows():
+        cold_deals.append({
+            "id": int(row['id']) if 'id' in row else None,
+            "client": row.get('client', ''),
+            "statut": row.get('statut', ''),
+            "montant_brut": float(row.get('montant_brut', 0)),
+            "montant_formatted": format_currency(float(row.get('montant_brut', 0))),
+            "secteur": row.get('secteur', '') or '',
+            "assignee": row.get('assignee', '') or '',
+            "date_echeance": str(row.get('date_echeance', '')) if row.get('date_echeance') else '',
+            "jours_inactifs": int(row.get('jours_inactifs', 0))
+        })
+
+    montant_total = sum(d['montant_brut'] for d in cold_deals)
+
+    return {
+        "cold_deals": cold_deals,
+        "stats": {
+            "nb_cold_deals": len(cold_deals),
+            "montant_total_cold": round(montant_total, 2),
+            "montant_total_cold_formatted": format_currency(montant_total)
+        }
+    }
+
+
 @analytics_bp.route('/analytics/cold-deals', methods=['GET'])
 def get_cold_deals_endpoint():
     """GET /api/analytics/cold-deals - Deals froids (avec filtres optionnels)"""
     try:
-        df = _get_deals()
-
-        if df.empty:
-            return jsonify({"success": True, "data": {
-                "cold_deals": [],
-                "stats": {"nb_cold_deals": 0, "montant_total_cold": 0, "montant_total_cold_formatted": "0 €"}
-            }, "error": None})
-
-        cold_df = get_cold_deals(df)
-
-        if cold_df.empty:
-            return jsonify({"success": True, "data": {
-                "cold_deals": [],
-                "stats": {"nb_cold_deals": 0, "montant_total_cold": 0, "montant_total_cold_formatted": "0 €"}
-            }, "error": None})
-
-        cold_deals = []
-        for _, row in cold_df.iterrows():
-            cold_deals.append({
-                "id": int(row['id']) if 'id' in row else None,
-                "client": row.get('client', ''),
-                "statut": row.get('statut', ''),
-                "montant_brut": float(row.get('montant_brut', 0)),
-                "montant_formatted": format_currency(float(row.get('montant_brut', 0))),
-                "secteur": row.get('secteur', '') or '',
-                "assignee": row.get('assignee', '') or '',
-                "date_echeance": str(row.get('date_echeance', '')) if row.get('date_echeance') else '',
-                "jours_inactifs": int(row.get('jours_inactifs', 0))
-            })
-
-        montant_total = sum(d['montant_brut'] for d in cold_deals)
-
-        return jsonify({"success": True, "data": {
-            "cold_deals": cold_deals,
-            "stats": {
-                "nb_cold_deals": len(cold_deals),
-                "montant_total_cold": round(montant_total, 2),
-                "montant_total_cold_formatted": format_currency(montant_total)
-            }
-        }, "error": None})
+        data = _cached_panel('cold_deals', _build_cold_deals_data)
+        return jsonify({"success": True, "data": data, "error": None})
+
+    except Exception as e:
+        return jsonify({"success": False, "data": None, "error": str(e)}), 500
+
+
+# Panels disponibles pour GET /api/dashboard → fonction de construction (df → payload).
+# Pas de panel deals : la liste des deals est paginée par GET /api/deals.
+DASHBOARD_PANELS = {
+    "kpis": _build_kpis_panel,
+    "sectors": _build_sectors_data,
+    "deadlines": _build_deadlines_data,
+    "performance": _build_performance_data,
+    "velocity": _build_velocity_data,
+    "cold_deals": _build_cold_deals_data,
+}
+
+
+@analytics_bp.route('/dashboard', methods=['GET'])
+def get_dashboard():
+    """
+    GET /api/dashboard - Tous les panels du dashboard en un seul appel.
+    Les deals filtrés sont lus une seule fois puis partagés entre les panels.
+    Paramètre optionnel panels=kpis,sectors,... pour ne calculer qu'une sélection.
+    """
+    try:
+        requested = [p.strip() for value in request.args.getlist('panels') for p in value.split(',') if p.strip()]
+        unknown = [p for p in requested if p not in DASHBOARD_PANELS]
+        if unknown:
+            return jsonify({"success": False, "data": None,
+                            "error": f"Panels inconnus: {', '.join(unknown)}. "
+                                     f"Valeurs acceptées: {', '.join(DASHBOARD_PANELS)}"}), 400
+
+        panels = requested or list(DASHBOARD_PANELS)
+
+        # Panels déjà en cache pour ces filtres et cette version des données
+        data = {}
+        missing = {}
+        for name in panels:
+            key = _cache_key(name)
+            hit, value = analytics_cache.get(key)
+            if hit:
+                data[name] = value
+            else:
+                missing[name] = key
+
+        # Les panels manquants sont calculés sur une seule lecture des deals
+        # (inutile si seuls les KPIs manquent et qu'ils sont agrégés en SQL)
+        if missing:
+            needs_deals = deal_snapshot.enabled or any(name != 'kpis' for name in missing)
+            df = _get_deals() if needs_deals else None
+            for name, key in missing.items():
+                data[name] = DASHBOARD_PANELS[name](df)
+                analytics_cache.set(key, data[name])
+
+        return jsonify({"success": True, "data": {name: data[name] for name in panels}, "error": None})
 
     except Exception as e:
         return jsonify({"success": False, "data": None, "error": str(e)}), 500
@@ -431,7 +587,20 @@ def get_cold_deals_endpoint():
 def get_filters_options():
     """GET /api/filters/options - Retourne les valeurs disponibles pour les filtres"""
     try:
-        options = get_filter_options()
+        version = _data_version()
+        options = analytics_cache.get_or_compute(
+            ('filter_options', (), version),
+            (lambda: deal_snapshot.filter_options(version)) if deal_snapshot.enabled else get_filter_options
+        )
         return jsonify({"success": True, "data": options, "error": None})
     except Exception as e:
         return jsonify({"success": False, "data": None, "error": str(e)}), 500
+
+
+@analytics_bp.route('/analytics/cache', methods=['GET'])
+def get_cache_stats():
+    """GET /api/analytics/cache - Statistiques du cache analytics (hits, misses, taille) et du snapshot"""
+    stats = analytics_cache.stats()
+    stats["data_version"] = get_data_version()
+    stats["snapshot"] = deal_snapshot.stats()
+    return jsonify({"success": True, "data": stats, "error": None})
@@ -3,15 +3,24 @@ Blueprint API pour la gestion des deals.
 Expose les endpoints CRUD pour les deals.
 """
 
+import base64
+import json
+
 from flask import Blueprint, jsonify, request
 from database.crud import (
-    get_all_deals, get_filtered_deals, get_deal_by_id,
+    get_deals_page, get_deal_by_id,
     insert_deal, update_deal, delete_deal, clear_all_deals
 )
+from database.models import SELECTABLE_COLUMNS, SORTABLE_COLUMNS
+from .http_cache import register_conditional_get
 from business_logic.validators import validate_deal_dict, parse_date
 from business_logic.calculators import calculate_probability, calculate_weighted_value
 
 deals_bp = Blueprint('deals', __name__)
+register_conditional_get(deals_bp)
+
+# Taille de page maximale pour GET /api/deals?limit=
+MAX_PAGE_SIZE = 1000
 
 
 def _extract_filter_params():
@@ -32,17 +41,75 @@ def _extract_filter_params():
     return params
 
 
+def _encode_cursor(key):
+    """Encode la clé (valeur de tri, id) du dernier deal d'une page en curseur opaque."""
+    value, deal_id = key
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    elif hasattr(value, 'item'):
+        value = value.item()
+    raw = json.dumps([value, deal_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    """Décode un curseur opaque en clé (valeur de tri, id). Lève ValueError si invalide."""
+    try:
+        value, deal_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return value, int(deal_id)
+    except Exception:
+        raise ValueError("Curseur de pagination invalide")
+
+
 @deals_bp.route('/deals', methods=['GET'])
 def get_deals():
-    """GET /api/deals - Retourne tous les deals (avec filtres optionnels)"""
+    """
+    GET /api/deals - Retourne les deals (avec filtres optionnels)
+    Pagination : limit, cursor (valeur X-Next-Cursor de la page précédente)
+    Tri : sort (colonne indexée), order (asc|desc) ; projection : fields=client,statut,...
+    En-têtes : X-Total-Count (deals filtrés), X-Next-Cursor (absent sur la dernière page)
+    """
     try:
         params = _extract_filter_params()
-        if params:
-            df = get_filtered_deals(params)
-        else:
-            df = get_all_deals()
+
+        limit = request.args.get('limit', type=int)
+        if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+            return jsonify({"success": False, "data": None,
+                            "error": f"limit doit être compris entre 1 et {MAX_PAGE_SIZE}"}), 400
+
+        sort = request.args.get('sort', 'id')
+        if sort not in SORTABLE_COLUMNS:
+            return jsonify({"success": False, "data": None,
+                            "error": f"Tri non supporté. Valeurs acceptées: {', '.join(SORTABLE_COLUMNS)}"}), 400
+
+        order = request.args.get('order', 'asc').lower()
+        if order not in ('asc', 'desc'):
+            return jsonify({"success": False, "data": None, "error": "order doit valoir asc ou desc"}), 400
+
+        fields = None
+        if request.args.get('fields'):
+            fields = [f.strip() for f in request.args.get('fields').split(',') if f.strip()]
+            unknown = [f for f in fields if f not in SELECTABLE_COLUMNS]
+            if unknown:
+                return jsonify({"success": False, "data": None,
+                                "error": f"Champs inconnus: {', '.join(unknown)}"}), 400
+
+        after = None
+        if request.args.get('cursor'):
+            try:
+                after = _decode_cursor(request.args.get('cursor'))
+            except ValueError as e:
+                return jsonify({"success": False, "data": None, "error": str(e)}), 400
+
+        df, total, next_key = get_deals_page(params, limit=limit, after=after,
+                                             sort=sort, order=order, fields=fields)
         deals = df.to_dict(orient='records')
-        return jsonify({"success": True, "data": deals, "error": None})
+
+        response = jsonify({"success": True, "data": deals, "error": None})
+        response.headers['X-Total-Count'] = str(total)
+        if next_key is not None:
+            response.headers['X-Next-Cursor'] = _encode_cursor(next_key)
+        return response
     except Exception as e:
         return jsonify({"success": False, "data": None, "error": str(e)}), 500
 
@@ -0,0 +1,78 @@
+"""
+Réponses conditionnelles (ETag / Last-Modified) pour les endpoints GET en lecture.
+
+L'ETag est dérivé de la version des données deals (table data_versions, commune à
+tous les workers), de la date du jour et de l'URL (chemin + paramètres triés) : une
+requête If-None-Match dont le validateur correspond reçoit un 304 sans que les deals
+soient relus ni le JSON sérialisé, quel que soit le worker qui la traite.
+"""
+
+import hashlib
+from datetime import date, datetime, time
+
+from flask import current_app, g, request
+
+from database.crud import get_data_version_info
+
+
+def _compute_validators():
+    """
+    Calcule l'ETag fort et la date de dernière modification de la requête courante.
+    La date du jour en fait partie : les panels d'échéances et de deals froids en dépendent.
+    """
+    version, modified_at = get_data_version_info()
+    # Réutilisée par l'endpoint : le corps correspond à la version de l'ETag
+    g.data_version = version
+    today = date.today()
+    args = sorted((key, value) for key in request.args for value in request.args.getlist(key))
+    raw = f"{version}:{today.isoformat()}:{request.path}?{args}"
+    etag = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    start_of_day = datetime.combine(today, time.min).astimezone()
+    return etag, max(modified_at, start_of_day).replace(microsecond=0)
+
+
+def register_conditional_get(blueprint, exclude=()):
+    """
+    Active les réponses conditionnelles sur les GET d'un blueprint.
+
+    Args:
+        blueprint: Blueprint Flask à équiper
+        exclude: Noms d'endpoints (ex: 'analytics.get_cache_stats') à ne pas traiter
+    """
+
+    def _applies() -> bool:
+        return request.method == 'GET' and request.endpoint not in exclude
+
+    @blueprint.before_request
+    def _short_circuit_not_modified():
+        if not _applies():
+            return None
+
+        # Validateurs calculés avant la lecture des données : une écriture concurrente
+        # produira un nouvel ETag au prochain appel plutôt qu'un 304 sur un corps périmé
+        g.etag, g.last_modified = _compute_validators()
+
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(g.etag)
+        elif request.if_modified_since:
+            not_modified = g.last_modified <= request.if_modified_since
+        else:
+            not_modified = False
+
+        if not_modified:
+            return _with_validators(current_app.response_class(status=304))
+        return None
+
+    @blueprint.after_request
+    def _add_validators(response):
+        if _applies() and response.status_code == 200 and 'etag' in g:
+            _with_validators(response)
+        return response
+
+
+def _with_validators(response):
+    """Ajoute ETag, Last-Modified et Cache-Control (revalidation systématique) à une réponse."""
+    response.set_etag(g.etag)
+    response.last_modified = g.last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,282 @@
+"""
+Jobs d'import en arrière-plan (CSV, Airtable, Notion).
+
+Les imports sont exécutés par un pool de threads hors du cycle requête/réponse :
+l'endpoint d'import crée un job (table import_jobs) et retourne son ID immédiatement,
+le client suit la progression via GET /api/jobs/<id> et peut l'annuler via
+POST /api/jobs/<id>/cancel. L'état étant persisté en base, il est visible depuis
+n'importe quel worker web.
+
+Chaque processus rafraîchit toutes les JOB_HEARTBEAT_INTERVAL secondes updated_at des
+jobs qu'il a en file ou en cours : un job sans battement de cœur depuis JOB_STALE_AFTER
+secondes (processus redémarré ou arrêté) est passé en erreur.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Set
+
+from flask import Blueprint, current_app, jsonify
+
+from database.crud import (
+    create_import_job, get_import_job, start_import_job, update_import_job,
+    request_import_job_cancel, is_import_job_cancel_requested,
+    touch_import_jobs, fail_stale_import_jobs
+)
+
+logger = logging.getLogger(__name__)
+
+jobs_bp = Blueprint('jobs', __name__)
+
+# Nombre de jobs d'import exécutés en parallèle par processus
+IMPORT_JOB_WORKERS = int(os.environ.get('IMPORT_JOB_WORKERS', 2))
+
+# Période (secondes) du battement de cœur des jobs du processus
+JOB_HEARTBEAT_INTERVAL = int(os.environ.get('JOB_HEARTBEAT_INTERVAL', 30))
+# Délai (secondes) sans battement de cœur au-delà duquel un job est considéré interrompu
+JOB_STALE_AFTER = int(os.environ.get('JOB_STALE_AFTER', 300))
+
+# Statuts terminaux d'un job
+JOB_FINAL_STATUSES = ('success', 'partial', 'error', 'cancelled')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Jobs en file ou en cours dans ce processus (entretenus par le battement de cœur)
+_active_jobs: Set[int] = set()
+_active_jobs_lock = threading.Lock()
+_heartbeat_thread = None
+
+
+class JobCancelled(Exception):
+    """Levée dans un job dont l'annulation a été demandée."""
+
+
+class JobProgress:
+    """
+    Compteurs de progression d'un job, persistés à chaque appel de report().
+    report() vérifie aussi la demande d'annulation : un job s'arrête donc
+    entre deux lots, jamais au milieu d'une transaction.
+    """
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.rows_processed = 0
+        self.rows_imported = 0
+        self.rows_rejected = 0
+
+    def set_total(self, rows_total: Optional[int]) -> None:
+        """Enregistre le nombre total (éventuellement estimé) de lignes à traiter."""
+        update_import_job(self.job_id, {'rows_total': rows_total})
+
+    def report(self, processed: int = 0, imported: int = 0, rejected: int = 0) -> None:
+        """
+        Ajoute un lot traité aux compteurs et les persiste.
+
+        Raises:
+            JobCancelled: Si l'annulation du job a été demandée
+        """
+        self.rows_processed += processed
+        self.rows_imported += imported
+        self.rows_rejected += rejected
+        update_import_job(self.job_id, self.counters())
+        if is_import_job_cancel_requested(self.job_id):
+            raise JobCancelled()
+
+    def counters(self) -> Dict[str, int]:
+        return {
+            'rows_processed': self.rows_processed,
+            'rows_imported': self.rows_imported,
+            'rows_rejected': self.rows_rejected
+        }
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, IMPORT_JOB_WORKERS),
+                                               thread_name_prefix='import-job')
+    return _executor
+
+
+def _heartbeat_loop(app) -> None:
+    while True:
+        time.sleep(JOB_HEARTBEAT_INTERVAL)
+        with _active_jobs_lock:
+            job_ids = sorted(_active_jobs)
+        try:
+            with app.app_context():
+                touch_import_jobs(job_ids)
+                fail_stale_import_jobs(JOB_STALE_AFTER)
+        except Exception:
+            logger.exception("Erreur du battement de cœur des jobs d'import")
+
+
+def _start_heartbeat(app) -> None:
+    global _heartbeat_thread
+    with _executor_lock:
+        if _heartbeat_thread is not None:
+            return
+        _heartbeat_thread = threading.Thread(target=_heartbeat_loop, args=(app,),
+                                             name='import-job-heartbeat', daemon=True)
+        _heartbeat_thread.start()
+
+
+def recover_stale_jobs(app) -> int:
+    """
+    Passe en erreur, au démarrage, les jobs laissés 'pending' ou 'running' par un
+    processus arrêté (sans battement de cœur depuis JOB_STALE_AFTER secondes).
+
+    Returns:
+        Le nombre de jobs passés en erreur
+    """
+    with app.app_context():
+        return fail_stale_import_jobs(JOB_STALE_AFTER)
+
+
+def submit_import_job(kind: str, source: Optional[str], target: Callable[..., Dict[str, Any]],
+                      *args, cleanup: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """
+    Crée un job d'import et planifie son exécution en arrière-plan.
+
+    Args:
+        kind: Type de job ('csv', 'airtable', 'notion' ; 'count' pour un comptage de records)
+        source: Description de la source (nom de fichier, provider)
+        target: Fonction target(progress, *args) effectuant l'import ; retourne un
+            dict de résultat pouvant contenir 'status' (success/partial/error)
+        cleanup: Fonction appelée en fin de job quel que soit son issue
+
+    Returns:
+        Le job créé (statut 'pending')
+    """
+    job = create_import_job(kind, source)
+    app = current_app._get_current_object()
+    _start_heartbeat(app)
+    with _active_jobs_lock:
+        _active_jobs.add(job['id'])
+    try:
+        _get_executor().submit(_run_job, app, job['id'], target, args, cleanup)
+    except Exception:
+        with _active_jobs_lock:
+            _active_jobs.discard(job['id'])
+        raise
+    return job
+
+
+def _run_job(app, job_id: int, target, args, cleanup) -> None:
+    """Exécute un job dans son propre contexte applicatif (connexion DB empruntée au pool)."""
+    with app.app_context():
+        progress = JobProgress(job_id)
+        try:
+            if not start_import_job(job_id):
+                return
+
+            result = target(progress, *args) or {}
+            update_import_job(job_id, {
+                **progress.counters(),
+                'status': result.get('status', 'success'),
+                'result': json.dumps(result, default=str),
+                'error_message': result.get('error'),
+                'completed_at': datetime.now().isoformat()
+            })
+
+        except JobCancelled:
+            update_import_job(job_id, {
+                **progress.counters(),
+                'status': 'cancelled',
+                'completed_at': datetime.now().isoformat()
+            })
+
+        except Exception as e:
+            logger.exception(f"Job d'import {job_id} en erreur")
+            try:
+                update_import_job(job_id, {
+                    **progress.counters(),
+                    'status': 'error',
+                    'error_message': str(e),
+                    'completed_at': datetime.now().isoformat()
+                })
+            except Exception:
+                logger.exception(f"Impossible d'enregistrer l'échec du job {job_id}")
+
+        finally:
+            with _active_jobs_lock:
+                _active_jobs.discard(job_id)
+            if cleanup is not None:
+                try:
+                    cleanup()
+                except Exception:
+                    logger.warning(f"Nettoyage du job {job_id} impossible", exc_info=True)
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    """Convertit un horodatage DB (datetime PostgreSQL ou string SQLite) en datetime."""
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def serialize_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Prépare un job pour la réponse JSON (résultat décodé, progression et ETA calculées)."""
+    data = dict(job)
+    data['cancel_requested'] = bool(data.get('cancel_requested'))
+    if data.get('result'):
+        data['result'] = json.loads(data['result'])
+
+    rows_total = data.get('rows_total')
+    rows_processed = data.get('rows_processed') or 0
+    data['progress'] = round(min(rows_processed / rows_total, 1) * 100, 1) if rows_total else None
+
+    # ETA : extrapolation du débit observé depuis le démarrage du job
+    data['eta_seconds'] = None
+    started_at = _parse_timestamp(data.get('started_at'))
+    if data.get('status') == 'running' and started_at and rows_total and rows_processed:
+        elapsed = (datetime.now() - started_at).total_seconds()
+        data['eta_seconds'] = round(max(rows_total - rows_processed, 0) * elapsed / rows_processed, 1)
+
+    for key in ('created_at', 'started_at', 'completed_at', 'updated_at'):
+        if isinstance(data.get(key), datetime):
+            data[key] = data[key].isoformat()
+    return data
+
+
+@jobs_bp.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """GET /api/jobs/<id> - État et progression d'un job d'import"""
+    try:
+        job = get_import_job(job_id)
+        if not job:
+            return jsonify({"success": False, "data": None, "error": "Job non trouvé"}), 404
+        # Job orphelin (processus arrêté) : passé en erreur pour que le client cesse d'attendre
+        if job['status'] in ('pending', 'running') and fail_stale_import_jobs(JOB_STALE_AFTER, job_id):
+            job = get_import_job(job_id)
+        return jsonify({"success": True, "data": serialize_job(job), "error": None})
+    except Exception as e:
+        return jsonify({"success": False, "data": None, "error": str(e)}), 500
+
+
+@jobs_bp.route('/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """POST /api/jobs/<id>/cancel - Demande l'annulation d'un job d'import"""
+    try:
+        job = get_import_job(job_id)
+        if not job:
+            return jsonify({"success": False, "data": None, "error": "Job non trouvé"}), 404
+        if job['status'] in JOB_FINAL_STATUSES:
+            return jsonify({"success": False, "data": serialize_job(job),
+                            "error": f"Job déjà terminé ({job['status']})"}), 409
+
+        job = request_import_job_cancel(job_id)
+        return jsonify({"success": True, "data": serialize_job(job), "error": None})
+    except Exception as e:
+        return jsonify({"success": False, "data": None, "error": str(e)}), 500
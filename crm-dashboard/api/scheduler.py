@@ -0,0 +1,128 @@
+"""
+Synchronisation planifiée des connecteurs.
+
+Un thread d'arrière-plan par processus vérifie toutes les SYNC_SCHEDULER_TICK secondes
+les connecteurs actifs dont l'intervalle (connector_configs.sync_interval_minutes) est
+écoulé et lance pour chacun un import incrémental dans un job d'arrière-plan, comme le
+bouton d'import. L'échéance est réservée en base et l'import s'exécute sous le verrou
+du provider : avec plusieurs workers web, une seule exécution par provider a lieu à la fois.
+
+Le même thread relance l'import des records restés en file webhook (notification reçue
+pendant une autre synchronisation du provider, job interrompu).
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from database.crud import (
+    get_all_connector_configs, claim_scheduled_sync, count_webhook_queue, SYNC_TIMESTAMP_FORMAT
+)
+from .sync import VALID_PROVIDERS, WEBHOOK_MAX_ATTEMPTS, submit_sync_import, submit_webhook_sync
+
+logger = logging.getLogger(__name__)
+
+# Planificateur actif (désactivable par processus, ex. workers dédiés aux requêtes)
+SYNC_SCHEDULER_ENABLED = os.environ.get('SYNC_SCHEDULER_ENABLED', '1').lower() in ('1', 'true', 'yes')
+# Période (secondes) de vérification des échéances
+SYNC_SCHEDULER_TICK = int(os.environ.get('SYNC_SCHEDULER_TICK', 30))
+
+_scheduler_thread = None
+_scheduler_lock = threading.Lock()
+
+
+def _is_schedulable(config: dict) -> bool:
+    """Connecteur actif, supporté et configuré (token et base) : synchronisable sans intervention."""
+    return bool(config.get('is_active') and config['provider'] in VALID_PROVIDERS
+                and config.get('api_token') and config.get('base_id'))
+
+
+def run_due_syncs() -> List[int]:
+    """
+    Lance les imports planifiés arrivés à échéance (dans un contexte applicatif).
+
+    Returns:
+        Les IDs des jobs d'import créés
+    """
+    now = datetime.now(timezone.utc)
+    job_ids = []
+
+    for config in get_all_connector_configs():
+        provider = config['provider']
+        interval = config.get('sync_interval_minutes')
+        if not interval or not _is_schedulable(config):
+            continue
+
+        next_sync_at = (now + timedelta(minutes=interval)).strftime(SYNC_TIMESTAMP_FORMAT)
+        if not claim_scheduled_sync(provider, now.strftime(SYNC_TIMESTAMP_FORMAT), next_sync_at):
+            continue
+
+        try:
+            job = submit_sync_import(provider)
+        except Exception:
+            logger.exception(f"Synchronisation planifiée {provider} impossible")
+            continue
+
+        if job is None:
+            logger.info(f"Synchronisation planifiée {provider} ignorée : une synchronisation est en cours")
+        else:
+            logger.info(f"Synchronisation planifiée {provider} lancée (job {job['id']})")
+            job_ids.append(job['id'])
+
+    return job_ids
+
+
+def run_pending_webhook_syncs() -> List[int]:
+    """
+    Lance l'import des records en attente dans la file webhook (dans un contexte applicatif).
+
+    Returns:
+        Les IDs des jobs d'import créés
+    """
+    job_ids = []
+    # Connecteur désactivé ou supprimé : ses records en file attendent sa réactivation
+    schedulable = {config['provider'] for config in get_all_connector_configs() if _is_schedulable(config)}
+
+    for provider, pending in count_webhook_queue(WEBHOOK_MAX_ATTEMPTS).items():
+        if not pending or provider not in schedulable:
+            continue
+
+        try:
+            job = submit_webhook_sync(provider)
+        except Exception:
+            logger.exception(f"Import webhook {provider} impossible")
+            continue
+
+        if job is not None:
+            logger.info(f"Import webhook {provider} relancé pour {pending} record(s) en file (job {job['id']})")
+            job_ids.append(job['id'])
+
+    return job_ids
+
+
+def _scheduler_loop(app) -> None:
+    while True:
+        time.sleep(SYNC_SCHEDULER_TICK)
+        try:
+            with app.app_context():
+                run_due_syncs()
+                run_pending_webhook_syncs()
+        except Exception:
+            logger.exception("Erreur du planificateur de synchronisation")
+
+
+def start_sync_scheduler(app) -> None:
+    """Démarre le thread du planificateur de synchronisation (une fois par processus)."""
+    global _scheduler_thread
+    if not SYNC_SCHEDULER_ENABLED:
+        return
+
+    with _scheduler_lock:
+        if _scheduler_thread is not None:
+            return
+        _scheduler_thread = threading.Thread(target=_scheduler_loop, args=(app,),
+                                             name='sync-scheduler', daemon=True)
+        _scheduler_thread.start()
@@ -1,23 +1,37 @@
 """
 Blueprint Flask pour la synchronisation avec services externes (Airtable, Notion).
-Endpoints : configuration des connecteurs, test de connexion, import/export, logs.
+Endpoints : configuration des connecteurs, test de connexion, import/export, logs,
+exécutions de synchronisation (checkpoints) et leur reprise, réception des notifications
+webhook (import des seuls records modifiés).
 """
 
+import hashlib
 import json
 import logging
-from datetime import datetime
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 
+import requests
 from flask import Blueprint, request, jsonify
 
 from database.crud import (
     get_connector_config, get_all_connector_configs, upsert_connector_config,
     insert_sync_log, get_sync_logs,
-    get_all_deals, get_deal_by_client, insert_deal, update_deal
+    get_deals_updated_since, get_db_timestamp, upsert_deals_by_client,
+    get_sync_watermark, set_sync_watermark, clear_sync_watermarks,
+    get_external_refs, set_external_refs, clear_external_refs,
+    create_sync_run, get_sync_run, get_sync_runs, update_sync_run, claim_sync_run, abandon_sync_runs,
+    acquire_sync_lock, release_sync_lock,
+    enqueue_webhook_records, get_webhook_queue, delete_webhook_records, fail_webhook_records,
+    clear_webhook_queue
 )
 from connectors.airtable import AirtableConnector
 from connectors.notion import NotionConnector
-from connectors.field_mapping import get_field_mapping, normalize_status
+from connectors.base import prefetch_pages
+from connectors.field_mapping import get_field_mapping, normalize_status, compile_field_mapping
 from business_logic.calculators import calculate_probability, calculate_weighted_value
+from .jobs import JobCancelled, submit_import_job, serialize_job
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +39,101 @@ sync_bp = Blueprint('sync', __name__)
 
 VALID_PROVIDERS = ['airtable', 'notion']
 
+# Recouvrement appliqué au watermark d'import : absorbe l'arrondi à la minute de
+# last_edited_time (Notion) et les décalages d'horloge. Un record relu est upserté à l'identique.
+IMPORT_WATERMARK_OVERLAP = timedelta(minutes=2)
+
+# Deals envoyés par lot d'export : un checkpoint (sync_runs) est enregistré après chaque lot
+EXPORT_BATCH_SIZE = 100
+
+# Compteurs cumulés d'une exécution de synchronisation, enregistrés à chaque checkpoint
+SYNC_RUN_COUNTERS = ('batches_committed', 'records_processed', 'records_created',
+                     'records_updated', 'records_unchanged', 'records_rejected')
+# Délai (secondes) sans checkpoint au-delà duquel une exécution 'running' est considérée
+# comme interrompue (processus arrêté) et peut être reprise
+SYNC_RUN_STALE_AFTER = 600
+
+# Bail (secondes) du verrou de synchronisation d'un provider : au-delà, un verrou non rendu
+# (processus arrêté) est considéré comme abandonné
+SYNC_LOCK_TTL = 3600
+
+# Intervalle minimal (minutes) de la synchronisation planifiée d'un connecteur
+SYNC_MIN_INTERVAL_MINUTES = 5
+
+# Records signalés par webhook relus et upsertés par lot
+WEBHOOK_BATCH_SIZE = 50
+# Lectures en échec d'un record en file webhook avant sa mise de côté (jusqu'à sa prochaine notification)
+WEBHOOK_MAX_ATTEMPTS = 5
+
+# Champs de configuration définissant la source : les modifier impose une resynchronisation complète
+SOURCE_CONFIG_FIELDS = ('api_token', 'base_id', 'table_name', 'field_mapping')
+# Champs désignant la table distante : les modifier invalide les liens deal ↔ record externe
+SOURCE_LOCATION_FIELDS = ('base_id', 'table_name')
+
+
+def _is_full_sync() -> bool:
+    """Indique si la requête demande une synchronisation complète (?full=1)."""
+    return request.args.get('full', '').lower() in ('1', 'true', 'yes')
+
+
+def _acquire_provider_lock(provider: str) -> Optional[str]:
+    """
+    Prend le verrou de synchronisation du provider (une exécution à la fois par provider,
+    tous processus confondus).
+
+    Returns:
+        L'identifiant du détenteur à passer à release_sync_lock, None si le verrou est pris
+    """
+    owner = uuid.uuid4().hex
+    return owner if acquire_sync_lock(provider, owner, SYNC_LOCK_TTL) else None
+
+
+def _sync_in_progress_response(provider: str):
+    return jsonify({
+        "success": False,
+        "error": f"Une synchronisation {provider} est déjà en cours"
+    }), 409
+
+
+def _submit_locked_job(provider: str, target, *args):
+    """
+    Lance target dans un job en arrière-plan sous le verrou du provider, rendu en fin de job.
+
+    Returns:
+        Le job créé, ou None si une synchronisation du provider est déjà en cours
+    """
+    owner = _acquire_provider_lock(provider)
+    if owner is None:
+        return None
+    try:
+        return submit_import_job(provider, provider, target, *args,
+                                 cleanup=lambda: release_sync_lock(provider, owner))
+    except Exception:
+        release_sync_lock(provider, owner)
+        raise
+
+
+def submit_sync_import(provider: str, full: bool = False, run_id: Optional[int] = None):
+    """
+    Lance un import dans un job en arrière-plan sous le verrou du provider.
+
+    Returns:
+        Le job créé, ou None si une synchronisation du provider est déjà en cours
+    """
+    return _submit_locked_job(provider, _run_sync_import, provider, full, run_id)
+
+
+def submit_webhook_sync(provider: str):
+    """
+    Lance l'import des records en file webhook dans un job en arrière-plan sous le verrou
+    du provider.
+
+    Returns:
+        Le job créé, ou None si une synchronisation du provider est déjà en cours (les
+        records restent en file : le job en cours ou le planificateur les traitera)
+    """
+    return _submit_locked_job(provider, _run_webhook_sync, provider)
+
 
 def _get_connector(provider: str, config: dict):
     """Instancie le connecteur approprié selon le provider."""
@@ -42,10 +151,11 @@ def get_configs():
     """Retourne toutes les configurations de connecteurs (tokens masqués)."""
     try:
         configs = get_all_connector_configs()
-        # Masquer les tokens
+        # Masquer les tokens et secrets
         for cfg in configs:
-            if cfg.get('api_token'):
-                cfg['api_token'] = '***'
+            for secret_field in ('api_token', 'webhook_secret'):
+                if cfg.get(secret_field):
+                    cfg[secret_field] = '***'
         return jsonify({"success": True, "data": configs})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -84,11 +194,53 @@ def save_config(provider):
         if 'is_active' in data:
             config_data['is_active'] = bool(data['is_active'])
 
+        # Secret de vérification des notifications webhook (vide : webhooks refusés)
+        if 'webhook_secret' in data and data['webhook_secret'] != '***':
+            config_data['webhook_secret'] = data['webhook_secret'] or None
+            config_data['pending_webhook_secret'] = None
+
+        # Confirmation du jeton de vérification reçu (requête Notion non signée) comme secret
+        if data.get('confirm_pending_webhook_secret'):
+            pending = (get_connector_config(provider) or {}).get('pending_webhook_secret')
+            if not pending:
+                return jsonify({"success": False, "error": "Aucun jeton de vérification en attente"}), 400
+            config_data['webhook_secret'] = pending
+            config_data['pending_webhook_secret'] = None
+
+        # Synchronisation planifiée : intervalle en minutes (vide ou 0 : désactivée),
+        # la prochaine échéance est recalculée par le planificateur
+        if 'sync_interval_minutes' in data:
+            interval = data['sync_interval_minutes'] or None
+            if interval is not None:
+                try:
+                    interval = int(interval)
+                except (TypeError, ValueError):
+                    interval = 0
+                if interval < SYNC_MIN_INTERVAL_MINUTES:
+                    return jsonify({
+                        "success": False,
+                        "error": f"sync_interval_minutes doit être un entier >= {SYNC_MIN_INTERVAL_MINUTES}"
+                    }), 400
+            config_data['sync_interval_minutes'] = interval
+            config_data['next_sync_at'] = None
+
         result = upsert_connector_config(provider, config_data)
 
-        # Masquer le token dans la réponse
-        if result and result.get('api_token'):
-            result['api_token'] = '***'
+        # Nouvelle source ou nouveau mapping : les watermarks, les hashes et les checkpoints des
+        # exécutions interrompues ne sont plus valables, les liens vers les records externes
+        # et les records en file webhook non plus si la table distante change
+        if any(field in config_data for field in SOURCE_CONFIG_FIELDS):
+            clear_sync_watermarks(provider)
+            abandon_sync_runs(provider)
+            moved = any(field in config_data for field in SOURCE_LOCATION_FIELDS)
+            clear_external_refs(provider, hashes_only=not moved)
+            if moved:
+                clear_webhook_queue(provider)
+
+        # Masquer le token et le secret dans la réponse
+        for secret_field in ('api_token', 'webhook_secret'):
+            if result and result.get(secret_field):
+                result[secret_field] = '***'
 
         return jsonify({"success": True, "data": result})
 
@@ -123,19 +275,279 @@ def test_connection(provider):
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def _run_record_count(progress, provider: str):
+    """Corps du job de comptage : parcourt la table externe page par page."""
+    config = get_connector_config(provider)
+    if not config:
+        raise Exception(f"Aucune configuration trouvée pour {provider}.")
+
+    connector = _get_connector(provider, config)
+    record_count = connector.count_records(on_page=lambda size: progress.report(size))
+    return {"status": "success", "record_count": record_count}
+
+
+@sync_bp.route('/connectors/count/<provider>', methods=['POST'])
+def count_records(provider):
+    """Lance le comptage des records d'un service externe dans un job en arrière-plan."""
+    if provider not in VALID_PROVIDERS:
+        return jsonify({
+            "success": False,
+            "error": f"Provider non supporté. Valeurs acceptées: {', '.join(VALID_PROVIDERS)}"
+        }), 400
+
+    try:
+        config = get_connector_config(provider)
+        if not config:
+            return jsonify({
+                "success": False,
+                "error": f"Aucune configuration trouvée pour {provider}."
+            }), 400
+
+        job = submit_import_job('count', provider, _run_record_count, provider)
+        return jsonify({"success": True, "data": serialize_job(job)}), 202
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 # --- Import endpoint ---
 
+def _prepare_external_deal(ext_deal: dict, errors: list, unknown_statuses: list, normalize=normalize_status):
+    """
+    Valide un record externe et construit le deal CRM correspondant.
+
+    normalize : normalisation du statut (celle du mapping compilé pendant une synchronisation)
+
+    Returns:
+        Le deal à upserter, ou None si le record est rejeté (erreur ajoutée à errors)
+    """
+    client_name = ext_deal.get('client')
+    if not client_name:
+        errors.append("Record sans nom de client, ignoré")
+        return None
+
+    montant_brut = ext_deal.get('montant_brut')
+    if montant_brut is None or montant_brut <= 0:
+        errors.append(f"'{client_name}': montant_brut invalide ({montant_brut})")
+        return None
+
+    # Normaliser le statut (anglais → français)
+    raw_statut = ext_deal.get('statut', '')
+    normalized_statut = normalize(raw_statut)
+    if normalized_statut is None:
+        normalized_statut = 'prospect'
+        unknown_statuses.append(f"'{client_name}': statut '{raw_statut}' inconnu → prospect")
+
+    # Calculer probabilité et valeur pondérée
+    probabilite = calculate_probability(normalized_statut)
+    valeur_ponderee = calculate_weighted_value(montant_brut, probabilite)
+
+    return {
+        'client': client_name,
+        'statut': normalized_statut,
+        'montant_brut': montant_brut,
+        'probabilite': probabilite,
+        'valeur_ponderee': valeur_ponderee,
+        'secteur': ext_deal.get('secteur'),
+        'date_echeance': ext_deal.get('date_echeance'),
+        'assignee': ext_deal.get('assignee'),
+        'notes': ext_deal.get('notes'),
+    }
+
+
+def _resume_record_pages(connector, field_mapping: dict, since, start_cursor):
+    """
+    Pages de records à partir du curseur d'un checkpoint (depuis le début sans curseur).
+    Un curseur refusé par le provider (offset Airtable expiré après quelques minutes)
+    relance la lecture depuis le début : les records déjà importés sont alors ignorés
+    grâce à leur hash (import incrémental) ou réécrits à l'identique (import complet).
+    """
+    pages = connector.iter_record_pages(field_mapping, modified_since=since, start_cursor=start_cursor)
+    if not start_cursor:
+        yield from pages
+        return
+
+    try:
+        first_page = next(pages)
+    except StopIteration:
+        return
+    except requests.exceptions.HTTPError as e:
+        status = e.response.status_code if e.response is not None else 0
+        if status not in (400, 422):
+            raise
+        logger.warning(f"{connector.PROVIDER}: curseur de reprise refusé (HTTP {status}), "
+                       f"lecture reprise depuis le début")
+        yield from connector.iter_record_pages(field_mapping, modified_since=since)
+        return
+
+    yield first_page
+    yield from pages
+
+
+def _run_counters(run: dict) -> dict:
+    """Compteurs cumulés d'une exécution de synchronisation (checkpoint)."""
+    return {key: run.get(key) or 0 for key in SYNC_RUN_COUNTERS}
+
+
+def _run_sync_import(progress, provider: str, full: bool = False, run_id: Optional[int] = None):
+    """
+    Corps du job d'import depuis un service externe : récupère les records modifiés
+    depuis le dernier import réussi (tous si full ou premier import), crée ou met à
+    jour les deals page par page, au fil de la lecture (un upsert ensembliste et un
+    point de progression par page, la page suivante étant lue pendant l'écriture),
+    et enregistre un log.
+    Hors full, les records dont le contenu mappé n'a pas changé depuis la dernière
+    synchronisation (même hash) ne sont pas réécrits.
+
+    Chaque page écrite est un checkpoint de l'exécution (sync_runs : curseur de la page
+    suivante et compteurs cumulés) ; l'échec de l'écriture d'une page arrête l'import à
+    ce checkpoint. Avec run_id, l'import reprend une exécution interrompue à son
+    checkpoint, avec le watermark de départ de celle-ci.
+    """
+    started_at = datetime.now().isoformat()
+    counters = dict.fromkeys(SYNC_RUN_COUNTERS, 0)
+    errors = []
+    unknown_statuses = []
+    run = None
+
+    try:
+        config = get_connector_config(provider)
+        if not config:
+            raise Exception(f"Aucune configuration trouvée pour {provider}.")
+
+        connector = _get_connector(provider, config)
+        field_mapping = get_field_mapping(config)
+        compiled = compile_field_mapping(field_mapping)
+
+        if run_id is None:
+            # Watermark relevé avant la lecture : les modifications concurrentes seront relues
+            since = None if full else get_sync_watermark(provider, 'import')
+            next_watermark = (datetime.now(timezone.utc) - IMPORT_WATERMARK_OVERLAP).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+            run = create_sync_run({
+                'provider': provider,
+                'direction': 'import',
+                'full_sync': full,
+                'since': since,
+                'next_watermark': next_watermark,
+                'job_id': progress.job_id
+            })
+        else:
+            run = get_sync_run(run_id)
+            update_sync_run(run['id'], {'job_id': progress.job_id})
+            full = bool(run['full_sync'])
+            since = run['since']
+            next_watermark = run['next_watermark']
+            counters = _run_counters(run)
+
+        # Parcourir les records (modifiés depuis le watermark) page par page, depuis le checkpoint
+        pages = prefetch_pages(_resume_record_pages(connector, field_mapping, since, run['page_cursor']))
+        for batch in pages:
+            deals = []
+            external_ids = []
+            for ext_deal in batch:
+                deal = _prepare_external_deal(ext_deal, errors, unknown_statuses, compiled.normalize_status)
+                if deal is not None:
+                    deals.append(deal)
+                    external_ids.append(ext_deal.get(connector.EXTERNAL_ID_FIELD))
+            hashes = [compiled.content_hash(deal) for deal in deals]
+
+            try:
+                batch_created, batch_updated = upsert_deals_by_client(
+                    deals, provider=provider, external_ids=external_ids,
+                    content_hashes=hashes, skip_unchanged=not full
+                )
+            except Exception as e:
+                first = counters['records_processed'] + 1
+                raise Exception(f"Lot {first}-{first + len(batch) - 1}: {str(e)}")
+
+            counters['batches_committed'] += 1
+            counters['records_processed'] += len(batch)
+            counters['records_created'] += batch_created
+            counters['records_updated'] += batch_updated
+            counters['records_unchanged'] += len(deals) - batch_created - batch_updated
+            counters['records_rejected'] += len(batch) - len(deals)
+            update_sync_run(run['id'], {'page_cursor': batch.next_cursor, **counters})
+
+            # Progression persistée par page (point d'annulation du job)
+            progress.report(len(batch), len(deals), len(batch) - len(deals))
+
+    except JobCancelled:
+        update_sync_run(run['id'], {'status': 'cancelled', 'completed_at': datetime.now().isoformat()})
+        _log_import(provider, 'cancelled', counters, "Import annulé", started_at)
+        raise
+
+    except Exception as e:
+        if run is not None:
+            update_sync_run(run['id'], {
+                'status': 'error',
+                'error_message': str(e),
+                'completed_at': datetime.now().isoformat()
+            })
+        _log_import(provider, 'error', counters, str(e), started_at)
+        raise
+
+    # Déterminer le statut global (records rejetés sur l'ensemble de l'exécution)
+    written = counters['records_created'] + counters['records_updated'] + counters['records_unchanged']
+    if counters['records_rejected'] and written > 0:
+        sync_status = 'partial'
+    elif counters['records_rejected']:
+        sync_status = 'error'
+    else:
+        sync_status = 'success'
+
+    # Avancer le watermark : les records rejetés pour données invalides seront relus
+    # une fois corrigés à la source
+    set_sync_watermark(provider, 'import', next_watermark)
+
+    # Clôturer l'exécution et logger la synchronisation
+    error_msg = '; '.join(errors + unknown_statuses) if (errors or unknown_statuses) else None
+    update_sync_run(run['id'], {
+        'status': sync_status,
+        'page_cursor': None,
+        'error_message': error_msg,
+        'completed_at': datetime.now().isoformat()
+    })
+    _log_import(provider, sync_status, counters, error_msg, started_at)
+
+    return {
+        "status": sync_status,
+        "run_id": run['id'],
+        "incremental": since is not None,
+        "since": since,
+        "records_processed": counters['records_processed'],
+        "records_created": counters['records_created'],
+        "records_updated": counters['records_updated'],
+        "records_unchanged": counters['records_unchanged'],
+        "errors": errors,
+        "unknown_statuses": unknown_statuses
+    }
+
+
+def _log_import(provider: str, sync_status: str, counters: dict, error_message, started_at: str,
+                direction: str = 'import') -> None:
+    """Enregistre le log de synchronisation d'un import (complet/incrémental ou webhook)."""
+    insert_sync_log({
+        'provider': provider,
+        'direction': direction,
+        'status': sync_status,
+        'records_processed': counters['records_processed'],
+        'records_created': counters['records_created'],
+        'records_updated': counters['records_updated'],
+        'error_message': error_message,
+        'started_at': started_at,
+        'completed_at': datetime.now().isoformat()
+    })
+
+
 @sync_bp.route('/sync/<provider>/import', methods=['POST'])
 def sync_import(provider):
-    """Importe les deals depuis un service externe vers le CRM."""
+    """Lance l'import (incrémental, ?full=1 : complet) depuis un service externe dans un job en arrière-plan."""
     if provider not in VALID_PROVIDERS:
         return jsonify({
             "success": False,
             "error": f"Provider non supporté. Valeurs acceptées: {', '.join(VALID_PROVIDERS)}"
         }), 400
 
-    started_at = datetime.now().isoformat()
-
     try:
         config = get_connector_config(provider)
         if not config:
@@ -144,128 +556,341 @@ def sync_import(provider):
                 "error": f"Aucune configuration trouvée pour {provider}."
             }), 400
 
+        job = submit_sync_import(provider, _is_full_sync())
+        if job is None:
+            return _sync_in_progress_response(provider)
+        return jsonify({"success": True, "data": serialize_job(job)}), 202
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# --- Webhook endpoint ---
+
+def _run_webhook_sync(progress, provider: str):
+    """
+    Corps du job d'import webhook : relit par lots de WEBHOOK_BATCH_SIZE les records en
+    file (signalés modifiés par les notifications), les valide et les upserte comme
+    l'import (statut normalisé, probabilité et valeur pondérée recalculées, records au
+    contenu inchangé ignorés), puis les retire de la file. Les records notifiés pendant
+    le traitement sont traités avant la fin du job.
+
+    Un record illisible (ex. page non partagée avec l'intégration) reste en file avec son
+    erreur sans bloquer les suivants ; après WEBHOOK_MAX_ATTEMPTS échecs, il est ignoré
+    jusqu'à sa prochaine notification.
+    """
+    started_at = datetime.now().isoformat()
+    counters = dict.fromkeys(SYNC_RUN_COUNTERS, 0)
+    errors = []
+    unknown_statuses = []
+
+    try:
+        config = get_connector_config(provider)
+        if not config:
+            raise Exception(f"Aucune configuration trouvée pour {provider}.")
+
         connector = _get_connector(provider, config)
         field_mapping = get_field_mapping(config)
+        compiled = compile_field_mapping(field_mapping)
+
+        # Parcours de la file par ID croissant : les records en échec ne sont pas relus dans
+        # le même passage ; un nouveau passage reprend les records notifiés entre-temps
+        after_id = 0
+        renotified = 0
+        while True:
+            entries = get_webhook_queue(provider, WEBHOOK_BATCH_SIZE, WEBHOOK_MAX_ATTEMPTS, after_id)
+            if not entries:
+                if not renotified:
+                    break
+                after_id = renotified = 0
+                continue
+            after_id = entries[-1][0]
 
-        # Récupérer les records depuis le service externe
-        external_deals = connector.fetch_records(field_mapping)
+            try:
+                # Records supprimés ou sortis de la table depuis la notification : absents du lot
+                batch, failures = connector.fetch_records_by_ids(
+                    field_mapping, [record_id for _, record_id, _ in entries]
+                )
+                deals = []
+                external_ids = []
+                for ext_deal in batch:
+                    deal = _prepare_external_deal(ext_deal, errors, unknown_statuses, compiled.normalize_status)
+                    if deal is not None:
+                        deals.append(deal)
+                        external_ids.append(ext_deal.get(connector.EXTERNAL_ID_FIELD))
+                hashes = [compiled.content_hash(deal) for deal in deals]
+
+                batch_created, batch_updated = upsert_deals_by_client(
+                    deals, provider=provider, external_ids=external_ids,
+                    content_hashes=hashes, skip_unchanged=True
+                )
+            except Exception as e:
+                # Échec du lot entier : tentative comptée pour chacun de ses records
+                fail_webhook_records(provider, {record_id: str(e) for _, record_id, _ in entries})
+                raise
 
-        created = 0
-        updated = 0
-        errors = []
-        unknown_statuses = []
+            done = [entry for entry in entries if entry[1] not in failures]
+            renotified += len(done) - delete_webhook_records(provider, done)
+            fail_webhook_records(provider, failures)
+            errors.extend(failures.values())
 
-        for ext_deal in external_deals:
-            try:
-                client_name = ext_deal.get('client')
-                if not client_name:
-                    errors.append("Record sans nom de client, ignoré")
-                    continue
-
-                montant_brut = ext_deal.get('montant_brut')
-                if montant_brut is None or montant_brut <= 0:
-                    errors.append(f"'{client_name}': montant_brut invalide ({montant_brut})")
-                    continue
-
-                # Normaliser le statut (anglais → français)
-                raw_statut = ext_deal.get('statut', '')
-                normalized_statut = normalize_status(raw_statut)
-                if normalized_statut is None:
-                    normalized_statut = 'prospect'
-                    unknown_statuses.append(f"'{client_name}': statut '{raw_statut}' inconnu → prospect")
-
-                # Calculer probabilité et valeur pondérée
-                probabilite = calculate_probability(normalized_statut)
-                valeur_ponderee = calculate_weighted_value(montant_brut, probabilite)
-
-                deal_data = {
-                    'client': client_name,
-                    'statut': normalized_statut,
-                    'montant_brut': montant_brut,
-                    'probabilite': probabilite,
-                    'valeur_ponderee': valeur_ponderee,
-                    'secteur': ext_deal.get('secteur'),
-                    'date_echeance': ext_deal.get('date_echeance'),
-                    'assignee': ext_deal.get('assignee'),
-                    'notes': ext_deal.get('notes'),
-                }
-
-                # Vérifier si le deal existe déjà (par client)
-                existing = get_deal_by_client(client_name)
-
-                if existing:
-                    update_deal(existing['id'], deal_data)
-                    updated += 1
-                else:
-                    insert_deal(deal_data)
-                    created += 1
+            counters['batches_committed'] += 1
+            counters['records_processed'] += len(batch) + len(failures)
+            counters['records_created'] += batch_created
+            counters['records_updated'] += batch_updated
+            counters['records_unchanged'] += len(deals) - batch_created - batch_updated
+            counters['records_rejected'] += len(batch) - len(deals) + len(failures)
 
-            except Exception as e:
-                errors.append(f"'{ext_deal.get('client', '?')}': {str(e)}")
-
-        # Déterminer le statut global
-        total_processed = created + updated + len(errors)
-        if errors and (created + updated) > 0:
-            sync_status = 'partial'
-        elif errors:
-            sync_status = 'error'
-        else:
-            sync_status = 'success'
-
-        # Logger la synchronisation
-        completed_at = datetime.now().isoformat()
-        error_msg = '; '.join(errors + unknown_statuses) if (errors or unknown_statuses) else None
-        insert_sync_log({
-            'provider': provider,
-            'direction': 'import',
-            'status': sync_status,
-            'records_processed': total_processed,
-            'records_created': created,
-            'records_updated': updated,
-            'error_message': error_msg,
-            'started_at': started_at,
-            'completed_at': completed_at
-        })
+            progress.report(len(batch) + len(failures), len(deals), len(batch) - len(deals) + len(failures))
+
+    except JobCancelled:
+        _log_import(provider, 'cancelled', counters, "Import webhook annulé", started_at, direction='webhook')
+        raise
+
+    except Exception as e:
+        _log_import(provider, 'error', counters, str(e), started_at, direction='webhook')
+        raise
+
+    written = counters['records_created'] + counters['records_updated'] + counters['records_unchanged']
+    if counters['records_rejected'] and written > 0:
+        sync_status = 'partial'
+    elif counters['records_rejected']:
+        sync_status = 'error'
+    else:
+        sync_status = 'success'
+
+    error_msg = '; '.join(errors + unknown_statuses) if (errors or unknown_statuses) else None
+    if counters['records_processed']:
+        _log_import(provider, sync_status, counters, error_msg, started_at, direction='webhook')
+
+    return {
+        "status": sync_status,
+        "records_processed": counters['records_processed'],
+        "records_created": counters['records_created'],
+        "records_updated": counters['records_updated'],
+        "records_unchanged": counters['records_unchanged'],
+        "errors": errors,
+        "unknown_statuses": unknown_statuses
+    }
+
+
+@sync_bp.route('/sync/<provider>/webhook', methods=['POST'])
+def sync_webhook(provider):
+    """
+    Reçoit une notification de modification (webhook Airtable ou Notion) signée avec le
+    secret du connecteur : les records signalés sont mis en file et importés dans un job
+    en arrière-plan. La requête de vérification d'un abonnement Notion n'est pas signée :
+    son jeton est conservé en attente (pending_webhook_secret, jamais utilisé pour vérifier
+    une signature) et seule son empreinte est journalisée ; l'administrateur le consulte
+    et le confirme comme secret via /api/connectors/config.
+    """
+    if provider not in VALID_PROVIDERS:
+        return jsonify({
+            "success": False,
+            "error": f"Provider non supporté. Valeurs acceptées: {', '.join(VALID_PROVIDERS)}"
+        }), 400
+
+    try:
+        config = get_connector_config(provider)
+        if not config:
+            return jsonify({
+                "success": False,
+                "error": f"Aucune configuration trouvée pour {provider}."
+            }), 400
 
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return jsonify({"success": False, "error": "Corps JSON requis"}), 400
+
+        connector = _get_connector(provider, config)
+
+        verification_token = connector.webhook_verification_token(payload)
+        if verification_token:
+            if config.get('webhook_secret'):
+                logger.warning(f"Requête de vérification webhook {provider} ignorée : secret déjà configuré")
+            else:
+                upsert_connector_config(provider, {'pending_webhook_secret': verification_token})
+                fingerprint = hashlib.sha256(verification_token.encode('utf-8')).hexdigest()[:8]
+                logger.warning(
+                    f"Jeton de vérification webhook {provider} reçu (empreinte {fingerprint}) : "
+                    f"à confirmer via PUT /api/connectors/config/{provider}"
+                )
+            return jsonify({"success": True})
+
+        secret = config.get('webhook_secret')
+        if not secret or not connector.verify_webhook_signature(request.get_data(), request.headers, secret):
+            return jsonify({"success": False, "error": "Signature webhook invalide"}), 401
+
+        cursor = get_sync_watermark(provider, 'webhook')
+        record_ids, next_cursor = connector.collect_webhook_changes(payload, cursor)
+        # Curseur avancé avec la mise en file, dans la même transaction : un échec laisse
+        # les payloads à relire à la prochaine notification
+        advanced = next_cursor if next_cursor and next_cursor != cursor else None
+        queued = enqueue_webhook_records(provider, record_ids, watermark=advanced)
+        job = submit_webhook_sync(provider) if queued else None
         return jsonify({
             "success": True,
-            "status": sync_status,
-            "records_processed": total_processed,
-            "records_created": created,
-            "records_updated": updated,
-            "errors": errors,
-            "unknown_statuses": unknown_statuses
-        })
+            "queued": queued,
+            "job_id": job['id'] if job else None
+        }), 202
 
     except Exception as e:
-        # Logger l'erreur
-        insert_sync_log({
-            'provider': provider,
-            'direction': 'import',
-            'status': 'error',
-            'records_processed': 0,
-            'records_created': 0,
-            'records_updated': 0,
-            'error_message': str(e),
-            'started_at': started_at,
-            'completed_at': datetime.now().isoformat()
-        })
         return jsonify({"success": False, "error": str(e)}), 500
 
 
 # --- Export endpoint ---
 
+def _run_sync_export(provider: str, full: bool = False, run_id: Optional[int] = None) -> dict:
+    """
+    Exporte vers un service externe les deals modifiés depuis le dernier export réussi
+    (tous si full ou premier export), par lots de EXPORT_BATCH_SIZE deals dans l'ordre
+    des IDs, et enregistre un log.
+
+    Après chaque lot, les liens et hashes des deals écrits sont enregistrés et l'exécution
+    (sync_runs) retient en checkpoint le dernier deal exporté sans erreur depuis le début ;
+    avec run_id, l'export reprend après ce checkpoint, avec le watermark de départ.
+
+    Returns:
+        Le résultat de l'export (statut, compteurs cumulés de l'exécution, erreurs)
+    """
+    started_at = datetime.now().isoformat()
+    counters = dict.fromkeys(SYNC_RUN_COUNTERS, 0)
+    errors = []
+    run = None
+
+    try:
+        config = get_connector_config(provider)
+        if not config:
+            raise Exception(f"Aucune configuration trouvée pour {provider}.")
+
+        connector = _get_connector(provider, config)
+        field_mapping = get_field_mapping(config)
+        compiled = compile_field_mapping(field_mapping)
+
+        if run_id is None:
+            # Deals modifiés depuis le dernier export réussi (tous si full ou premier export),
+            # watermark relevé avant la lecture selon l'horloge de la base
+            since = None if full else get_sync_watermark(provider, 'export')
+            run = create_sync_run({
+                'provider': provider,
+                'direction': 'export',
+                'full_sync': full,
+                'since': since,
+                'next_watermark': get_db_timestamp()
+            })
+        else:
+            run = get_sync_run(run_id)
+            full = bool(run['full_sync'])
+            since = run['since']
+            counters = _run_counters(run)
+
+        deals_list = get_deals_updated_since(since).to_dict('records')
+        if run['last_deal_id'] is not None:
+            deals_list = [deal for deal in deals_list if deal['id'] > run['last_deal_id']]
+        deals_list.sort(key=lambda deal: deal['id'])
+
+        # Deals dont le contenu mappé est celui de la dernière synchronisation : rien à envoyer.
+        # Hors full, les deals liés sont mis à jour directement via leur ID externe.
+        hashes = {deal['id']: compiled.content_hash(deal) for deal in deals_list}
+        refs = {} if full else get_external_refs(provider)
+        to_push = [deal for deal in deals_list
+                   if refs.get(deal['id'], {}).get('content_hash') != hashes[deal['id']]]
+        counters['records_unchanged'] += len(deals_list) - len(to_push)
+        external_ids = {deal_id: ref['external_id'] for deal_id, ref in refs.items()}
+
+        # Table distante parcourue une seule fois pour tous les lots, si des deals ne sont pas liés
+        remote_clients = None
+        if any(deal['id'] not in external_ids for deal in to_push):
+            remote_clients = connector.index_remote_clients(field_mapping, external_ids.values())
+
+        checkpoint_frozen = False
+        for start in range(0, len(to_push), EXPORT_BATCH_SIZE):
+            batch = to_push[start:start + EXPORT_BATCH_SIZE]
+            result = connector.push_records(batch, field_mapping, external_ids, remote_clients)
+            set_external_refs(provider, [
+                {'deal_id': deal_id, 'external_id': external_id, 'content_hash': hashes[deal_id]}
+                for deal_id, external_id in result.get('synced', {}).items()
+            ])
+            errors.extend(result.get('errors', []))
+
+            counters['batches_committed'] += 1
+            counters['records_processed'] += len(batch)
+            counters['records_created'] += result['records_created']
+            counters['records_updated'] += result['records_updated']
+
+            # Le checkpoint n'avance plus après un lot en erreur : la reprise renverra ses deals
+            # (ceux écrits depuis seront ignorés grâce à leur hash)
+            checkpoint_frozen = checkpoint_frozen or bool(result.get('errors'))
+            checkpoint = dict(counters)
+            if not checkpoint_frozen:
+                checkpoint['last_deal_id'] = batch[-1]['id']
+            update_sync_run(run['id'], checkpoint)
+
+    except Exception as e:
+        if run is not None:
+            update_sync_run(run['id'], {
+                'status': 'error',
+                'error_message': str(e),
+                'completed_at': datetime.now().isoformat()
+            })
+        _log_export(provider, 'error', counters, str(e), started_at)
+        raise
+
+    sync_status = 'partial' if errors else 'success'
+
+    # En cas d'erreur, le watermark reste en place : les deals seront renvoyés au prochain export
+    if sync_status == 'success':
+        set_sync_watermark(provider, 'export', run['next_watermark'])
+
+    error_msg = '; '.join(errors) if errors else None
+    update_sync_run(run['id'], {
+        'status': sync_status,
+        'error_message': error_msg,
+        'completed_at': datetime.now().isoformat()
+    })
+    _log_export(provider, sync_status, counters, error_msg, started_at)
+
+    result = {
+        "status": sync_status,
+        "run_id": run['id'],
+        "records_processed": counters['records_processed'],
+        "records_created": counters['records_created'],
+        "records_updated": counters['records_updated'],
+        "records_unchanged": counters['records_unchanged'],
+        "incremental": since is not None,
+        "since": since,
+        "errors": errors
+    }
+    if not to_push:
+        result['message'] = ("Aucun deal modifié depuis le dernier export"
+                             if since or counters['records_unchanged'] else "Aucun deal à exporter")
+    return result
+
+
+def _log_export(provider: str, sync_status: str, counters: dict, error_message, started_at: str) -> None:
+    """Enregistre le log de synchronisation d'un export."""
+    insert_sync_log({
+        'provider': provider,
+        'direction': 'export',
+        'status': sync_status,
+        'records_processed': counters['records_processed'],
+        'records_created': counters['records_created'],
+        'records_updated': counters['records_updated'],
+        'error_message': error_message,
+        'started_at': started_at,
+        'completed_at': datetime.now().isoformat()
+    })
+
+
 @sync_bp.route('/sync/<provider>/export', methods=['POST'])
 def sync_export(provider):
-    """Exporte les deals du CRM vers un service externe."""
+    """Exporte vers un service externe les deals modifiés depuis le dernier export (?full=1 : tous)."""
     if provider not in VALID_PROVIDERS:
         return jsonify({
             "success": False,
             "error": f"Provider non supporté. Valeurs acceptées: {', '.join(VALID_PROVIDERS)}"
         }), 400
 
-    started_at = datetime.now().isoformat()
-
     try:
         config = get_connector_config(provider)
         if not config:
@@ -274,74 +899,92 @@ def sync_export(provider):
                 "error": f"Aucune configuration trouvée pour {provider}."
             }), 400
 
-        connector = _get_connector(provider, config)
-        field_mapping = get_field_mapping(config)
+        owner = _acquire_provider_lock(provider)
+        if owner is None:
+            return _sync_in_progress_response(provider)
+        try:
+            result = _run_sync_export(provider, _is_full_sync())
+        finally:
+            release_sync_lock(provider, owner)
+        return jsonify({"success": True, **result})
 
-        # Récupérer tous les deals du CRM
-        deals_df = get_all_deals()
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
 
-        if deals_df.empty:
-            insert_sync_log({
-                'provider': provider,
-                'direction': 'export',
-                'status': 'success',
-                'records_processed': 0,
-                'records_created': 0,
-                'records_updated': 0,
-                'error_message': None,
-                'started_at': started_at,
-                'completed_at': datetime.now().isoformat()
-            })
-            return jsonify({
-                "success": True,
-                "status": "success",
-                "records_processed": 0,
-                "records_created": 0,
-                "records_updated": 0,
-                "message": "Aucun deal à exporter"
-            })
 
-        deals_list = deals_df.to_dict('records')
-        result = connector.push_records(deals_list, field_mapping)
-
-        total = result['records_created'] + result['records_updated'] + len(result.get('errors', []))
-        sync_status = 'partial' if result.get('errors') else 'success'
-
-        completed_at = datetime.now().isoformat()
-        error_msg = '; '.join(result.get('errors', [])) if result.get('errors') else None
-        insert_sync_log({
-            'provider': provider,
-            'direction': 'export',
-            'status': sync_status,
-            'records_processed': total,
-            'records_created': result['records_created'],
-            'records_updated': result['records_updated'],
-            'error_message': error_msg,
-            'started_at': started_at,
-            'completed_at': completed_at
-        })
+# --- Sync runs endpoints ---
 
-        return jsonify({
-            "success": True,
-            "status": sync_status,
-            "records_processed": total,
-            "records_created": result['records_created'],
-            "records_updated": result['records_updated'],
-            "errors": result.get('errors', [])
-        })
+def _serialize_run(run: dict) -> dict:
+    """Prépare une exécution de synchronisation pour la réponse JSON."""
+    data = dict(run)
+    data['full_sync'] = bool(run.get('full_sync'))
+    data['resumable'] = (run.get('status') in ('error', 'cancelled')
+                         or (run.get('direction') == 'export' and run.get('status') == 'partial'))
+    return data
+
+
+@sync_bp.route('/sync/runs', methods=['GET'])
+def get_runs():
+    """Retourne les dernières exécutions de synchronisation et leur checkpoint."""
+    try:
+        provider_filter = request.args.get('provider')
+        limit = request.args.get('limit', 50, type=int)
+
+        runs = get_sync_runs(limit=limit, provider_filter=provider_filter)
+        return jsonify({"success": True, "data": [_serialize_run(run) for run in runs]})
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@sync_bp.route('/sync/runs/<int:run_id>/resume', methods=['POST'])
+def resume_run(run_id):
+    """
+    Reprend une exécution interrompue (erreur, annulation, export partiel, ou processus
+    arrêté en cours) à son checkpoint : import dans un job en arrière-plan, export direct.
+    """
+    try:
+        run = get_sync_run(run_id)
+        if not run:
+            return jsonify({"success": False, "error": f"Exécution {run_id} introuvable"}), 404
+
+        provider = run['provider']
+        if not get_connector_config(provider):
+            return jsonify({
+                "success": False,
+                "error": f"Aucune configuration trouvée pour {provider}."
+            }), 400
+
+        owner = _acquire_provider_lock(provider)
+        if owner is None:
+            return _sync_in_progress_response(provider)
+
+        try:
+            if not claim_sync_run(run_id, SYNC_RUN_STALE_AFTER):
+                return jsonify({
+                    "success": False,
+                    "error": f"Exécution {run_id} non reprenable (statut {run['status']})"
+                }), 409
+
+            if run['direction'] == 'import':
+                try:
+                    job = submit_import_job(provider, provider, _run_sync_import, provider, False, run_id,
+                                            cleanup=lambda: release_sync_lock(provider, owner))
+                except Exception:
+                    update_sync_run(run_id, {'status': run['status']})
+                    raise
+                owner = None
+                return jsonify({"success": True, "data": serialize_job(job)}), 202
+
+            result = _run_sync_export(provider, run_id=run_id)
+            return jsonify({"success": True, **result})
+
+        finally:
+            # Le verrou d'un import repris est rendu en fin de job
+            if owner is not None:
+                release_sync_lock(provider, owner)
 
     except Exception as e:
-        insert_sync_log({
-            'provider': provider,
-            'direction': 'export',
-            'status': 'error',
-            'records_processed': 0,
-            'records_created': 0,
-            'records_updated': 0,
-            'error_message': str(e),
-            'started_at': started_at,
-            'completed_at': datetime.now().isoformat()
-        })
         return jsonify({"success": False, "error": str(e)}), 500
 
 
@@ -1,22 +1,186 @@
 """
 Blueprint API pour l'upload CSV.
-Expose l'endpoint POST /api/upload/csv.
+Expose l'endpoint POST /api/upload/csv : le fichier est enregistré puis importé
+par un job en arrière-plan (suivi via GET /api/jobs/<id>).
 """
 
+import codecs
 import io
+import os
+import tempfile
 import pandas as pd
 from flask import Blueprint, jsonify, request
 from database.crud import insert_deals
 from business_logic.filters import normalize_column_names, map_csv_to_schema
-from business_logic.validators import validate_csv_structure, validate_deal_row
-from business_logic.calculators import calculate_probability, calculate_weighted_value
+from business_logic.validators import (
+    validate_csv_structure, validate_deals_frame, errors_from_frame, clean_text, parse_dates
+)
+from business_logic.calculators import calculate_probabilities, calculate_weighted_values
+from .jobs import submit_import_job, serialize_job
 
 upload_bp = Blueprint('upload', __name__)
 
 
+# Nombre de lignes CSV lues, validées et insérées par lot
+CSV_CHUNK_SIZE = 5000
+
+# Nombre maximal de messages d'erreur renvoyés dans le résumé d'import
+MAX_REPORTED_ERRORS = 10
+
+
+def _utf8_or_latin1(error):
+    """Gestionnaire d'erreur de décodage : les octets invalides en UTF-8 sont lus en Latin-1."""
+    return error.object[error.start:error.end].decode('latin-1'), error.end
+
+
+codecs.register_error('latin1_fallback', _utf8_or_latin1)
+
+
+class CSVImportError(Exception):
+    """Fichier CSV illisible ou structure invalide (erreur client, HTTP 400)."""
+
+
+def _chunk_to_deals(chunk: pd.DataFrame, first_row_number: int):
+    """
+    Valide un lot de lignes et construit les deals à insérer (traitement par colonnes).
+
+    Returns:
+        Tuple (deals valides, DataFrame des erreurs de validation)
+    """
+    valid_mask, errors_df = validate_deals_frame(chunk, first_row_number)
+    valid = chunk[valid_mask]
+    if valid.empty:
+        return [], errors_df
+
+    # Calculer probabilité et valeur pondérée
+    statut = valid['statut'].astype(str).str.strip()
+    montant_brut = pd.to_numeric(valid['montant_brut']).astype(float)
+    probabilite = calculate_probabilities(statut)
+
+    deals = pd.DataFrame({
+        'client': valid['client'].astype(str).str.strip(),
+        'statut': statut,
+        'montant_brut': montant_brut,
+        'probabilite': probabilite,
+        'valeur_ponderee': calculate_weighted_values(montant_brut, probabilite),
+        'secteur': clean_text(valid, 'secteur'),
+        'date_echeance': parse_dates(clean_text(valid, 'date_echeance')),
+        'assignee': clean_text(valid, 'assignee'),
+        'notes': clean_text(valid, 'notes')
+    })
+    return deals.to_dict('records'), errors_df
+
+
+def _import_csv_stream(stream, chunk_size: int = CSV_CHUNK_SIZE, progress=None):
+    """
+    Importe un CSV en streaming : lecture par lots de chunk_size lignes, validation
+    puis insertion de chaque lot dans sa propre transaction. La mémoire utilisée
+    dépend de chunk_size, pas de la taille du fichier.
+
+    Args:
+        stream: Flux binaire du fichier CSV
+        chunk_size: Nombre de lignes par lot
+        progress: JobProgress optionnel, informé après chaque lot (point d'annulation)
+
+    Returns:
+        Dict nb_imported, nb_errors, errors (premiers messages)
+
+    Raises:
+        CSVImportError: Si le fichier est illisible ou s'il manque des colonnes requises
+    """
+    # Décodage UTF-8 (BOM toléré) avec repli Latin-1 octet par octet : une seule passe
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='latin1_fallback', newline='')
+
+    nb_imported = 0
+    nb_errors = 0
+    errors = []
+    row_number = 1
+
+    try:
+        reader = pd.read_csv(text_stream, chunksize=chunk_size)
+        for chunk_index, chunk in enumerate(reader):
+            # Normaliser les colonnes
+            chunk = normalize_column_names(chunk)
+
+            # Valider la structure (une fois, avant toute insertion)
+            if chunk_index == 0:
+                is_valid, missing_cols = validate_csv_structure(chunk)
+                if not is_valid:
+                    raise CSVImportError(f"Colonnes manquantes: {', '.join(missing_cols)}")
+
+            # Mapper les colonnes CSV vers le schéma DB
+            chunk = map_csv_to_schema(chunk)
+
+            deals, errors_df = _chunk_to_deals(chunk, row_number)
+            row_number += len(chunk)
+
+            # Seuls les premiers messages sont formatés, les autres sont seulement comptés
+            nb_errors += len(errors_df)
+            remaining = MAX_REPORTED_ERRORS - len(errors)
+            if remaining > 0:
+                errors.extend(str(e) for e in errors_from_frame(errors_df.head(remaining)))
+
+            # Insert cumulatif (les nouvelles données s'ajoutent aux existantes)
+            inserted = 0
+            if deals:
+                try:
+                    inserted = insert_deals(deals)
+                except Exception as e:
+                    raise Exception(f"{str(e)} ({nb_imported} deals déjà importés)")
+            nb_imported += inserted
+
+            if progress is not None:
+                progress.report(len(chunk), inserted, len(chunk) - len(deals))
+
+    except (pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+        raise CSVImportError(f"Erreur de lecture CSV: {str(e)}")
+    finally:
+        # Ne pas fermer le flux sous-jacent (géré par Werkzeug)
+        text_stream.detach()
+
+    return {
+        "nb_imported": nb_imported,
+        "nb_errors": nb_errors,
+        "errors": errors
+    }
+
+
+def _estimate_data_rows(path: str) -> int:
+    """Estime le nombre de lignes de données (sauts de ligne hors en-tête) pour le calcul de l'ETA."""
+    newlines = 0
+    last_byte = b'\n'
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            newlines += block.count(b'\n')
+            last_byte = block[-1:]
+    if last_byte != b'\n':
+        newlines += 1
+    return max(newlines - 1, 0)
+
+
+def _run_csv_import(progress, path: str):
+    """Corps du job d'import CSV : importe le fichier temporaire enregistré par l'upload."""
+    progress.set_total(_estimate_data_rows(path))
+
+    with open(path, 'rb') as f:
+        try:
+            summary = _import_csv_stream(f, CSV_CHUNK_SIZE, progress)
+        except CSVImportError as e:
+            return {"status": "error", "error": str(e), "nb_imported": 0, "nb_errors": 0, "errors": []}
+
+    if summary['nb_imported'] == 0:
+        return {**summary, "status": "error", "error": "Aucun deal valide trouvé dans le fichier"}
+    return {**summary, "status": "partial" if summary['nb_errors'] else "success"}
+
+
+def _remove_file(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
 @upload_bp.route('/upload/csv', methods=['POST'])
 def upload_csv():
-    """POST /api/upload/csv - Upload et traitement d'un fichier CSV"""
+    """POST /api/upload/csv - Enregistre un fichier CSV et lance son import en arrière-plan"""
     try:
         # Vérifier la présence du fichier
         if 'file' not in request.files:
@@ -31,69 +195,18 @@ def upload_csv():
         if not file.filename.lower().endswith('.csv'):
             return jsonify({"success": False, "data": None, "error": "Seuls les fichiers .csv sont acceptés"}), 400
 
-        # Lire le CSV depuis le stream mémoire
+        # Copie sur disque : le flux de la requête n'existe plus une fois la réponse envoyée
+        fd, path = tempfile.mkstemp(prefix='crm_import_', suffix='.csv')
+        os.close(fd)
         try:
-            content = file.read()
-            try:
-                df = pd.read_csv(io.BytesIO(content), encoding='utf-8')
-            except UnicodeDecodeError:
-                df = pd.read_csv(io.BytesIO(content), encoding='latin-1')
-        except Exception as e:
-            return jsonify({"success": False, "data": None, "error": f"Erreur de lecture CSV: {str(e)}"}), 400
-
-        # Normaliser les colonnes
-        df = normalize_column_names(df)
-
-        # Valider la structure
-        is_valid, missing_cols = validate_csv_structure(df)
-        if not is_valid:
-            return jsonify({"success": False, "data": None,
-                            "error": f"Colonnes manquantes: {', '.join(missing_cols)}"}), 400
-
-        # Mapper les colonnes CSV vers le schéma DB
-        df = map_csv_to_schema(df)
-
-        # Traiter chaque ligne
-        deals_to_insert = []
-        errors = []
-
-        for idx, row in df.iterrows():
-            row_errors = validate_deal_row(row, idx + 1)
-            if row_errors:
-                errors.extend([str(e) for e in row_errors])
-                continue
-
-            # Calculer probabilité et valeur pondérée
-            statut = str(row.get('statut', '')).strip()
-            montant_brut = float(row.get('montant_brut', 0))
-            probabilite = calculate_probability(statut)
-            valeur_ponderee = calculate_weighted_value(montant_brut, probabilite)
-
-            deal = {
-                'client': str(row.get('client', '')).strip(),
-                'statut': statut,
-                'montant_brut': montant_brut,
-                'probabilite': probabilite,
-                'valeur_ponderee': valeur_ponderee,
-                'secteur': str(row.get('secteur', '')).strip() if pd.notna(row.get('secteur')) else None,
-                'date_echeance': str(row.get('date_echeance', '')).strip() if pd.notna(row.get('date_echeance')) else None,
-                'assignee': str(row.get('assignee', '')).strip() if pd.notna(row.get('assignee')) else None,
-                'notes': str(row.get('notes', '')).strip() if pd.notna(row.get('notes')) else None
-            }
-            deals_to_insert.append(deal)
-
-        if not deals_to_insert:
-            return jsonify({"success": False, "data": None,
-                            "error": "Aucun deal valide trouvé dans le fichier"}), 400
-
-        # Insert cumulatif (les nouvelles données s'ajoutent aux existantes)
-        nb_inserted = insert_deals(deals_to_insert)
-
-        return jsonify({"success": True, "data": {
-            "nb_imported": nb_inserted,
-            "nb_errors": len(errors),
-            "errors": errors[:10] if errors else []
-        }, "error": None})
+            file.save(path)
+            job = submit_import_job('csv', file.filename, _run_csv_import, path,
+                                    cleanup=lambda: _remove_file(path))
+        except Exception:
+            _remove_file(path)
+            raise
+
+        return jsonify({"success": True, "data": serialize_job(job), "error": None}), 202
 
     except Exception as e:
         return jsonify({"success": False, "data": None, "error": str(e)}), 500
@@ -3,11 +3,13 @@ Dashboard CRM - Application Flask
 Point d'entrée de l'application : gère l'initialisation Flask et l'enregistrement des routes.
 """
 
+import os
+
 from dotenv import load_dotenv
 load_dotenv()
 
 from flask import Flask, render_template
-from database.connection import init_database
+from database.connection import init_app as init_db_pool, init_database
 
 # Créer l'application Flask
 app = Flask(__name__)
@@ -17,6 +19,12 @@ app.config['SECRET_KEY'] = 'dev-secret-key-change-in-production'
 app.config['JSON_AS_ASCII'] = False  # Support caractères français dans JSON
 app.config['MAX_CONTENT_LENGTH'] = 200 * 1024 * 1024  # 200MB max pour upload CSV
 
+# Pool de connexions DB (une connexion empruntée par requête, rendue au teardown)
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))
+app.config['DB_POOL_MAX_OVERFLOW'] = int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10))
+app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+init_db_pool(app)
+
 # CORS pour développement local (optionnel)
 # Si besoin d'appels API depuis autre origine: pip install flask-cors puis décommenter
 # from flask_cors import CORS
@@ -30,6 +38,16 @@ with app.app_context():
     except Exception as e:
         print(f"[ERREUR] Initialisation base de donnees: {str(e)}")
 
+# Snapshot mémoire des deals (optionnel) : chargé une fois, tenu à jour par les écritures CRUD
+from database.crud import get_data_version
+from database.snapshot import deal_snapshot
+if deal_snapshot.enabled:
+    with app.app_context():
+        try:
+            print(f"[OK] Snapshot deals charge ({deal_snapshot.load(get_data_version())} deals)")
+        except Exception as e:
+            print(f"[ERREUR] Chargement snapshot deals: {str(e)}")
+
 # Route principale
 @app.route('/')
 def index():
@@ -45,5 +63,18 @@ def connectors():
 from api import register_blueprints
 register_blueprints(app)
 
+# Jobs d'import laissés en cours par un processus arrêté : passés en erreur
+from api.jobs import recover_stale_jobs
+try:
+    stale_jobs = recover_stale_jobs(app)
+    if stale_jobs:
+        print(f"[OK] {stale_jobs} job(s) d'import interrompu(s) passe(s) en erreur")
+except Exception as e:
+    print(f"[ERREUR] Recuperation des jobs d'import: {str(e)}")
+
+# Synchronisation planifiée des connecteurs (thread d'arrière-plan)
+from api.scheduler import start_sync_scheduler
+start_sync_scheduler(app)
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,222 @@
+"""
+Micro-benchmark de la conversion des records externes en deals CRM.
+
+Compare, pour des records au format Airtable (champs à plat, linked records) et Notion
+(propriétés typées), le coût par record :
+- par_record : conversion historique record par record (mapping inverse reconstruit et
+  montant converti à chaque record, hash et normalisation du statut recalculés)
+- compile    : mapping compilé une fois (compile_field_mapping) et appliqué page par page
+
+Vérifie que les deux chemins produisent les mêmes deals et les mêmes hashes.
+
+Usage:
+    python benchmark_field_mapping.py
+    python benchmark_field_mapping.py --records 50000 --page-size 100 --repeat 5
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import numbers
+import random
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+# Ajouter le répertoire au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent))
+
+from connectors.airtable import AirtableConnector
+from connectors.field_mapping import (
+    DEFAULT_FIELD_MAPPING, compile_field_mapping, normalize_status
+)
+from connectors.notion import NotionConnector, _extract_notion_value
+
+STATUSES = ['Lead', 'Qualified', 'Negotiation', 'Closed Won', 'Lost', 'prospect', 'gagné', 'In Progress']
+SECTEURS = ['Tech', 'Finance', 'Santé', 'Industrie', 'Retail']
+ASSIGNEES = ['recAssignee000001', 'recAssignee000002', 'recAssignee000003']
+ASSIGNEE_NAMES = {record_id: f"Commercial {i}" for i, record_id in enumerate(ASSIGNEES, 1)}
+
+
+class _KnownNamesResolver:
+    """Résolution des linked records sans requête : noms des commerciaux déjà connus."""
+
+    def resolve(self, raw_records: list) -> dict:
+        return ASSIGNEE_NAMES
+
+
+def _airtable_records(count: int) -> list:
+    rng = random.Random(42)
+    mapping = DEFAULT_FIELD_MAPPING
+    records = []
+    for i in range(count):
+        records.append({'id': f"rec{i:014d}", 'fields': {
+            mapping['client']: f"Client {i}",
+            mapping['statut']: rng.choice(STATUSES),
+            mapping['montant_brut']: str(rng.randint(1_000, 500_000)),
+            mapping['secteur']: rng.choice(SECTEURS),
+            mapping['date_echeance']: f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            mapping['assignee']: [rng.choice(ASSIGNEES)],
+            mapping['notes']: f"Relance {i}",
+        }})
+    return records
+
+
+def _notion_pages(count: int) -> list:
+    rng = random.Random(42)
+    mapping = DEFAULT_FIELD_MAPPING
+    pages = []
+    for i in range(count):
+        pages.append({'id': f"page-{i}", 'properties': {
+            mapping['client']: {'type': 'title', 'title': [{'text': {'content': f"Client {i}"}}]},
+            mapping['statut']: {'type': 'select', 'select': {'name': rng.choice(STATUSES)}},
+            mapping['montant_brut']: {'type': 'number', 'number': rng.randint(1_000, 500_000)},
+            mapping['secteur']: {'type': 'select', 'select': {'name': rng.choice(SECTEURS)}},
+            mapping['date_echeance']: {'type': 'date', 'date': {'start': f"2026-{rng.randint(1, 12):02d}-01"}},
+            mapping['assignee']: {'type': 'rich_text', 'rich_text': [{'text': {'content': "Commercial 1"}}]},
+            mapping['notes']: {'type': 'rich_text', 'rich_text': [{'text': {'content': f"Relance {i}"}}]},
+        }})
+    return pages
+
+
+def _legacy_convert(record: dict, field_mapping: dict) -> dict:
+    """Conversion historique : mapping inverse reconstruit à chaque record."""
+    deal = {}
+    reverse_mapping = {v: k for k, v in field_mapping.items()}
+    for external_field, value in record.items():
+        crm_field = reverse_mapping.get(external_field)
+        if crm_field:
+            deal[crm_field] = value
+    return deal
+
+
+def _legacy_montant(deal: dict) -> None:
+    if deal.get('montant_brut') is not None:
+        try:
+            deal['montant_brut'] = float(deal['montant_brut'])
+        except (ValueError, TypeError):
+            deal['montant_brut'] = None
+
+
+def _legacy_airtable(records: list, field_mapping: dict, connector: AirtableConnector) -> list:
+    deals = []
+    for record in records:
+        fields = record.get('fields', {})
+        flat_record = {external_field: connector._clean_field_value(fields.get(external_field), ASSIGNEE_NAMES)
+                       for external_field in field_mapping.values()}
+        deal = _legacy_convert(flat_record, field_mapping)
+        _legacy_montant(deal)
+        deal['_airtable_id'] = record.get('id')
+        deals.append(deal)
+    return deals
+
+
+def _legacy_notion(pages: list, field_mapping: dict) -> list:
+    deals = []
+    for page in pages:
+        properties = page.get('properties', {})
+        deal = {crm_field: _extract_notion_value(properties.get(external_field))
+                for crm_field, external_field in field_mapping.items()}
+        _legacy_montant(deal)
+        deal['_notion_page_id'] = page.get('id')
+        deals.append(deal)
+    return deals
+
+
+def _legacy_hash_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (numbers.Real, Decimal)):
+        return f"{float(value):.2f}"
+    if isinstance(value, date):
+        return value.isoformat()[:10]
+    text = str(value).strip()
+    return text or None
+
+
+def _legacy_content_hash(deal: dict, field_mapping: dict) -> str:
+    """Hash historique : champs triés et json.dumps à chaque deal."""
+    content = [[crm_field, _legacy_hash_value(deal.get(crm_field))] for crm_field in sorted(field_mapping)]
+    raw = json.dumps(content, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _legacy_path(convert, pages: list, field_mapping: dict) -> list:
+    """Conversion + normalisation du statut + hash, record par record."""
+    results = []
+    for page in pages:
+        for deal in convert(page):
+            results.append((deal, normalize_status(deal.get('statut')), _legacy_content_hash(deal, field_mapping)))
+    return results
+
+
+def _compiled_path(convert, pages: list, field_mapping: dict) -> list:
+    """Conversion page par page avec le mapping compilé une fois."""
+    compiled = compile_field_mapping(field_mapping)
+    results = []
+    for page in pages:
+        for deal in convert(page):
+            results.append((deal, compiled.normalize_status(deal.get('statut')), compiled.content_hash(deal)))
+    return results
+
+
+def _measure(func, repeat: int) -> tuple:
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de la conversion des records (coût par record)")
+    parser.add_argument('--records', type=int, default=20_000, help="Nombre de records (défaut: 20000)")
+    parser.add_argument('--page-size', type=int, default=100, help="Records par page (défaut: 100)")
+    parser.add_argument('--repeat', type=int, default=3, help="Mesures par chemin, meilleure retenue (défaut: 3)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    field_mapping = dict(DEFAULT_FIELD_MAPPING)
+    config = {'api_token': 'bench', 'base_id': 'appBench', 'table_name': 'Deals'}
+    connector = AirtableConnector(config)
+    notion_connector = NotionConnector(config)
+    resolver = _KnownNamesResolver()
+
+    def _paginate(records):
+        return [records[i:i + args.page_size] for i in range(0, len(records), args.page_size)]
+
+    scenarios = [
+        ('airtable', _paginate(_airtable_records(args.records)),
+         lambda page: _legacy_airtable(page, field_mapping, connector),
+         lambda page: connector._convert_records(page, field_mapping, resolver)),
+        ('notion', _paginate(_notion_pages(args.records)),
+         lambda page: _legacy_notion(page, field_mapping),
+         lambda page: notion_connector._pages_to_deals(page, field_mapping)),
+    ]
+
+    print("=" * 64)
+    print(f"CONVERSION DES RECORDS - {args.records:,} records, pages de {args.page_size}")
+    print("=" * 64)
+    print(f"{'Provider':>8} | {'Chemin':<10} | {'Durée(s)':>8} | {'µs/record':>9} | {'Gain':>6}")
+    print("-" * 64)
+
+    for provider, pages, legacy, compiled in scenarios:
+        legacy_time, legacy_result = _measure(lambda: _legacy_path(legacy, pages, field_mapping), args.repeat)
+        compiled_time, compiled_result = _measure(lambda: _compiled_path(compiled, pages, field_mapping), args.repeat)
+        if legacy_result != compiled_result:
+            raise RuntimeError(f"{provider} : les deux chemins ne produisent pas les mêmes deals")
+
+        for path, elapsed in (('par_record', legacy_time), ('compile', compiled_time)):
+            gain = f"x{legacy_time / compiled_time:.2f}" if path == 'compile' else ''
+            print(f"{provider:>8} | {path:<10} | {elapsed:>8.3f} | {elapsed / args.records * 1e6:>9.2f} | {gain:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark du chargement en masse des deals (insert_deals).
+
+Mesure le débit (lignes/seconde) de insert_deals() pour 10k, 100k et 1M deals
+sur la base configurée (DATABASE_URL, sinon SQLite local), et le compare à
+l'ancien chemin executemany (une requête par ligne). Les deals insérés par le
+benchmark sont supprimés à la fin de chaque mesure.
+
+Usage:
+    python benchmark_insert.py                    # 10k, 100k, 1M
+    python benchmark_insert.py --sizes 10000 50000
+    python benchmark_insert.py --no-baseline      # sans la mesure executemany
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le répertoire au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database.connection import init_database, get_connection, get_db_type, close_connection
+from database.crud import insert_deals, _placeholder
+from database.models import TABLE_NAME
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+STATUTS = [('prospect', 0.10), ('qualifié', 0.30), ('négociation', 0.70), ('gagné', 1.00)]
+SECTEURS = ['SaaS', 'Retail', 'Industrie', 'Santé', None]
+ASSIGNEES = ['Alexandre Dubois', 'Marie Laurent', 'Thomas Bernard', None]
+
+
+def generate_deals(n: int):
+    """Génère n deals synthétiques (toutes colonnes métier renseignées ou NULL)."""
+    deals = []
+    for i in range(n):
+        statut, probabilite = STATUTS[i % len(STATUTS)]
+        montant = 1000.0 + (i % 500) * 37.5
+        deals.append({
+            'client': f"Benchmark client {i}",
+            'statut': statut,
+            'montant_brut': montant,
+            'probabilite': probabilite,
+            'valeur_ponderee': round(montant * probabilite, 2),
+            'secteur': SECTEURS[i % len(SECTEURS)],
+            'date_echeance': f"2025-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}",
+            'assignee': ASSIGNEES[i % len(ASSIGNEES)],
+            'notes': 'Deal généré, "guillemets", virgules' if i % 10 == 0 else None
+        })
+    return deals
+
+
+def insert_deals_executemany(deals):
+    """Ancien chemin d'insertion (executemany), pour comparaison."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+    columns = list(deals[0].keys())
+    query = f"INSERT INTO {TABLE_NAME} ({', '.join(columns)}) VALUES ({', '.join(ph for _ in columns)})"
+    cursor.executemany(query, [tuple(deal.get(col) for col in columns) for deal in deals])
+    conn.commit()
+    return len(deals)
+
+
+def _max_id() -> int:
+    cursor = get_connection().cursor()
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {TABLE_NAME}")
+    return cursor.fetchone()[0]
+
+
+def _delete_after(max_id: int) -> None:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM {TABLE_NAME} WHERE id > {_placeholder()}", (max_id,))
+    conn.commit()
+
+
+def measure(insert_fn, deals) -> float:
+    """Retourne le débit (lignes/s) d'une insertion, puis supprime les lignes insérées."""
+    max_id = _max_id()
+    try:
+        start = time.perf_counter()
+        inserted = insert_fn(deals)
+        elapsed = time.perf_counter() - start
+    finally:
+        _delete_after(max_id)
+    return inserted / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du chargement en masse des deals")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Nombres de deals à insérer (défaut: 10000 100000 1000000)")
+    parser.add_argument('--no-baseline', action='store_true',
+                        help="Ne pas mesurer l'ancien chemin executemany")
+    args = parser.parse_args()
+
+    init_database()
+
+    print("=" * 70)
+    print(f"BENCHMARK insert_deals - base {get_db_type()}")
+    print("=" * 70)
+    print(f"{'Deals':>10} | {'insert_deals (l/s)':>20} | {'executemany (l/s)':>20} | {'Gain':>6}")
+    print("-" * 70)
+
+    # Chauffe : la première insertion fait grossir le fichier / les index (non mesurée)
+    measure(insert_deals, generate_deals(min(args.sizes)))
+
+    for size in args.sizes:
+        deals = generate_deals(size)
+        bulk_rate = measure(insert_deals, deals)
+
+        if args.no_baseline:
+            print(f"{size:>10,} | {bulk_rate:>20,.0f} | {'-':>20} | {'-':>6}")
+            continue
+
+        baseline_rate = measure(insert_deals_executemany, deals)
+        print(f"{size:>10,} | {bulk_rate:>20,.0f} | {baseline_rate:>20,.0f} | "
+              f"{bulk_rate / baseline_rate:>5.1f}x")
+
+    close_connection()
+
+
+if __name__ == '__main__':
+    main()
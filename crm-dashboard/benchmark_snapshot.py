@@ -0,0 +1,106 @@
+"""
+Benchmark des lectures filtrées de deals : base de données vs snapshot mémoire.
+
+Pour 10k et 100k deals, mesure pour chaque filtre des analytics :
+- sql      : get_filtered_deals (requête + DataFrame + conversion des Decimal)
+- masque   : calcul du masque booléen sur les colonnes du snapshot
+- snapshot : deal_snapshot.select (masque + DataFrame au format de get_filtered_deals)
+
+ainsi que le chargement initial du snapshot et le coût d'une écriture (update_deal)
+avec mise à jour incrémentale. Vérifie que snapshot et base retournent les mêmes deals.
+Par défaut, la base est un fichier SQLite temporaire.
+
+Usage:
+    python benchmark_snapshot.py
+    python benchmark_snapshot.py --sizes 50000 --repeat 20
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ajouter le répertoire au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent))
+
+DEFAULT_SIZES = [10_000, 100_000]
+
+# Filtres représentatifs des paramètres de _get_deals() (api/analytics.py)
+FILTERS = {
+    'aucun': {},
+    'statut': {'statut': ['gagné']},
+    'secteur+assignee': {'secteur': ['SaaS', 'Retail'], 'assignee': ['Marie Laurent']},
+    'dates': {'date_from': '2025-03-01', 'date_to': '2025-06-30'},
+    'recherche': {'search': 'client 42'},
+}
+
+
+def _best_ms(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_size(size: int, repeat: int) -> None:
+    import pandas as pd
+    from benchmark_insert import generate_deals
+    from database.crud import (
+        clear_all_deals, get_all_deals, get_data_version, get_filtered_deals, insert_deals, update_deal
+    )
+    from database.snapshot import deal_snapshot
+
+    clear_all_deals()
+    insert_deals(generate_deals(size))
+    load_ms = _best_ms(lambda: deal_snapshot.load(get_data_version()), 1)
+    print(f"{size:>7,} | {'chargement':<16} | {'':>9} | {'':>9} | {load_ms:>10.2f} | {'':>6}")
+
+    for name, params in FILTERS.items():
+        # Sans ORDER BY, l'ordre des lignes SQL dépend de l'index utilisé : comparaison par id
+        expected = get_filtered_deals(params) if params else get_all_deals()
+        pd.testing.assert_frame_equal(expected.sort_values('id', ignore_index=True),
+                                      deal_snapshot.select(params, get_data_version()))
+
+        sql_ms = _best_ms(lambda: get_filtered_deals(params) if params else get_all_deals(), repeat)
+        mask_ms = _best_ms(lambda: deal_snapshot._mask(params), repeat)
+        snapshot_ms = _best_ms(lambda: deal_snapshot.select(params, get_data_version()), repeat)
+        print(f"{size:>7,} | {name:<16} | {sql_ms:>9.2f} | {mask_ms:>9.3f} | {snapshot_ms:>10.2f} | "
+              f"x{sql_ms / snapshot_ms:>5.1f}")
+
+    deal_id = int(get_all_deals()['id'].iloc[size // 2])
+    statuts = iter(['prospect', 'gagné'] * repeat)
+    write_ms = _best_ms(lambda: update_deal(deal_id, {'statut': next(statuts)}), repeat)
+    print(f"{size:>7,} | {'update_deal':<16} | {'':>9} | {'':>9} | {write_ms:>10.2f} | {'':>6}")
+    clear_all_deals()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des lectures filtrées : base vs snapshot mémoire")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Nombres de deals (défaut: 10000 100000)")
+    parser.add_argument('--repeat', type=int, default=10, help="Mesures par lecture, meilleure retenue (défaut: 10)")
+    args = parser.parse_args()
+
+    # Snapshot activé et base SQLite temporaire (à positionner avant l'import des modules database)
+    os.environ['DEAL_SNAPSHOT_ENABLED'] = '1'
+    os.environ['DATABASE_URL'] = ''
+    os.environ['SQLITE_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='crm-bench-'), 'bench.db')
+
+    from database.connection import init_database, get_db_type
+
+    init_database()
+    print("=" * 76)
+    print(f"BENCHMARK lectures filtrées - base {get_db_type()} - durées en ms (meilleure de {args.repeat})")
+    print("=" * 76)
+    print(f"{'Deals':>7} | {'Filtre':<16} | {'sql':>9} | {'masque':>9} | {'snapshot':>10} | {'Gain':>6}")
+    print("-" * 76)
+    for size in args.sizes:
+        run_size(size, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
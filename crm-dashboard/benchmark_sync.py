@@ -0,0 +1,246 @@
+"""
+Benchmark du débit des connecteurs Airtable / Notion contre le serveur factice local.
+
+Pour chaque provider et chaque volume (1k, 10k, 100k records), mesure :
+- fetch_records : lecture paginée de la table distante (conversion en deals comprise)
+- sync_import   : import complet via l'API (job d'arrière-plan, upserts en base)
+- sync_export   : export complet via l'API (rapprochement et mises à jour distantes)
+- webhook       : import des records modifiés (1 %) signalés par notifications webhook
+- poll_import   : import incrémental des mêmes modifications par lecture filtrée (polling)
+- push_records  : création des deals dans une table distante vide
+
+et affiche la durée, le nombre de requêtes HTTP, les requêtes/s, les records/s et les
+réponses 429 reçues. Par défaut, la base est un fichier SQLite temporaire et les limites
+de débit sont levées (mesure du coût propre aux connecteurs) ; --realistic applique les
+quotas des providers côté serveur et client (5 req/s Airtable, 3 req/s Notion).
+
+Usage:
+    python benchmark_sync.py                          # 1k, 10k, 100k, Airtable et Notion
+    python benchmark_sync.py --sizes 1000 --providers airtable
+    python benchmark_sync.py --realistic --sizes 200
+    python benchmark_sync.py --server-rate 50         # limite serveur sous le débit client : 429
+    python benchmark_sync.py --realistic --latency 400 --providers notion --sizes 300
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ajouter le répertoire au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_connector_server import (
+    FakeConnectorServer, DEALS_TABLE_NAME, AIRTABLE_WEBHOOK_ID, NOTION_DATABASE_ID
+)
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+PROVIDERS = ['airtable', 'notion']
+# Quotas réels des providers (requêtes/seconde)
+PROVIDER_RATE_LIMITS = {'airtable': 5.0, 'notion': 3.0}
+# Part des records modifiés à la source entre deux synchronisations (phases webhook / poll_import)
+CHANGED_RATIO = 0.01
+WEBHOOK_SECRETS = {'airtable': base64.b64encode(b'bench-webhook-secret').decode(), 'notion': 'bench-webhook-secret'}
+
+
+def _configure_environment(args, server: FakeConnectorServer) -> None:
+    """Oriente connecteurs et base vers l'environnement de benchmark (avant leur import)."""
+    os.environ['AIRTABLE_API_BASE'] = f"{server.base_url}/v0"
+    os.environ['NOTION_API_BASE'] = f"{server.base_url}/v1"
+    os.environ['SYNC_SCHEDULER_ENABLED'] = '0'
+    if not args.use_configured_db:
+        # Une valeur vide n'est pas écrasée par le .env : la base SQLite temporaire est utilisée
+        os.environ['DATABASE_URL'] = ''
+        os.environ['SQLITE_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='crm-bench-'), 'bench.db')
+
+
+def _wait_for_job(client, job_id: int) -> dict:
+    while True:
+        job = client.get(f'/api/jobs/{job_id}').get_json()['data']
+        if job['status'] not in ('pending', 'running'):
+            return job
+        time.sleep(0.05)
+
+
+def _webhook_notifications(provider: str, record_ids: list, page_ids: list) -> list:
+    """Corps et en-têtes signés des notifications qu'enverrait le provider."""
+    if provider == 'airtable':
+        bodies = [{'base': {'id': 'appBench'}, 'webhook': {'id': AIRTABLE_WEBHOOK_ID},
+                   'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())}]
+        key, header, prefix = base64.b64decode(WEBHOOK_SECRETS['airtable']), 'X-Airtable-Content-MAC', 'hmac-sha256='
+    else:
+        bodies = [{'type': 'page.properties_updated', 'entity': {'id': page_id, 'type': 'page'},
+                   'data': {'parent': {'id': NOTION_DATABASE_ID, 'type': 'database'}}} for page_id in page_ids]
+        key, header, prefix = WEBHOOK_SECRETS['notion'].encode(), 'X-Notion-Signature', 'sha256='
+
+    notifications = []
+    for body in bodies:
+        raw = json.dumps(body).encode('utf-8')
+        signature = prefix + hmac.new(key, raw, hashlib.sha256).hexdigest()
+        notifications.append((raw, {header: signature, 'Content-Type': 'application/json'}))
+    return notifications
+
+
+def _deliver_webhooks(client, provider: str, notifications: list) -> None:
+    """Envoie les notifications à l'application et attend que la file webhook soit vidée."""
+    from api.scheduler import run_pending_webhook_syncs
+    from api.sync import WEBHOOK_MAX_ATTEMPTS
+    from database.crud import count_webhook_queue
+
+    job_ids = []
+    for raw, headers in notifications:
+        resp = client.post(f'/api/sync/{provider}/webhook', data=raw, headers=headers)
+        if resp.status_code != 202:
+            raise RuntimeError(f"Webhook {provider} refusé : {resp.get_json()}")
+        if resp.get_json().get('job_id'):
+            job_ids.append(resp.get_json()['job_id'])
+
+    # Notifications reçues pendant le job précédent : reprises comme par le planificateur
+    while job_ids:
+        for job_id in job_ids:
+            job = _wait_for_job(client, job_id)
+            if job['status'] not in ('success', 'partial'):
+                raise RuntimeError(f"Import webhook {provider} en échec : {job.get('error_message')}")
+        job_ids = run_pending_webhook_syncs() if count_webhook_queue(WEBHOOK_MAX_ATTEMPTS).get(provider) else []
+
+
+class PhaseTimer:
+    """Mesure une phase : durée et requêtes reçues par le serveur factice pour le provider."""
+
+    def __init__(self, server: FakeConnectorServer, provider: str):
+        self.server = server
+        self.provider = provider
+
+    def __enter__(self):
+        self.server.state.reset_stats()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        stats = self.server.state.snapshot_stats().get(self.provider, {})
+        self.requests = stats.get('requests', 0)
+        self.throttled = stats.get('throttled', 0)
+        return False
+
+
+def _report(provider: str, size: int, phase: str, timer: PhaseTimer, records: int) -> None:
+    elapsed = max(timer.elapsed, 1e-9)
+    print(f"{provider:>8} | {size:>7,} | {phase:<13} | {timer.elapsed:>8.2f} | {timer.requests:>8,} | "
+          f"{timer.requests / elapsed:>8,.0f} | {records / elapsed:>9,.0f} | {timer.throttled:>5,}")
+
+
+def run_provider(server: FakeConnectorServer, client, provider: str, size: int) -> None:
+    from api.sync import _get_connector
+    from connectors.field_mapping import DEFAULT_FIELD_MAPPING
+    from database.crud import get_connector_config, get_all_deals
+
+    state = server.state
+    state.reset(size)
+    base_id = 'appBench' if provider == 'airtable' else NOTION_DATABASE_ID
+    client.put(f'/api/connectors/config/{provider}',
+               json={'api_token': 'bench', 'base_id': base_id, 'table_name': DEALS_TABLE_NAME,
+                     'webhook_secret': WEBHOOK_SECRETS[provider]})
+    connector = _get_connector(provider, get_connector_config(provider))
+
+    with PhaseTimer(server, provider) as timer:
+        fetched = connector.fetch_records(DEFAULT_FIELD_MAPPING)
+    _report(provider, size, 'fetch_records', timer, len(fetched))
+
+    client.delete('/api/deals')
+    with PhaseTimer(server, provider) as timer:
+        job = _wait_for_job(client, client.post(f'/api/sync/{provider}/import?full=1').get_json()['data']['id'])
+    if job['status'] not in ('success', 'partial'):
+        raise RuntimeError(f"Import {provider} en échec : {job.get('error_message')}")
+    _report(provider, size, 'sync_import', timer, job['rows_processed'])
+
+    # Mêmes modifications à la source importées par webhook, puis relues par polling
+    changed = max(1, int(size * CHANGED_RATIO))
+    record_ids, page_ids = state.modify_records(changed)
+    notifications = _webhook_notifications(provider, record_ids, page_ids)
+    with PhaseTimer(server, provider) as timer:
+        _deliver_webhooks(client, provider, notifications)
+    _report(provider, size, 'webhook', timer, changed)
+
+    with PhaseTimer(server, provider) as timer:
+        job = _wait_for_job(client, client.post(f'/api/sync/{provider}/import').get_json()['data']['id'])
+    if job['status'] not in ('success', 'partial'):
+        raise RuntimeError(f"Import incrémental {provider} en échec : {job.get('error_message')}")
+    _report(provider, size, 'poll_import', timer, job['rows_processed'])
+
+    with PhaseTimer(server, provider) as timer:
+        result = client.post(f'/api/sync/{provider}/export?full=1').get_json()
+    if not result.get('success'):
+        raise RuntimeError(f"Export {provider} en échec : {result.get('error')}")
+    _report(provider, size, 'sync_export', timer, result['records_processed'])
+
+    deals = get_all_deals().to_dict('records')
+    state.reset(0)
+    with PhaseTimer(server, provider) as timer:
+        pushed = connector.push_records(deals, DEFAULT_FIELD_MAPPING)
+    _report(provider, size, 'push_records', timer, pushed['records_created'])
+
+    client.delete('/api/deals')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du débit des connecteurs (serveur factice)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Nombres de records (défaut: 1000 10000 100000)")
+    parser.add_argument('--providers', nargs='+', choices=PROVIDERS, default=PROVIDERS)
+    parser.add_argument('--realistic', action='store_true',
+                        help="Quotas réels des providers côté serveur (429) et côté client")
+    parser.add_argument('--client-rate', type=float, default=1000.0,
+                        help="Débit client (req/s) hors --realistic (défaut: 1000)")
+    parser.add_argument('--server-rate', type=float, default=0.0,
+                        help="Requêtes/s acceptées par le serveur avant 429 hors --realistic (0 : illimité)")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Latence (ms) ajoutée par le serveur à chaque réponse (défaut: 0)")
+    parser.add_argument('--use-configured-db', action='store_true',
+                        help="Utiliser la base configurée (DATABASE_URL / SQLite local) : "
+                             "ses deals et configurations de connecteurs sont remplacés")
+    args = parser.parse_args()
+
+    rate_limits = (PROVIDER_RATE_LIMITS if args.realistic
+                   else {provider: args.server_rate for provider in PROVIDERS})
+    server = FakeConnectorServer(rate_limits=rate_limits, latency=args.latency / 1000).start()
+    _configure_environment(args, server)
+    logging.basicConfig(level=logging.ERROR)
+
+    from app import app
+    from connectors.airtable import AirtableConnector
+    from connectors.notion import NotionConnector
+    from database.connection import get_db_type
+
+    if not args.realistic:
+        for connector_class in (AirtableConnector, NotionConnector):
+            connector_class.RATE_LIMIT = args.client_rate
+            connector_class.RATE_BURST = args.client_rate
+
+    print("=" * 92)
+    print(f"BENCHMARK connecteurs - serveur {server.base_url} - base {get_db_type()}"
+          f"{' - quotas réels' if args.realistic else ''}")
+    print("=" * 92)
+    print(f"{'Provider':>8} | {'Records':>7} | {'Phase':<13} | {'Durée(s)':>8} | {'Requêtes':>8} | "
+          f"{'Req/s':>8} | {'Records/s':>9} | {'429':>5}")
+    print("-" * 92)
+
+    client = app.test_client()
+    with app.app_context():
+        try:
+            for provider in args.providers:
+                for size in args.sizes:
+                    run_provider(server, client, provider, size)
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -51,6 +51,44 @@ def calculate_weighted_value(montant_brut: float, probabilite: float) -> float:
     return round(montant_brut * probabilite, 2)
 
 
+def calculate_probabilities(statuts: pd.Series) -> pd.Series:
+    """
+    Version vectorisée de calculate_probability sur une colonne de statuts.
+
+    Args:
+        statuts: Colonne des statuts
+
+    Returns:
+        pd.Series: Probabilités de conversion (0.10 par défaut si statut non reconnu)
+    """
+    normalized = statuts.fillna('').astype(str).str.lower().str.strip()
+    probabilities = normalized.map(PROBABILITY_MAP)
+
+    # Un seul warning par lot plutôt qu'un par ligne
+    unknown = probabilities.isna()
+    if unknown.any():
+        logger.warning(
+            f"{int(unknown.sum())} statut(s) non reconnu(s) "
+            f"({', '.join(map(repr, normalized[unknown].unique()[:5]))}). Probabilité par défaut: 0.10"
+        )
+
+    return probabilities.fillna(0.10).astype(float)
+
+
+def calculate_weighted_values(montants: pd.Series, probabilites: pd.Series) -> pd.Series:
+    """
+    Version vectorisée de calculate_weighted_value.
+
+    Args:
+        montants: Colonne des montants bruts
+        probabilites: Colonne des probabilités (même index)
+
+    Returns:
+        pd.Series: Valeurs pondérées arrondies à 2 décimales
+    """
+    return (montants.astype(float) * probabilites).round(2)
+
+
 def calculate_total_pipeline(deals_df: pd.DataFrame) -> float:
     """
     Calcule le pipeline pondéré total (somme des valeurs pondérées).
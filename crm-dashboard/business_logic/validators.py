@@ -22,6 +22,17 @@ class ValidationError:
         return f"Ligne {self.row_number} - {self.field}: {self.message}"
 
 
+# Colonnes du rapport d'erreurs vectorisé (une ligne par erreur)
+ERROR_FRAME_COLUMNS = ['row_number', 'field', 'message']
+
+# Messages partagés par la validation ligne à ligne et la validation vectorisée
+_MSG_CLIENT_EMPTY = 'Le nom du client ne peut pas être vide'
+_MSG_STATUT_INVALID = f'Statut invalide. Valeurs acceptées: {", ".join(VALID_STATUSES)}'
+_MSG_MONTANT_NEGATIVE = 'Le montant doit être supérieur à 0'
+_MSG_MONTANT_NAN = 'Le montant doit être un nombre valide'
+_MSG_DATE_INVALID = 'Format de date invalide. Formats acceptés: YYYY-MM-DD, DD/MM/YYYY'
+
+
 def validate_csv_structure(df: pd.DataFrame) -> Tuple[bool, List[str]]:
     """
     Valide la structure du DataFrame CSV (colonnes requises présentes).
@@ -68,7 +79,7 @@ def validate_deal_row(row: pd.Series, row_number: int) -> List[ValidationError]:
         errors.append(ValidationError(
             row_number,
             'client',
-            'Le nom du client ne peut pas être vide'
+            _MSG_CLIENT_EMPTY
         ))
 
     # Validation 2: Statut valide (case-insensitive)
@@ -77,7 +88,7 @@ def validate_deal_row(row: pd.Series, row_number: int) -> List[ValidationError]:
         errors.append(ValidationError(
             row_number,
             'statut',
-            f'Statut invalide. Valeurs acceptées: {", ".join(VALID_STATUSES)}'
+            _MSG_STATUT_INVALID
         ))
 
     # Validation 3: Montant > 0
@@ -87,13 +98,13 @@ def validate_deal_row(row: pd.Series, row_number: int) -> List[ValidationError]:
             errors.append(ValidationError(
                 row_number,
                 'montant_brut',
-                'Le montant doit être supérieur à 0'
+                _MSG_MONTANT_NEGATIVE
             ))
     except (ValueError, TypeError):
         errors.append(ValidationError(
             row_number,
             'montant_brut',
-            'Le montant doit être un nombre valide'
+            _MSG_MONTANT_NAN
         ))
 
     # Validation 4: Date échéance valide (si présente)
@@ -104,12 +115,143 @@ def validate_deal_row(row: pd.Series, row_number: int) -> List[ValidationError]:
             errors.append(ValidationError(
                 row_number,
                 'date_echeance',
-                'Format de date invalide. Formats acceptés: YYYY-MM-DD, DD/MM/YYYY'
+                _MSG_DATE_INVALID
             ))
 
     return errors
 
 
+def _column_or_na(df: pd.DataFrame, column: str) -> pd.Series:
+    """Retourne la colonne demandée, ou une colonne vide si elle est absente."""
+    if column in df.columns:
+        return df[column]
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def clean_text(df: pd.DataFrame, column: str) -> pd.Series:
+    """Colonne texte nettoyée (strip), None pour les valeurs absentes ou la colonne manquante."""
+    result = pd.Series(None, index=df.index, dtype=object)
+    if column in df.columns:
+        present = df[column].dropna()
+        result.loc[present.index] = present.astype(str).str.strip()
+    return result
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """
+    Version vectorisée de parse_date : convertit une colonne de dates en ISO (YYYY-MM-DD).
+
+    Les valeurs au format ISO sont converties en une passe ; les autres formats
+    passent par parse_date une seule fois par valeur distincte.
+
+    Args:
+        values: Colonne de dates (strings, NaN pour les valeurs absentes)
+
+    Returns:
+        pd.Series: Dates ISO, None si absentes ou non parsables
+    """
+    result = pd.Series(None, index=values.index, dtype=object)
+    present = values.dropna()
+    if present.empty:
+        return result
+
+    cleaned = present.astype(str).str.strip()
+    iso_shaped = cleaned.str.match(r'^.{4}-.{2}-.{2}$')
+
+    # Format ISO : parsing strict, comme parse_date (pas de repli dateutil)
+    iso = pd.to_datetime(cleaned[iso_shaped], format='%Y-%m-%d', errors='coerce')
+    result.loc[iso.index] = iso.dt.strftime('%Y-%m-%d').where(iso.notna(), None)
+
+    # Autres formats : dateutil, une fois par valeur distincte
+    others = cleaned[~iso_shaped & (cleaned != '')]
+    if not others.empty:
+        parsed = {value: parse_date(value) for value in others.unique()}
+        result.loc[others.index] = others.map(parsed)
+
+    return result
+
+
+def validate_deals_frame(df: pd.DataFrame, first_row_number: int = 1) -> Tuple[pd.Series, pd.DataFrame]:
+    """
+    Valide toutes les lignes d'un DataFrame de deals en une passe par colonne.
+    Applique les mêmes règles métier que validate_deal_row.
+
+    Args:
+        df: DataFrame aux colonnes du schéma (client, statut, montant_brut, date_echeance)
+        first_row_number: Numéro de ligne (reporting) de la première ligne du DataFrame
+
+    Returns:
+        Tuple[pd.Series, pd.DataFrame]: (masque booléen des lignes valides,
+            erreurs avec colonnes row_number, field, message triées par ligne)
+    """
+    row_numbers = pd.Series(range(first_row_number, first_row_number + len(df)), index=df.index)
+
+    # Validation 1: Client non vide
+    client = _column_or_na(df, 'client')
+    client_invalid = client.isna() | (client.astype(str).str.strip() == '')
+
+    # Validation 2: Statut valide (case-insensitive)
+    statut = _column_or_na(df, 'statut').fillna('').astype(str).str.strip().str.lower()
+    statut_invalid = ~statut.isin(VALID_STATUSES)
+
+    # Validation 3: Montant numérique et > 0
+    montant = pd.to_numeric(_column_or_na(df, 'montant_brut'), errors='coerce')
+    montant_nan = montant.isna()
+    montant_negative = ~montant_nan & (montant <= 0)
+
+    # Validation 4: Date échéance valide (si présente)
+    date_echeance = _column_or_na(df, 'date_echeance')
+    date_invalid = date_echeance.notna() & parse_dates(date_echeance).isna()
+
+    # Ordre des règles identique à validate_deal_row
+    checks = [
+        (client_invalid, 'client', _MSG_CLIENT_EMPTY),
+        (statut_invalid, 'statut', _MSG_STATUT_INVALID),
+        (montant_negative, 'montant_brut', _MSG_MONTANT_NEGATIVE),
+        (montant_nan, 'montant_brut', _MSG_MONTANT_NAN),
+        (date_invalid, 'date_echeance', _MSG_DATE_INVALID),
+    ]
+
+    frames = []
+    for order, (invalid, field, message) in enumerate(checks):
+        if invalid.any():
+            frames.append(pd.DataFrame({
+                'row_number': row_numbers[invalid].values,
+                'field': field,
+                'message': message,
+                '_order': order
+            }))
+
+    valid_mask = ~(client_invalid | statut_invalid | montant_nan | montant_negative | date_invalid)
+
+    if not frames:
+        return valid_mask, pd.DataFrame(columns=ERROR_FRAME_COLUMNS)
+
+    errors_df = (
+        pd.concat(frames, ignore_index=True)
+        .sort_values(['row_number', '_order'], kind='stable')
+        .drop(columns='_order')
+        .reset_index(drop=True)
+    )
+    return valid_mask, errors_df
+
+
+def errors_from_frame(errors_df: pd.DataFrame) -> List[ValidationError]:
+    """
+    Convertit un rapport d'erreurs vectorisé en liste de ValidationError.
+
+    Args:
+        errors_df: DataFrame retourné par validate_deals_frame
+
+    Returns:
+        List[ValidationError]: Erreurs dans l'ordre du rapport
+    """
+    return [
+        ValidationError(int(row_number), field, message)
+        for row_number, field, message in errors_df[ERROR_FRAME_COLUMNS].itertuples(index=False)
+    ]
+
+
 def parse_date(date_str: str) -> Optional[str]:
     """
     Parse une date string en supportant plusieurs formats.
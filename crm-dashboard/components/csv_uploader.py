@@ -7,8 +7,11 @@ import streamlit as st
 import pandas as pd
 from typing import List
 from business_logic.filters import normalize_column_names, map_csv_to_schema
-from business_logic.validators import validate_csv_structure, validate_deal_row, ValidationError, parse_date
-from business_logic.calculators import calculate_probability, calculate_weighted_value
+from business_logic.validators import (
+    validate_csv_structure, validate_deals_frame, errors_from_frame, clean_text, parse_dates,
+    ValidationError
+)
+from business_logic.calculators import calculate_probabilities, calculate_weighted_values
 from database.crud import insert_deals, clear_all_deals
 
 
@@ -143,7 +146,7 @@ def _parse_csv_file(uploaded_file) -> pd.DataFrame:
 
 def _validate_and_calculate(df: pd.DataFrame) -> tuple[List[dict], List[ValidationError]]:
     """
-    Valide chaque ligne et calcule probabilité + valeur pondérée pour les lignes valides.
+    Valide toutes les lignes et calcule probabilité + valeur pondérée pour les lignes valides.
 
     Args:
         df: DataFrame avec colonnes mappées
@@ -151,41 +154,31 @@ def _validate_and_calculate(df: pd.DataFrame) -> tuple[List[dict], List[Validati
     Returns:
         Tuple[List[dict], List[ValidationError]]: (deals valides, erreurs)
     """
-    valid_deals = []
-    all_errors = []
-
-    for idx, row in df.iterrows():
-        # Validation de la ligne
-        errors = validate_deal_row(row, idx + 2)  # +2 car ligne 1 = headers
-
-        if not errors:
-            # Calcul probabilité
-            probabilite = calculate_probability(row['statut'])
-
-            # Calcul valeur pondérée
-            valeur_ponderee = calculate_weighted_value(row['montant_brut'], probabilite)
-
-            # Parser date si présente
-            date_echeance = parse_date(str(row.get('date_echeance', ''))) if pd.notna(row.get('date_echeance')) else None
-
-            # Créer dictionnaire deal
-            deal = {
-                'client': str(row['client']).strip(),
-                'statut': str(row['statut']).strip(),
-                'montant_brut': float(row['montant_brut']),
-                'probabilite': probabilite,
-                'valeur_ponderee': valeur_ponderee,
-                'secteur': str(row.get('secteur', '')).strip() if pd.notna(row.get('secteur')) else None,
-                'date_echeance': date_echeance,
-                'assignee': str(row.get('assignee', '')).strip() if pd.notna(row.get('assignee')) else None,
-                'notes': str(row.get('notes', '')).strip() if pd.notna(row.get('notes')) else None
-            }
-
-            valid_deals.append(deal)
-        else:
-            all_errors.extend(errors)
-
-    return valid_deals, all_errors
+    # Validation par colonnes (+2 car ligne 1 = headers)
+    valid_mask, errors_df = validate_deals_frame(df, 2)
+    all_errors = errors_from_frame(errors_df)
+
+    valid = df[valid_mask]
+    if valid.empty:
+        return [], all_errors
+
+    # Calcul probabilité et valeur pondérée
+    montant_brut = pd.to_numeric(valid['montant_brut']).astype(float)
+    probabilite = calculate_probabilities(valid['statut'])
+
+    deals = pd.DataFrame({
+        'client': valid['client'].astype(str).str.strip(),
+        'statut': valid['statut'].astype(str).str.strip(),
+        'montant_brut': montant_brut,
+        'probabilite': probabilite,
+        'valeur_ponderee': calculate_weighted_values(montant_brut, probabilite),
+        'secteur': clean_text(valid, 'secteur'),
+        'date_echeance': parse_dates(clean_text(valid, 'date_echeance')),
+        'assignee': clean_text(valid, 'assignee'),
+        'notes': clean_text(valid, 'notes')
+    })
+
+    return deals.to_dict('records'), all_errors
 
 
 def _display_error_report(errors: List[ValidationError]):
@@ -1,27 +1,116 @@
 """
 Connecteur Airtable : synchronisation bidirectionnelle des deals via API REST.
-Utilise requests directement (compatible Python 3.14).
+Utilise requests directement (compatible Python 3.14), via la couche HTTP de BaseConnector.
 """
 
+import base64
+import hashlib
+import hmac
 import logging
-import time
-from typing import Any, Dict, List
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import requests
 
-from .base import BaseConnector
-from .field_mapping import convert_external_to_crm, convert_crm_to_external
+from database.crud import get_record_name_table_state, get_record_names, save_record_names
+from .base import BaseConnector, RecordPage
+from .field_mapping import compile_field_mapping, convert_crm_to_external, get_field_mapping
 
 logger = logging.getLogger(__name__)
 
-AIRTABLE_API_BASE = "https://api.airtable.com/v0"
+# Surchargeable pour viser un serveur local (fake_connector_server.py)
+AIRTABLE_API_BASE = os.environ.get('AIRTABLE_API_BASE', "https://api.airtable.com/v0")
+
+# Nombre maximal de records par requête de création / mise à jour
+AIRTABLE_BATCH_SIZE = 10
+
+# Taille de page maximale d'une lecture Airtable
+AIRTABLE_PAGE_SIZE = 100
+
+# Cache persistant des noms de linked records : rechargement complet d'une table après
+# RECORD_NAME_CACHE_TTL secondes, rafraîchissement incrémental entre-temps si un ID est inconnu
+RECORD_NAME_CACHE_TTL = int(os.environ.get('AIRTABLE_NAME_CACHE_TTL', 86400))
+RECORD_NAME_REFRESH_OVERLAP = timedelta(minutes=2)
+AIRTABLE_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.000Z'
+
+# Records relus par requête (formule OR(RECORD_ID()=...)) lors d'un import webhook
+AIRTABLE_IDS_PER_FORMULA = 50
+AIRTABLE_RECORD_ID = re.compile(r'rec[A-Za-z0-9]{14}')
+# En-tête de signature des notifications webhook (HMAC-SHA256 du corps, secret macSecretBase64)
+AIRTABLE_WEBHOOK_MAC_HEADER = 'X-Airtable-Content-MAC'
+
+
+def _parse_airtable_timestamp(value: str) -> datetime:
+    return datetime.strptime(value, AIRTABLE_TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+
+
+class _LinkedRecordResolver:
+    """
+    Résout les IDs de linked records des pages lues lors d'un import : le schéma de la
+    base est lu une fois (à la première page contenant des liens) et chaque table liée
+    est chargée une fois depuis le cache persistant, puis complétée au besoin.
+    """
+
+    def __init__(self, connector: 'AirtableConnector', field_mapping: Dict[str, str]):
+        self.connector = connector
+        self.field_mapping = field_mapping
+        self.mapped_fields = set(field_mapping.values())
+        self.linked = None
+        self.names: Dict[str, str] = {}
+        self.refreshed_tables: Set[str] = set()
+        self.failed = False
+
+    def resolve(self, raw_records: List[Dict]) -> Dict[str, str]:
+        """Retourne le dictionnaire ID → nom couvrant les linked records d'une page."""
+        if self.failed:
+            return self.names
+        has_links = any(
+            isinstance(value, list) and any(isinstance(item, str) and item.startswith('rec') for item in value)
+            for record in raw_records
+            for field, value in record.get('fields', {}).items() if field in self.mapped_fields
+        )
+        if not has_links:
+            return self.names
+
+        try:
+            if self.linked is None:
+                self.linked = self.connector._linked_tables(self.field_mapping)
+
+            ids_by_table = {}
+            for record in raw_records:
+                fields = record.get('fields', {})
+                for field_name, link in self.linked.items():
+                    record_ids = ids_by_table.setdefault((link['table_id'], link['primary_field']), set())
+                    record_ids.update(item for item in fields.get(field_name) or [] if isinstance(item, str))
+
+            # Table relue depuis le cache quand un ID est inconnu ; l'API est interrogée au plus
+            # une fois par table et par import (les IDs toujours inconnus restent affichés tels quels)
+            for (table_id, primary_field), record_ids in ids_by_table.items():
+                if table_id in self.refreshed_tables or record_ids <= self.names.keys():
+                    continue
+                names, refreshed = self.connector._cached_record_names(table_id, primary_field, record_ids)
+                self.names.update(names)
+                if refreshed:
+                    self.refreshed_tables.add(table_id)
+        except Exception as e:
+            self.failed = True
+            logger.warning(f"Impossible de résoudre les linked records: {e}")
+
+        return self.names
 
 
 class AirtableConnector(BaseConnector):
 
-    def __init__(self, config: Dict[str, Any]):
-        super().__init__(config)
-        self._record_name_cache = None
+    PROVIDER = 'airtable'
+    EXTERNAL_ID_FIELD = '_airtable_id'
+    # Quota Airtable : 5 requêtes/seconde par base (dépassement = 30 s de blocage)
+    RATE_LIMIT = 5.0
+    RATE_BURST = 1.0
+
+    # Résolveur des relectures par ID, conservé d'un lot à l'autre (schéma lu une fois)
+    _ids_resolver: Optional[_LinkedRecordResolver] = None
 
     def _headers(self):
         return {
@@ -29,74 +118,114 @@ class AirtableConnector(BaseConnector):
             "Content-Type": "application/json"
         }
 
-    def _table_url(self):
-        return f"{AIRTABLE_API_BASE}/{self.base_id}/{requests.utils.quote(self.table_name)}"
+    def _rate_limit_key(self) -> str:
+        return self.base_id
 
-    def _get_all_records(self) -> List[Dict]:
-        """Récupère tous les records avec pagination."""
-        records = []
-        offset = None
+    def _table_url(self, table: Optional[str] = None):
+        return f"{AIRTABLE_API_BASE}/{self.base_id}/{requests.utils.quote(table or self.table_name)}"
+
+    def _iter_pages(self, extra_params: Optional[Dict[str, Any]] = None,
+                    table: Optional[str] = None, offset: Optional[str] = None) -> Iterator[RecordPage]:
+        """
+        Parcourt les records page par page (filtres / champs optionnels via extra_params),
+        de la table configurée ou d'une autre table de la base (nom ou ID), à partir
+        de l'offset d'une lecture précédente si fourni.
+        """
         while True:
-            params = {}
+            params = dict(extra_params or {})
             if offset:
                 params['offset'] = offset
-            resp = requests.get(self._table_url(), headers=self._headers(), params=params)
+            resp = self._request('GET', self._table_url(table), params=params)
             resp.raise_for_status()
             data = resp.json()
-            records.extend(data.get('records', []))
             offset = data.get('offset')
+            yield RecordPage(data.get('records', []), offset)
             if not offset:
-                break
-        return records
-
-    def _build_record_name_cache(self) -> Dict[str, str]:
-        """Construit un cache ID → nom pour résoudre les linked records."""
-        if self._record_name_cache is not None:
-            return self._record_name_cache
-
-        self._record_name_cache = {}
-        try:
-            resp = requests.get(
-                f"{AIRTABLE_API_BASE}/meta/bases/{self.base_id}/tables",
-                headers=self._headers()
-            )
-            resp.raise_for_status()
-            tables = resp.json().get('tables', [])
-
-            for table in tables:
-                table_name = table['name']
-                if table_name == self.table_name:
-                    continue
-                fields = table.get('fields', [])
-                if not fields:
-                    continue
-                primary_field = fields[0]['name']
-
-                offset = None
-                while True:
-                    params = {}
-                    if offset:
-                        params['offset'] = offset
-                    r = requests.get(
-                        f"{AIRTABLE_API_BASE}/{self.base_id}/{requests.utils.quote(table_name)}",
-                        headers=self._headers(), params=params
-                    )
-                    if r.status_code != 200:
-                        break
-                    data = r.json()
-                    for rec in data.get('records', []):
-                        name = rec.get('fields', {}).get(primary_field)
-                        if name:
-                            self._record_name_cache[rec['id']] = str(name)
-                    offset = data.get('offset')
-                    if not offset:
-                        break
-                    time.sleep(0.2)
-                time.sleep(0.2)
-        except Exception as e:
-            logger.warning(f"Impossible de résoudre les linked records: {e}")
-
-        return self._record_name_cache
+                return
+
+    def _get_all_records(self, extra_params: Optional[Dict[str, Any]] = None,
+                         table: Optional[str] = None) -> List[Dict]:
+        """Récupère tous les records (toutes les pages de _iter_pages)."""
+        return [record for page in self._iter_pages(extra_params, table) for record in page]
+
+    def _base_tables(self) -> List[Dict[str, Any]]:
+        """Lit le schéma des tables de la base (meta API)."""
+        resp = self._request('GET', f"{AIRTABLE_API_BASE}/meta/bases/{self.base_id}/tables")
+        resp.raise_for_status()
+        return resp.json().get('tables', [])
+
+    def _current_table(self, tables: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Table configurée (nom ou ID) parmi les tables du schéma."""
+        return next((table for table in tables if self.table_name in (table['name'], table['id'])), None)
+
+    def _linked_tables(self, field_mapping: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+        """
+        Identifie, via le schéma de la base, les champs mappés de type linked record.
+
+        Returns:
+            Dict nom du champ → {'table_id', 'primary_field'} de la table liée
+        """
+        tables = self._base_tables()
+        tables_by_id = {table['id']: table for table in tables}
+
+        current = self._current_table(tables)
+        if current is None:
+            return {}
+
+        mapped_fields = set(field_mapping.values())
+        linked = {}
+        for field in current.get('fields', []):
+            if field['name'] not in mapped_fields or field.get('type') != 'multipleRecordLinks':
+                continue
+            table = tables_by_id.get(field.get('options', {}).get('linkedTableId'))
+            if not table or not table.get('fields'):
+                continue
+            primary_field = next((f['name'] for f in table['fields'] if f['id'] == table.get('primaryFieldId')),
+                                 table['fields'][0]['name'])
+            linked[field['name']] = {'table_id': table['id'], 'primary_field': primary_field}
+        return linked
+
+    def _fetch_record_names(self, table_id: str, primary_field: str,
+                            modified_since: Optional[str] = None) -> Dict[str, str]:
+        """Lit le champ primaire des records d'une table (modifiés depuis modified_since si fourni)."""
+        params = {'fields[]': primary_field, 'pageSize': AIRTABLE_PAGE_SIZE}
+        if modified_since:
+            params['filterByFormula'] = f"IS_AFTER(LAST_MODIFIED_TIME(), '{modified_since}')"
+        names = {}
+        for rec in self._get_all_records(params, table=table_id):
+            name = rec.get('fields', {}).get(primary_field)
+            if name:
+                names[rec['id']] = str(name)
+        return names
+
+    def _cached_record_names(self, table_id: str, primary_field: str,
+                             record_ids: Set[str]) -> Tuple[Dict[str, str], bool]:
+        """
+        Noms des records d'une table liée depuis le cache persistant : rechargement complet
+        si le cache a expiré, lecture des seuls records modifiés si un ID demandé est inconnu.
+
+        Returns:
+            Tuple (ID record → nom, True si l'API a été interrogée)
+        """
+        now = datetime.now(timezone.utc)
+        stamp = now.strftime(AIRTABLE_TIMESTAMP_FORMAT)
+        state = get_record_name_table_state(self.base_id, table_id)
+
+        if state is None or now - _parse_airtable_timestamp(state['full_refreshed_at']) > \
+                timedelta(seconds=RECORD_NAME_CACHE_TTL):
+            names = self._fetch_record_names(table_id, primary_field)
+            save_record_names(self.base_id, table_id, names, stamp, full=True)
+            return names, True
+
+        names = get_record_names(self.base_id, table_id)
+        if record_ids <= names.keys():
+            return names, False
+
+        since = _parse_airtable_timestamp(state['refreshed_at']) - RECORD_NAME_REFRESH_OVERLAP
+        modified = self._fetch_record_names(table_id, primary_field, since.strftime(AIRTABLE_TIMESTAMP_FORMAT))
+        save_record_names(self.base_id, table_id, modified, stamp)
+        names.update(modified)
+        return names, True
 
     def _clean_field_value(self, value: Any, name_cache: Dict[str, str]) -> Any:
         """Nettoie une valeur Airtable : convertit les listes et résout les IDs."""
@@ -112,12 +241,14 @@ class AirtableConnector(BaseConnector):
 
     def test_connection(self) -> Dict[str, Any]:
         try:
-            records = self._get_all_records()
+            # Une page d'un record suffit à valider le token, la base et la table
+            resp = self._request('GET', self._table_url(), params={'pageSize': 1})
+            resp.raise_for_status()
             return {
                 "success": True,
                 "message": "Connexion Airtable réussie",
                 "table_name": self.table_name,
-                "record_count": len(records)
+                "record_count": None
             }
         except requests.exceptions.HTTPError as e:
             status = e.response.status_code if e.response is not None else 0
@@ -129,93 +260,184 @@ class AirtableConnector(BaseConnector):
         except Exception as e:
             return {"success": False, "message": f"Erreur connexion Airtable: {str(e)}"}
 
-    def fetch_records(self, field_mapping: Dict[str, str]) -> List[Dict[str, Any]]:
-        raw_records = self._get_all_records()
-        name_cache = self._build_record_name_cache()
-
-        deals = []
-        for record in raw_records:
-            fields = record.get('fields', {})
+    def count_records(self, on_page: Optional[Callable[[int], None]] = None) -> int:
+        # Seul le champ client est demandé : les pages restent légères
+        client_field = get_field_mapping(self.config).get('client', 'Name')
+        count = 0
+        for page in self._iter_pages({'fields[]': client_field, 'pageSize': AIRTABLE_PAGE_SIZE}):
+            count += len(page)
+            if on_page is not None:
+                on_page(len(page))
+        return count
+
+    def iter_record_pages(self, field_mapping: Dict[str, str],
+                          modified_since: Optional[str] = None,
+                          start_cursor: Optional[str] = None) -> Iterator[RecordPage]:
+        params = {'pageSize': AIRTABLE_PAGE_SIZE}
+        if modified_since:
+            params['filterByFormula'] = f"IS_AFTER(LAST_MODIFIED_TIME(), '{modified_since}')"
+        resolver = _LinkedRecordResolver(self, field_mapping)
+
+        for raw_records in self._iter_pages(params, offset=start_cursor):
+            yield RecordPage(self._convert_records(raw_records, field_mapping, resolver), raw_records.next_cursor)
+
+    def _convert_records(self, raw_records: List[Dict], field_mapping: Dict[str, str],
+                         resolver: _LinkedRecordResolver) -> List[Dict[str, Any]]:
+        """Convertit une page de records Airtable en deals CRM (linked records résolus)."""
+        name_cache = resolver.resolve(raw_records)
+
+        # Seules les listes (linked records, sélections multiples) demandent un nettoyage
+        def _read_value(value):
+            return self._clean_field_value(value, name_cache) if isinstance(value, list) else value
+
+        deals = compile_field_mapping(field_mapping).convert_page(
+            (record.get('fields', {}) for record in raw_records), read_value=_read_value
+        )
+        for deal, record in zip(deals, raw_records):
+            deal['_airtable_id'] = record.get('id')
+        return deals
 
-            flat_record = {}
-            for crm_field, external_field in field_mapping.items():
-                value = fields.get(external_field)
-                flat_record[external_field] = self._clean_field_value(value, name_cache)
+    def fetch_records_by_ids(self, field_mapping: Dict[str, str],
+                             record_ids: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        # Une lecture filtrée par formule pour AIRTABLE_IDS_PER_FORMULA records
+        record_ids = [record_id for record_id in record_ids if AIRTABLE_RECORD_ID.fullmatch(record_id)]
+        resolver = self._ids_resolver
+        if resolver is None or resolver.field_mapping != field_mapping:
+            resolver = self._ids_resolver = _LinkedRecordResolver(self, field_mapping)
 
-            deal = convert_external_to_crm(flat_record, field_mapping)
+        deals = []
+        failures = {}
+        for i in range(0, len(record_ids), AIRTABLE_IDS_PER_FORMULA):
+            chunk = record_ids[i:i + AIRTABLE_IDS_PER_FORMULA]
+            formula = "OR(" + ",".join(f"RECORD_ID()='{record_id}'" for record_id in chunk) + ")"
+            # Échec d'une lecture : les records du groupe sont en échec, les autres groupes sont lus
+            chunk_deals = []
+            try:
+                for raw_records in self._iter_pages({'pageSize': AIRTABLE_PAGE_SIZE, 'filterByFormula': formula}):
+                    chunk_deals.extend(self._convert_records(raw_records, field_mapping, resolver))
+            except Exception as e:
+                failures.update((record_id, f"Lecture du record {record_id}: {str(e)}") for record_id in chunk)
+                continue
+            deals.extend(chunk_deals)
+        return deals, failures
 
-            if deal.get('montant_brut') is not None:
-                try:
-                    deal['montant_brut'] = float(deal['montant_brut'])
-                except (ValueError, TypeError):
-                    deal['montant_brut'] = None
+    def verify_webhook_signature(self, body: bytes, headers: Dict[str, str], secret: str) -> bool:
+        try:
+            key = base64.b64decode(secret)
+        except (ValueError, TypeError):
+            return False
+        expected = 'hmac-sha256=' + hmac.new(key, body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, headers.get(AIRTABLE_WEBHOOK_MAC_HEADER, ''))
+
+    def collect_webhook_changes(self, payload: Dict[str, Any],
+                                cursor: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+        # La notification Airtable ne fait que signaler de nouveaux payloads : ceux-ci sont
+        # lus à partir du curseur du webhook ("<webhook_id>:<cursor>"), de 1 pour un nouveau webhook
+        webhook_id = (payload.get('webhook') or {}).get('id')
+        base_id = (payload.get('base') or {}).get('id')
+        if not webhook_id or (base_id and base_id != self.base_id):
+            return [], cursor
+
+        stored_webhook, _, position = (cursor or '').partition(':')
+        position = int(position) if stored_webhook == webhook_id and position.isdigit() else 1
+
+        table_id = None
+        record_ids = []
+        while True:
+            resp = self._request('GET', f"{AIRTABLE_API_BASE}/bases/{self.base_id}/webhooks/{webhook_id}/payloads",
+                                 params={'cursor': position})
+            resp.raise_for_status()
+            data = resp.json()
 
-            deal['_airtable_id'] = record.get('id')
-            deals.append(deal)
+            for change in data.get('payloads', []):
+                for changed_table_id, table_changes in (change.get('changedTablesById') or {}).items():
+                    if table_id is None:
+                        current = self._current_table(self._base_tables())
+                        table_id = current['id'] if current else ''
+                    if changed_table_id != table_id:
+                        continue
+                    # Records supprimés ignorés : comme l'import, le webhook ne supprime pas de deals
+                    record_ids.extend(table_changes.get('createdRecordsById') or {})
+                    record_ids.extend(table_changes.get('changedRecordsById') or {})
+
+            position = data.get('cursor', position)
+            if not data.get('mightHaveMore'):
+                break
 
-        return deals
+        return list(dict.fromkeys(record_ids)), f"{webhook_id}:{position}"
 
-    def push_records(self, deals: List[Dict[str, Any]], field_mapping: Dict[str, str]) -> Dict[str, Any]:
-        existing_records = self._get_all_records()
+    def index_remote_clients(self, field_mapping: Dict[str, str],
+                             linked_ids: Iterable[str] = ()) -> Dict[str, str]:
         client_field = field_mapping.get('client', 'Name')
-
+        linked = set(linked_ids)
         existing_by_client = {}
-        for rec in existing_records:
+        for rec in self._get_all_records({'fields[]': client_field}):
             name = rec.get('fields', {}).get(client_field, '')
-            if name:
+            if name and rec['id'] not in linked:
                 existing_by_client[name] = rec['id']
+        return existing_by_client
+
+    def push_records(self, deals: List[Dict[str, Any]], field_mapping: Dict[str, str],
+                     external_ids: Optional[Dict[int, str]] = None,
+                     remote_clients: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        external_ids = external_ids or {}
+
+        # La table distante n'est listée que si des deals ne sont pas encore liés à un record
+        existing_by_client = remote_clients or {}
+        if remote_clients is None and any(deal.get('id') not in external_ids for deal in deals):
+            existing_by_client = self.index_remote_clients(field_mapping, external_ids.values())
 
         to_create = []
         to_update = []
+        create_ids = []
+        update_ids = []
 
         for deal in deals:
             external_record = convert_crm_to_external(deal, field_mapping)
-            client_name = deal.get('client', '')
+            record_id = external_ids.get(deal.get('id')) or existing_by_client.get(deal.get('client', ''))
 
-            if client_name in existing_by_client:
+            if record_id:
                 to_update.append({
-                    "id": existing_by_client[client_name],
+                    "id": record_id,
                     "fields": external_record
                 })
+                update_ids.append(deal.get('id'))
             else:
                 to_create.append({"fields": external_record})
+                create_ids.append(deal.get('id'))
+
+        # Batchs de 10 records (limite Airtable), envoyés en parallèle sous limite de débit.
+        # Airtable retourne les records du batch dans l'ordre de la requête.
+        def _send(task):
+            method, batch, _ = task
+            resp = self._request(method, self._table_url(), json={"records": batch})
+            resp.raise_for_status()
+            return [rec['id'] for rec in resp.json().get('records', [])]
+
+        tasks = [('POST', to_create[i:i + AIRTABLE_BATCH_SIZE], create_ids[i:i + AIRTABLE_BATCH_SIZE])
+                 for i in range(0, len(to_create), AIRTABLE_BATCH_SIZE)]
+        tasks += [('PATCH', to_update[i:i + AIRTABLE_BATCH_SIZE], update_ids[i:i + AIRTABLE_BATCH_SIZE])
+                  for i in range(0, len(to_update), AIRTABLE_BATCH_SIZE)]
 
         created_count = 0
         updated_count = 0
         errors = []
-
-        # Batch create (max 10 par requête Airtable)
-        for i in range(0, len(to_create), 10):
-            batch = to_create[i:i+10]
-            try:
-                resp = requests.post(
-                    self._table_url(),
-                    headers=self._headers(),
-                    json={"records": batch}
-                )
-                resp.raise_for_status()
-                created_count += len(batch)
-                time.sleep(0.2)  # Respecter rate limit 5 QPS
-            except Exception as e:
-                errors.append(f"Erreur batch create: {str(e)}")
-
-        # Batch update (max 10 par requête)
-        for i in range(0, len(to_update), 10):
-            batch = to_update[i:i+10]
-            try:
-                resp = requests.patch(
-                    self._table_url(),
-                    headers=self._headers(),
-                    json={"records": batch}
-                )
-                resp.raise_for_status()
-                updated_count += len(batch)
-                time.sleep(0.2)
-            except Exception as e:
-                errors.append(f"Erreur batch update: {str(e)}")
+        synced = {}
+
+        for (method, _, batch_ids), (record_ids, error) in zip(tasks, self._run_concurrently(_send, tasks)):
+            if error is not None:
+                action = 'create' if method == 'POST' else 'update'
+                errors.append(f"Erreur batch {action}: {str(error)}")
+                continue
+            if method == 'POST':
+                created_count += len(record_ids)
+            else:
+                updated_count += len(record_ids)
+            synced.update(zip(batch_ids, record_ids))
 
         return {
             "records_created": created_count,
             "records_updated": updated_count,
-            "errors": errors
+            "errors": errors,
+            "synced": synced
         }
@@ -1,54 +1,441 @@
 """
 Classe abstraite pour les connecteurs API externes.
-Définit le contrat commun : test_connection, fetch_records, push_records.
+Définit le contrat commun : test_connection, fetch_records, push_records, et la
+réception des notifications webhook (vérification, records modifiés, relecture par ID).
+
+Fournit aussi la couche HTTP partagée par les connecteurs :
+- une session requests persistante par provider (keep-alive, pool de connexions)
+- un limiteur de débit token bucket par compte provider (base Airtable, token Notion)
+- un retry avec backoff exponentiel qui respecte l'en-tête Retry-After (429, 5xx)
+- un pool de workers borné pour les écritures indépendantes (batchs)
+- la lecture anticipée des pages de records (prefetch_pages) pendant leur traitement
 """
 
+import hashlib
+import logging
+import random
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from queue import Full, Queue
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from database.connection import release_connection
+
+logger = logging.getLogger(__name__)
+
+# Statuts HTTP transitoires : la requête est rejouée après un délai
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# Méthodes rejouables sans risque de doublon : un POST de création (record Airtable,
+# page Notion) peut avoir été traité malgré une erreur réseau ou un 5xx
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'PATCH', 'DELETE')
+
+
+class TokenBucket:
+    """
+    Limiteur de débit thread-safe : `rate` jetons par seconde, au plus `capacity`
+    jetons accumulés (rafale). Chaque requête consomme un jeton.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Attend qu'un jeton soit disponible puis le consomme."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                    self._updated_at = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Suspend toutes les acquisitions pendant `seconds` (429 / Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+            self._updated_at = self._paused_until
+
+
+# Limiteurs et sessions partagés entre instances de connecteurs (et threads)
+_rate_limiters: Dict[str, TokenBucket] = {}
+_sessions: Dict[str, requests.Session] = {}
+_registry_lock = threading.Lock()
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convertit un en-tête Retry-After (secondes ou date HTTP) en secondes d'attente."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RecordPage(list):
+    """
+    Page de records lue chez le provider ; next_cursor est le curseur de pagination
+    de la page suivante (offset Airtable, start_cursor Notion), None après la dernière.
+    """
+
+    def __init__(self, records: Iterable[Any] = (), next_cursor: Optional[str] = None):
+        super().__init__(records)
+        self.next_cursor = next_cursor
+
+
+# Nombre de pages de records lues d'avance pendant le traitement de la page courante
+PREFETCH_PAGES = 2
+
+_END_OF_PAGES = object()
+
+
+def prefetch_pages(pages: Iterable[Any], depth: int = PREFETCH_PAGES) -> Iterator[Any]:
+    """
+    Itère sur pages en lisant jusqu'à depth pages d'avance dans un thread dédié :
+    les requêtes HTTP de la page suivante se déroulent pendant le traitement
+    (écriture en base) de la page courante, et la mémoire reste bornée.
+
+    Les erreurs du producteur sont relevées côté consommateur ; interrompre
+    l'itération (annulation, exception) arrête la lecture à la page suivante.
+    """
+    queue = Queue(maxsize=max(1, depth))
+    stopped = threading.Event()
+
+    def _put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _produce():
+        try:
+            for page in pages:
+                if not _put((page, None)):
+                    return
+            _put((_END_OF_PAGES, None))
+        except Exception as e:
+            _put((None, e))
+        finally:
+            # Connexion DB éventuellement empruntée par le producteur (cache de noms Airtable)
+            release_connection()
+
+    producer = threading.Thread(target=_produce, name='connector-prefetch', daemon=True)
+    producer.start()
+    try:
+        while True:
+            page, error = queue.get()
+            if error is not None:
+                raise error
+            if page is _END_OF_PAGES:
+                return
+            yield page
+    finally:
+        stopped.set()
 
 
 class BaseConnector(ABC):
     """Interface commune pour tous les connecteurs (Airtable, Notion, etc.)."""
 
+    # Identifiant du provider (clé des sessions et limiteurs partagés)
+    PROVIDER = 'base'
+    # Clé des deals retournés par fetch_records portant l'ID du record externe
+    EXTERNAL_ID_FIELD = '_external_id'
+    # Débit autorisé par le provider (requêtes/seconde) et rafale tolérée
+    RATE_LIMIT = 5.0
+    RATE_BURST = 1.0
+    # Requêtes d'écriture indépendantes exécutées en parallèle
+    MAX_WORKERS = 4
+    # Statuts HTTP rejoués avec backoff
+    RETRYABLE_STATUSES = RETRYABLE_STATUSES
+    # Retry : tentatives supplémentaires, délai initial et délai maximal (secondes)
+    MAX_RETRIES = 5
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 30.0
+    REQUEST_TIMEOUT = 30
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.api_token = config.get('api_token', '')
         self.base_id = config.get('base_id', '')
         self.table_name = config.get('table_name', '')
 
+    # --- Couche HTTP partagée ---
+
+    def _headers(self) -> Dict[str, str]:
+        """En-têtes HTTP (authentification) envoyés avec chaque requête."""
+        return {}
+
+    def _rate_limit_key(self) -> str:
+        """Périmètre du quota du provider (par défaut : par token API)."""
+        return hashlib.sha1(str(self.api_token).encode('utf-8')).hexdigest()
+
+    def _rate_limiter(self) -> TokenBucket:
+        key = f"{self.PROVIDER}:{self._rate_limit_key()}"
+        with _registry_lock:
+            limiter = _rate_limiters.get(key)
+            if limiter is None:
+                limiter = TokenBucket(self.RATE_LIMIT, self.RATE_BURST)
+                _rate_limiters[key] = limiter
+            return limiter
+
+    def _session(self) -> requests.Session:
+        with _registry_lock:
+            session = _sessions.get(self.PROVIDER)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, self.MAX_WORKERS))
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _sessions[self.PROVIDER] = session
+            return session
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Délai exponentiel avec jitter pour la tentative `attempt` (0 = premier retry)."""
+        delay = min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _request(self, method: str, url: str, idempotent: Optional[bool] = None,
+                 **kwargs) -> requests.Response:
+        """
+        Envoie une requête HTTP via la session du provider, sous limite de débit.
+        Les erreurs transitoires (429, 5xx, réseau) sont rejouées avec backoff ;
+        sur 429, le délai Retry-After suspend toutes les requêtes du même quota.
+        Une requête non idempotente n'est rejouée que si elle n'a pas été traitée :
+        429 ou échec de connexion avant l'envoi.
+
+        Args:
+            idempotent: Requête rejouable sans effet de bord (défaut : selon la méthode,
+                True pour un POST de lecture comme une query Notion)
+
+        Returns:
+            La réponse finale (l'appelant vérifie le statut via raise_for_status)
+        """
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        limiter = self._rate_limiter()
+        headers = {**self._headers(), **kwargs.pop('headers', {})}
+        kwargs.setdefault('timeout', self.REQUEST_TIMEOUT)
+
+        for attempt in range(self.MAX_RETRIES + 1):
+            limiter.acquire()
+            try:
+                resp = self._session().request(method, url, headers=headers, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                not_sent = isinstance(e, requests.exceptions.ConnectTimeout)
+                if attempt == self.MAX_RETRIES or not (idempotent or not_sent):
+                    raise
+                delay = self._backoff_delay(attempt)
+                logger.warning(f"{self.PROVIDER}: {method} {url} échoué ({e}), nouvel essai dans {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            retryable = resp.status_code == 429 or (idempotent and resp.status_code in self.RETRYABLE_STATUSES)
+            if not retryable or attempt == self.MAX_RETRIES:
+                return resp
+
+            retry_after = _parse_retry_after(resp.headers.get('Retry-After'))
+            delay = retry_after if retry_after is not None else self._backoff_delay(attempt)
+            if resp.status_code == 429:
+                limiter.pause(delay)
+            logger.warning(f"{self.PROVIDER}: HTTP {resp.status_code} sur {method} {url}, "
+                           f"nouvel essai dans {delay:.1f}s")
+            time.sleep(delay)
+
+        return resp
+
+    def _run_concurrently(self, func: Callable[[Any], Any],
+                          items: Iterable[Any]) -> List[Tuple[Any, Optional[Exception]]]:
+        """
+        Exécute func sur chaque élément avec au plus MAX_WORKERS appels simultanés
+        (le débit reste borné par le limiteur du provider).
+
+        Returns:
+            Liste (résultat, exception) dans l'ordre des éléments ; une erreur
+            n'interrompt pas les autres éléments
+        """
+        def _safe_call(item):
+            try:
+                return func(item), None
+            except Exception as e:
+                return None, e
+
+        items = list(items)
+        if len(items) <= 1 or self.MAX_WORKERS <= 1:
+            return [_safe_call(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS,
+                                thread_name_prefix=f"{self.PROVIDER}-http") as executor:
+            return list(executor.map(_safe_call, items))
+
+    # --- Contrat des connecteurs ---
+
     @abstractmethod
     def test_connection(self) -> Dict[str, Any]:
         """
-        Teste la connexion au service externe.
+        Teste la connexion au service externe par une sonde légère (métadonnées,
+        une page d'un record) : la table n'est pas parcourue.
 
         Returns:
-            Dict avec success (bool), message, et détails (nom table, nb records)
+            Dict avec success (bool), message, et détails (nom table ; record_count
+            à None, le comptage étant fait par count_records)
         """
         pass
 
     @abstractmethod
-    def fetch_records(self, field_mapping: Dict[str, str]) -> List[Dict[str, Any]]:
+    def count_records(self, on_page: Optional[Callable[[int], None]] = None) -> int:
         """
-        Récupère tous les records du service et les convertit en format deal CRM.
+        Compte les records de la table en la parcourant page par page (opération longue
+        sur une grande table, exécutée en job d'arrière-plan).
+
+        Args:
+            on_page: Appelée avec le nombre de records de chaque page lue
+
+        Returns:
+            Nombre total de records
+        """
+        pass
+
+    @abstractmethod
+    def iter_record_pages(self, field_mapping: Dict[str, str],
+                          modified_since: Optional[str] = None,
+                          start_cursor: Optional[str] = None) -> Iterator[RecordPage]:
+        """
+        Parcourt les records du service page par page, convertis en format deal CRM :
+        chaque page est produite dès sa réception (mémoire bornée à une page).
 
         Args:
             field_mapping: Mapping champ_crm → champ_externe
+            modified_since: Horodatage ISO 8601 UTC ; si fourni, seuls les records
+                modifiés depuis sont récupérés (synchronisation incrémentale)
+            start_cursor: Curseur de pagination (RecordPage.next_cursor d'une lecture
+                précédente, avec le même modified_since) à partir duquel reprendre
+
+        Yields:
+            RecordPage de dicts au format deal CRM (avec l'ID externe sous EXTERNAL_ID_FIELD)
+        """
+        pass
+
+    def fetch_records(self, field_mapping: Dict[str, str],
+                      modified_since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Récupère tous les records du service convertis en format deal CRM
+        (toutes les pages de iter_record_pages).
 
         Returns:
             Liste de dicts au format deal CRM
         """
+        return [deal for page in self.iter_record_pages(field_mapping, modified_since) for deal in page]
+
+    @abstractmethod
+    def fetch_records_by_ids(self, field_mapping: Dict[str, str],
+                             record_ids: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """
+        Relit des records désignés par leur ID externe (records signalés par webhook),
+        convertis en format deal CRM comme par iter_record_pages. L'échec de lecture d'un
+        record (ex. page Notion non partagée avec l'intégration) n'interrompt pas les autres.
+
+        Returns:
+            Tuple (deals, échecs) : liste de dicts au format deal CRM, les records supprimés,
+            archivés ou hors de la table configurée étant ignorés ; record_id → message
+            d'erreur des records non lus
+        """
+        pass
+
+    @abstractmethod
+    def verify_webhook_signature(self, body: bytes, headers: Dict[str, str], secret: str) -> bool:
+        """
+        Vérifie la signature HMAC d'une notification webhook.
+
+        Args:
+            body: Corps brut de la requête (tel que signé par le provider)
+            headers: En-têtes de la requête
+            secret: Secret du webhook (connector_configs.webhook_secret)
+        """
+        pass
+
+    def webhook_verification_token(self, payload: Dict[str, Any]) -> Optional[str]:
+        """
+        Retourne le jeton de la requête de vérification envoyée à la création de
+        l'abonnement webhook (non signée : conservé en attente jusqu'à sa confirmation comme
+        secret par l'administrateur), None sinon.
+        """
+        return None
+
+    @abstractmethod
+    def collect_webhook_changes(self, payload: Dict[str, Any],
+                                cursor: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+        """
+        Identifie les records de la table configurée modifiés d'après une notification webhook.
+
+        Args:
+            payload: Corps JSON de la notification
+            cursor: État de lecture des changements conservé entre deux notifications
+                (provider dont la notification ne contient pas les changements)
+
+        Returns:
+            Tuple (IDs externes des records créés ou modifiés, nouvel état du curseur)
+        """
+        pass
+
+    @abstractmethod
+    def index_remote_clients(self, field_mapping: Dict[str, str],
+                             linked_ids: Iterable[str] = ()) -> Dict[str, str]:
+        """
+        Parcourt la table distante (champ client seulement) pour rapprocher par client
+        les deals non encore liés à un record externe.
+
+        Args:
+            field_mapping: Mapping champ_crm → champ_externe
+            linked_ids: IDs externes déjà liés à un deal, exclus du rapprochement
+
+        Returns:
+            Dict nom du client → ID externe
+        """
         pass
 
     @abstractmethod
-    def push_records(self, deals: List[Dict[str, Any]], field_mapping: Dict[str, str]) -> Dict[str, Any]:
+    def push_records(self, deals: List[Dict[str, Any]], field_mapping: Dict[str, str],
+                     external_ids: Optional[Dict[int, str]] = None,
+                     remote_clients: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         """
         Pousse des deals CRM vers le service externe.
 
         Args:
-            deals: Liste de deals au format CRM
+            deals: Liste de deals au format CRM (avec leur id)
             field_mapping: Mapping champ_crm → champ_externe
+            external_ids: Records externes déjà liés (deal_id → ID externe), mis à jour
+                directement ; les autres deals sont rapprochés par client
+            remote_clients: Index de index_remote_clients déjà construit (envois par lots) ;
+                sinon la table distante est parcourue si des deals ne sont pas liés
 
         Returns:
-            Dict avec records_created, records_updated, errors
+            Dict avec records_created, records_updated, errors, et synced
+            (deal_id → ID externe des deals effectivement écrits)
         """
         pass
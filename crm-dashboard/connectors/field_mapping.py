@@ -1,11 +1,18 @@
 """
 Gestion du mapping des champs entre le CRM et les services externes.
-Inclut la normalisation des statuts anglais → français.
+Inclut la normalisation des statuts anglais → français et la compilation d'un mapping
+en convertisseur (CompiledFieldMapping) appliqué à des pages entières de records.
 """
 
+import hashlib
 import json
 import logging
-from typing import Dict, Any, Optional
+import math
+import numbers
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
 
 from utils.constants import VALID_STATUSES, STATUS_NORMALIZATION_MAP
 
@@ -22,6 +29,30 @@ DEFAULT_FIELD_MAPPING = {
     "notes": "Notes"
 }
 
+# Statut (minuscules, sans espaces superflus) → statut CRM : statuts français valides
+# (prioritaires) et traductions anglaises
+STATUS_LOOKUP = {**STATUS_NORMALIZATION_MAP, **{statut: statut for statut in VALID_STATUSES}}
+
+# Sérialisation du contenu haché (encodeur construit une fois, pas à chaque json.dumps)
+_encode_hash_content = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+# Mappings compilés conservés (un par mapping de connecteur distinct)
+COMPILED_MAPPING_CACHE_SIZE = 32
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """Montant en float, None si la valeur n'est pas numérique."""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+# Conversion de type appliquée à la valeur (non nulle) d'un champ CRM lors de l'import
+FIELD_COERCIONS: Dict[str, Callable[[Any], Any]] = {
+    'montant_brut': _to_float,
+}
+
 
 def get_field_mapping(config: Dict[str, Any]) -> Dict[str, str]:
     """
@@ -41,6 +72,83 @@ def get_field_mapping(config: Dict[str, Any]) -> Dict[str, str]:
     return DEFAULT_FIELD_MAPPING.copy()
 
 
+class CompiledFieldMapping:
+    """
+    Mapping champ_crm → champ_externe compilé une fois : mapping inverse, liste des champs
+    à lire avec leur conversion de type, champs du hash de contenu et statuts déjà
+    normalisés sont prêts à l'emploi, et les records sont convertis page par page.
+    Obtenu via compile_field_mapping (mis en cache par mapping) ; ne pas modifier.
+    """
+
+    def __init__(self, field_mapping: Dict[str, str]):
+        self.field_mapping = dict(field_mapping)
+        self.reverse_mapping = {v: k for k, v in self.field_mapping.items()}
+        # (champ externe, champ CRM, conversion ou None), dans l'ordre du mapping
+        self.fields: Tuple[Tuple[str, str, Optional[Callable[[Any], Any]]], ...] = tuple(
+            (external_field, crm_field, FIELD_COERCIONS.get(crm_field))
+            for crm_field, external_field in self.field_mapping.items()
+        )
+        self.hash_fields = tuple(sorted(self.field_mapping))
+        self._statuses: Dict[str, str] = {}
+
+    def convert_page(self, records: Iterable[Dict[str, Any]],
+                     read_value: Optional[Callable[[Any], Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Convertit une page de records externes en deals CRM.
+
+        Args:
+            records: Valeurs de chaque record (clé = champ externe)
+            read_value: Extraction de la valeur brute d'un champ (propriété Notion,
+                liste Airtable...) avant conversion de type ; valeur telle quelle sinon
+
+        Returns:
+            Un deal par record, avec tous les champs CRM mappés (None si absents)
+        """
+        fields = self.fields
+        deals = []
+        for values in records:
+            deal = {}
+            for external_field, crm_field, coerce in fields:
+                value = values.get(external_field)
+                if read_value is not None:
+                    value = read_value(value)
+                if coerce is not None and value is not None:
+                    value = coerce(value)
+                deal[crm_field] = value
+            deals.append(deal)
+        return deals
+
+    def convert_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Convertit un record externe (champs présents seulement, sans conversion de type)."""
+        reverse_mapping = self.reverse_mapping
+        return {reverse_mapping[external_field]: value
+                for external_field, value in record.items() if external_field in reverse_mapping}
+
+    def content_hash(self, deal: Dict[str, Any]) -> str:
+        """Hash du contenu synchronisé d'un deal (voir compute_content_hash)."""
+        content = [[crm_field, _hash_value(deal.get(crm_field))] for crm_field in self.hash_fields]
+        return hashlib.sha1(_encode_hash_content(content).encode('utf-8')).hexdigest()
+
+    def normalize_status(self, statut: str) -> Optional[str]:
+        """normalize_status avec mémorisation des statuts bruts reconnus (valeurs peu nombreuses)."""
+        normalized = self._statuses.get(statut)
+        if normalized is None:
+            normalized = normalize_status(statut)
+            if normalized is not None and len(self._statuses) < 1024:
+                self._statuses[statut] = normalized
+        return normalized
+
+
+@lru_cache(maxsize=COMPILED_MAPPING_CACHE_SIZE)
+def _compile_mapping_items(items: Tuple[Tuple[str, str], ...]) -> CompiledFieldMapping:
+    return CompiledFieldMapping(dict(items))
+
+
+def compile_field_mapping(field_mapping: Dict[str, str]) -> CompiledFieldMapping:
+    """Retourne le mapping compilé (partagé entre appels pour un même mapping)."""
+    return _compile_mapping_items(tuple(field_mapping.items()))
+
+
 def convert_external_to_crm(record: Dict[str, Any], field_mapping: Dict[str, str]) -> Dict[str, Any]:
     """
     Convertit un record externe en format deal CRM selon le mapping.
@@ -52,16 +160,7 @@ def convert_external_to_crm(record: Dict[str, Any], field_mapping: Dict[str, str
     Returns:
         Dict au format deal CRM
     """
-    deal = {}
-    # Inverser le mapping : externe → crm
-    reverse_mapping = {v: k for k, v in field_mapping.items()}
-
-    for external_field, value in record.items():
-        crm_field = reverse_mapping.get(external_field)
-        if crm_field:
-            deal[crm_field] = value
-
-    return deal
+    return compile_field_mapping(field_mapping).convert_record(record)
 
 
 def convert_crm_to_external(deal: Dict[str, Any], field_mapping: Dict[str, str]) -> Dict[str, Any]:
@@ -83,6 +182,38 @@ def convert_crm_to_external(deal: Dict[str, Any], field_mapping: Dict[str, str])
     return record
 
 
+def _hash_value(value: Any) -> Any:
+    """Forme canonique d'une valeur pour le hash : identique côté CRM et côté service externe."""
+    # Cas le plus fréquent en premier : le test numbers.Real (ABC) est coûteux sur un texte
+    if type(value) is str:
+        return value.strip() or None
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (numbers.Real, Decimal)):
+        return f"{float(value):.2f}"
+    if isinstance(value, date):
+        return value.isoformat()[:10]
+    text = str(value).strip()
+    return text or None
+
+
+def compute_content_hash(deal: Dict[str, Any], field_mapping: Dict[str, str]) -> str:
+    """
+    Calcule le hash du contenu synchronisé d'un deal : ses champs CRM mappés, sous forme
+    canonique. Deux représentations du même deal (base, record importé) ont le même hash.
+
+    Args:
+        deal: Deal au format CRM
+        field_mapping: Mapping champ_crm → champ_externe
+
+    Returns:
+        Empreinte SHA-1 hexadécimale
+    """
+    return compile_field_mapping(field_mapping).content_hash(deal)
+
+
 def normalize_status(statut: str) -> Optional[str]:
     """
     Normalise un statut vers le format français attendu par le CRM.
@@ -100,15 +231,10 @@ def normalize_status(statut: str) -> Optional[str]:
     if not statut:
         return None
 
-    normalized = statut.lower().strip()
-
-    # Match direct avec les statuts français valides
-    if normalized in VALID_STATUSES:
+    # Match direct avec les statuts français valides, sinon traduction anglais → français
+    normalized = STATUS_LOOKUP.get(statut.lower().strip())
+    if normalized is not None:
         return normalized
 
-    # Traduction anglais → français
-    if normalized in STATUS_NORMALIZATION_MAP:
-        return STATUS_NORMALIZATION_MAP[normalized]
-
     logger.warning(f"Statut non reconnu: '{statut}' — ni français ni anglais connu")
     return None
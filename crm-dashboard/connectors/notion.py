@@ -1,22 +1,42 @@
 """
 Connecteur Notion : synchronisation bidirectionnelle des deals via API REST.
-Utilise requests directement (compatible Python 3.14).
+Utilise requests directement (compatible Python 3.14), via la couche HTTP de BaseConnector.
 """
 
+import hashlib
+import hmac
 import logging
-import time
-from typing import Dict, List, Any, Optional
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Tuple
 
 import requests
 
-from .base import BaseConnector
-from .field_mapping import convert_crm_to_external
+from .base import BaseConnector, RecordPage, RETRYABLE_STATUSES
+from .field_mapping import compile_field_mapping
 
 logger = logging.getLogger(__name__)
 
-NOTION_API_BASE = "https://api.notion.com/v1"
+# Surchargeable pour viser un serveur local (fake_connector_server.py)
+NOTION_API_BASE = os.environ.get('NOTION_API_BASE', "https://api.notion.com/v1")
 NOTION_VERSION = "2022-06-28"
 
+# Taille de page maximale d'une requête Notion
+NOTION_PAGE_SIZE = 100
+
+# Requêtes d'écriture en vol simultanément (une requête par page) : au-delà du produit
+# débit × latence, les requêtes supplémentaires ne font qu'attendre le limiteur
+NOTION_WRITE_CONCURRENCY = int(os.environ.get('NOTION_WRITE_CONCURRENCY', 3))
+
+# En-tête de signature des notifications webhook (HMAC-SHA256 du corps, jeton de vérification)
+NOTION_WEBHOOK_SIGNATURE_HEADER = 'X-Notion-Signature'
+# Événements webhook dont la page doit être relue (propriétés nouvelles ou modifiées)
+NOTION_WEBHOOK_PAGE_EVENTS = ('page.created', 'page.properties_updated', 'page.undeleted', 'page.moved')
+
+
+def _same_notion_id(first: Optional[str], second: Optional[str]) -> bool:
+    """Compare deux IDs Notion (avec ou sans tirets)."""
+    return bool(first and second) and first.replace('-', '') == second.replace('-', '')
+
 
 def _extract_notion_value(prop: Dict[str, Any]) -> Any:
     """Extrait une valeur Python depuis une propriété Notion."""
@@ -86,6 +106,15 @@ def _build_notion_property(crm_field: str, value: Any) -> Optional[Dict[str, Any
 
 class NotionConnector(BaseConnector):
 
+    PROVIDER = 'notion'
+    EXTERNAL_ID_FIELD = '_notion_page_id'
+    # Quota Notion : 3 requêtes/seconde en moyenne par intégration, rafales tolérées
+    RATE_LIMIT = 3.0
+    RATE_BURST = 3.0
+    MAX_WORKERS = NOTION_WRITE_CONCURRENCY
+    # 409 conflict_error : écriture concurrente sur la même page, à rejouer
+    RETRYABLE_STATUSES = RETRYABLE_STATUSES + (409,)
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.database_id = self.base_id
@@ -97,49 +126,53 @@ class NotionConnector(BaseConnector):
             "Notion-Version": NOTION_VERSION
         }
 
-    def _query_all_pages(self) -> List[Dict]:
-        """Récupère toutes les pages avec pagination."""
-        pages = []
-        start_cursor = None
+    def _iter_query_pages(self, query_filter: Optional[Dict[str, Any]] = None,
+                          start_cursor: Optional[str] = None) -> Iterator[RecordPage]:
+        """
+        Parcourt les pages de la database par lots de NOTION_PAGE_SIZE (filtre Notion optionnel),
+        à partir du curseur d'une lecture précédente si fourni.
+        """
         while True:
-            body = {}
+            body = {"page_size": NOTION_PAGE_SIZE}
+            if query_filter:
+                body['filter'] = query_filter
             if start_cursor:
                 body['start_cursor'] = start_cursor
 
-            resp = requests.post(
-                f"{NOTION_API_BASE}/databases/{self.database_id}/query",
-                headers=self._headers(),
-                json=body
-            )
+            resp = self._request('POST', f"{NOTION_API_BASE}/databases/{self.database_id}/query",
+                                 idempotent=True, json=body)
             resp.raise_for_status()
             data = resp.json()
-            pages.extend(data.get('results', []))
+            start_cursor = data.get('next_cursor') if data.get('has_more', False) else None
+            yield RecordPage(data.get('results', []), start_cursor)
 
-            if not data.get('has_more', False):
-                break
-            start_cursor = data.get('next_cursor')
-        return pages
+            if not start_cursor:
+                return
+
+    def _query_all_pages(self, query_filter: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        """Récupère toutes les pages (tous les lots de _iter_query_pages)."""
+        return [page for batch in self._iter_query_pages(query_filter) for page in batch]
 
     def test_connection(self) -> Dict[str, Any]:
         try:
             # Récupérer les infos de la database
-            resp = requests.get(
-                f"{NOTION_API_BASE}/databases/{self.database_id}",
-                headers=self._headers()
-            )
+            resp = self._request('GET', f"{NOTION_API_BASE}/databases/{self.database_id}")
             resp.raise_for_status()
             db = resp.json()
 
             title_parts = db.get('title', [])
             db_title = title_parts[0]['plain_text'] if title_parts else 'Sans titre'
 
-            pages = self._query_all_pages()
+            # Une page d'un résultat suffit à valider l'accès en lecture aux pages
+            resp = self._request('POST', f"{NOTION_API_BASE}/databases/{self.database_id}/query",
+                                 idempotent=True, json={"page_size": 1})
+            resp.raise_for_status()
 
             return {
                 "success": True,
                 "message": "Connexion Notion réussie",
                 "table_name": db_title,
-                "record_count": len(pages)
+                "record_count": None
             }
         except requests.exceptions.HTTPError as e:
             status = e.response.status_code if e.response is not None else 0
@@ -151,83 +184,139 @@ class NotionConnector(BaseConnector):
         except Exception as e:
             return {"success": False, "message": f"Erreur connexion Notion: {str(e)}"}
 
-    def fetch_records(self, field_mapping: Dict[str, str]) -> List[Dict[str, Any]]:
-        all_pages = self._query_all_pages()
-
-        deals = []
-        for page in all_pages:
-            properties = page.get('properties', {})
-            deal = {}
-
-            for crm_field, external_field in field_mapping.items():
-                prop = properties.get(external_field)
-                deal[crm_field] = _extract_notion_value(prop)
-
-            if deal.get('montant_brut') is not None:
-                try:
-                    deal['montant_brut'] = float(deal['montant_brut'])
-                except (ValueError, TypeError):
-                    deal['montant_brut'] = None
-
+    def count_records(self, on_page: Optional[Callable[[int], None]] = None) -> int:
+        count = 0
+        for batch in self._iter_query_pages():
+            count += len(batch)
+            if on_page is not None:
+                on_page(len(batch))
+        return count
+
+    def iter_record_pages(self, field_mapping: Dict[str, str],
+                          modified_since: Optional[str] = None,
+                          start_cursor: Optional[str] = None) -> Iterator[RecordPage]:
+        query_filter = None
+        if modified_since:
+            query_filter = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": modified_since}}
+
+        for batch in self._iter_query_pages(query_filter, start_cursor):
+            yield RecordPage(self._pages_to_deals(batch, field_mapping), batch.next_cursor)
+
+    def _pages_to_deals(self, pages: List[Dict[str, Any]], field_mapping: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Convertit des pages Notion en deals CRM."""
+        deals = compile_field_mapping(field_mapping).convert_page(
+            (page.get('properties', {}) for page in pages), read_value=_extract_notion_value
+        )
+        for deal, page in zip(deals, pages):
             deal['_notion_page_id'] = page.get('id')
-            deals.append(deal)
-
         return deals
 
-    def push_records(self, deals: List[Dict[str, Any]], field_mapping: Dict[str, str]) -> Dict[str, Any]:
-        existing_pages = self._query_all_pages()
+    def fetch_records_by_ids(self, field_mapping: Dict[str, str],
+                             record_ids: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        # Pas de lecture groupée par ID dans l'API Notion : une requête par page, en parallèle
+        def _fetch(page_id):
+            resp = self._request('GET', f"{NOTION_API_BASE}/pages/{page_id}")
+            if resp.status_code == 404:
+                return None
+            resp.raise_for_status()
+            return resp.json()
 
+        pages = []
+        failures = {}
+        for page_id, (page, error) in zip(record_ids, self._run_concurrently(_fetch, record_ids)):
+            if error is not None:
+                failures[page_id] = f"Lecture de la page {page_id}: {str(error)}"
+                continue
+            if (page is None or page.get('archived') or page.get('in_trash')
+                    or not _same_notion_id((page.get('parent') or {}).get('database_id'), self.database_id)):
+                continue
+            pages.append(page)
+        return self._pages_to_deals(pages, field_mapping), failures
+
+    def verify_webhook_signature(self, body: bytes, headers: Dict[str, str], secret: str) -> bool:
+        expected = 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, headers.get(NOTION_WEBHOOK_SIGNATURE_HEADER, ''))
+
+    def webhook_verification_token(self, payload: Dict[str, Any]) -> Optional[str]:
+        return payload.get('verification_token')
+
+    def collect_webhook_changes(self, payload: Dict[str, Any],
+                                cursor: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+        # Un événement Notion désigne une page : seules celles de la database configurée sont retenues
+        entity = payload.get('entity') or {}
+        parent = (payload.get('data') or {}).get('parent') or {}
+        if (payload.get('type') not in NOTION_WEBHOOK_PAGE_EVENTS or entity.get('type') != 'page'
+                or not entity.get('id') or (parent.get('id') and not _same_notion_id(parent['id'], self.database_id))):
+            return [], cursor
+        return [entity['id']], cursor
+
+    def index_remote_clients(self, field_mapping: Dict[str, str],
+                             linked_ids: Iterable[str] = ()) -> Dict[str, str]:
         client_field = field_mapping.get('client', 'Name')
+        linked = set(linked_ids)
         existing_by_client = {}
-        for page in existing_pages:
+        for page in self._query_all_pages():
             prop = page.get('properties', {}).get(client_field)
             name = _extract_notion_value(prop)
-            if name:
+            if name and page['id'] not in linked:
                 existing_by_client[name] = page['id']
+        return existing_by_client
 
-        created_count = 0
-        updated_count = 0
-        errors = []
+    def push_records(self, deals: List[Dict[str, Any]], field_mapping: Dict[str, str],
+                     external_ids: Optional[Dict[int, str]] = None,
+                     remote_clients: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        external_ids = external_ids or {}
 
-        for deal in deals:
-            client_name = deal.get('client', '')
+        # La database n'est parcourue que si des deals ne sont pas encore liés à une page
+        existing_by_client = remote_clients or {}
+        if remote_clients is None and any(deal.get('id') not in external_ids for deal in deals):
+            existing_by_client = self.index_remote_clients(field_mapping, external_ids.values())
 
+        tasks = []
+        for deal in deals:
             properties = {}
             for crm_field, external_field in field_mapping.items():
                 value = deal.get(crm_field)
                 notion_prop = _build_notion_property(crm_field, value)
                 if notion_prop:
                     properties[external_field] = notion_prop
+            page_id = external_ids.get(deal.get('id')) or existing_by_client.get(deal.get('client', ''))
+            tasks.append((page_id, properties))
+
+        # Une requête par page (pas d'écriture groupée dans l'API Notion), MAX_WORKERS en vol
+        # au plus sous le limiteur de débit ; les erreurs transitoires sont rejouées par _request
+        def _write(task):
+            page_id, properties = task
+            if page_id:
+                resp = self._request('PATCH', f"{NOTION_API_BASE}/pages/{page_id}",
+                                     json={"properties": properties})
+                resp.raise_for_status()
+                return page_id
+            resp = self._request('POST', f"{NOTION_API_BASE}/pages", json={
+                "parent": {"database_id": self.database_id},
+                "properties": properties
+            })
+            resp.raise_for_status()
+            return resp.json().get('id')
 
-            try:
-                if client_name in existing_by_client:
-                    page_id = existing_by_client[client_name]
-                    resp = requests.patch(
-                        f"{NOTION_API_BASE}/pages/{page_id}",
-                        headers=self._headers(),
-                        json={"properties": properties}
-                    )
-                    resp.raise_for_status()
-                    updated_count += 1
-                else:
-                    resp = requests.post(
-                        f"{NOTION_API_BASE}/pages",
-                        headers=self._headers(),
-                        json={
-                            "parent": {"database_id": self.database_id},
-                            "properties": properties
-                        }
-                    )
-                    resp.raise_for_status()
-                    created_count += 1
-
-                time.sleep(0.35)  # Respecter rate limit 3 RPS
-
-            except Exception as e:
-                errors.append(f"Erreur pour '{client_name}': {str(e)}")
+        created_count = 0
+        updated_count = 0
+        errors = []
+        synced = {}
+
+        for deal, (page_id, _), (written_id, error) in zip(deals, tasks, self._run_concurrently(_write, tasks)):
+            if error is not None:
+                errors.append(f"Erreur pour '{deal.get('client', '')}': {str(error)}")
+                continue
+            if page_id:
+                updated_count += 1
+            else:
+                created_count += 1
+            synced[deal.get('id')] = written_id
 
         return {
             "records_created": created_count,
             "records_updated": updated_count,
-            "errors": errors
+            "errors": errors,
+            "synced": synced
         }
@@ -1,16 +1,47 @@
 """
 Module de gestion de la connexion base de données.
 Supporte PostgreSQL (via DATABASE_URL) et SQLite (fallback local).
+
+Les connexions sont fournies par un pool thread-safe : chaque requête Flask
+emprunte une connexion au premier appel de get_connection() et la rend au pool
+à la fin de son contexte applicatif (teardown_appcontext).
 """
 
 import os
 import sqlite3
+import threading
+import time
+from collections import deque
 from pathlib import Path
 
-# Instance singleton de la connexion
-_connection = None
+from flask import g, has_app_context
+
 _db_type = None  # 'postgresql' ou 'sqlite'
 
+# Paramètres du pool (surchargeables via variables d'environnement ou app.config)
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+
+# Instance unique du pool (créée à la première demande)
+_pool = None
+_pool_lock = threading.Lock()
+
+# Connexions empruntées hors contexte Flask (scripts, threads de fond)
+_thread_local = threading.local()
+
+
+# Colonnes ajoutées au schéma SQLite après sa création (table, colonne, type) ;
+# côté PostgreSQL, init_schema.sql les ajoute par ALTER TABLE ... ADD COLUMN IF NOT EXISTS
+SQLITE_ADDED_COLUMNS = [
+    ('connector_configs', 'sync_interval_minutes', 'INTEGER'),
+    ('connector_configs', 'next_sync_at', 'TEXT'),
+    ('connector_configs', 'webhook_secret', 'TEXT'),
+    ('connector_configs', 'pending_webhook_secret', 'TEXT'),
+    ('sync_webhook_queue', 'attempts', 'INTEGER NOT NULL DEFAULT 0'),
+    ('sync_webhook_queue', 'last_error', 'TEXT'),
+]
+
 
 def get_db_type():
     """Retourne le type de base de données utilisé."""
@@ -20,40 +51,207 @@ def get_db_type():
     return _db_type
 
 
+def _create_raw_connection():
+    """Ouvre une nouvelle connexion physique selon le type de DB."""
+    if get_db_type() == 'postgresql':
+        import psycopg2
+        database_url = os.environ.get('DATABASE_URL')
+        # Ajouter sslmode=require si non présent (requis pour Supabase)
+        if database_url and 'sslmode' not in database_url:
+            separator = '&' if '?' in database_url else '?'
+            database_url = f"{database_url}{separator}sslmode=require"
+        conn = psycopg2.connect(database_url)
+        conn.autocommit = False
+        return conn
+
+    db_path = os.environ.get('SQLITE_DB_PATH') or Path(__file__).parent.parent / "crm_data.db"
+    # check_same_thread=False : une connexion peut changer de thread entre deux
+    # emprunts, mais le pool garantit qu'un seul thread l'utilise à la fois
+    conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=POOL_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def _is_healthy(conn) -> bool:
+    """Vérifie qu'une connexion est encore utilisable (health check à l'emprunt)."""
+    try:
+        if get_db_type() == 'postgresql' and conn.closed:
+            return False
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        conn.rollback()
+        return True
+    except Exception:
+        return False
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """
+    Pool de connexions thread-safe.
+
+    - size : nombre de connexions conservées ouvertes au repos
+    - max_overflow : connexions supplémentaires autorisées en pic, fermées au retour
+    - timeout : attente maximale (secondes) quand toutes les connexions sont prises
+    """
+
+    def __init__(self, size: int = POOL_SIZE, max_overflow: int = POOL_MAX_OVERFLOW,
+                 timeout: float = POOL_TIMEOUT):
+        self.size = max(1, size)
+        self.max_overflow = max(0, max_overflow)
+        self.timeout = timeout
+        self._idle = deque()
+        self._checked_out = 0
+        self._condition = threading.Condition()
+
+    def checkout(self):
+        """Emprunte une connexion saine, en attendant au plus `timeout` secondes."""
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                if self._idle:
+                    conn = self._idle.popleft()
+                    self._checked_out += 1
+                    break
+                if self._checked_out < self.size + self.max_overflow:
+                    conn = None
+                    self._checked_out += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception(
+                        f"Pool de connexions épuisé ({self.size + self.max_overflow} connexions "
+                        f"utilisées, attente > {self.timeout}s)"
+                    )
+                self._condition.wait(remaining)
+
+        # Ouverture / health check hors verrou pour ne pas bloquer les autres threads
+        try:
+            if conn is not None and not _is_healthy(conn):
+                _close_quietly(conn)
+                conn = None
+            if conn is None:
+                conn = _create_raw_connection()
+            return conn
+        except Exception:
+            with self._condition:
+                self._checked_out -= 1
+                self._condition.notify()
+            raise
+
+    def checkin(self, conn):
+        """Rend une connexion au pool (transaction en cours annulée)."""
+        try:
+            conn.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+
+        with self._condition:
+            self._checked_out -= 1
+            if healthy and len(self._idle) < self.size:
+                self._idle.append(conn)
+                conn = None
+            self._condition.notify()
+
+        # Connexion en overflow ou cassée : fermeture définitive
+        if conn is not None:
+            _close_quietly(conn)
+
+    def dispose(self):
+        """Ferme toutes les connexions au repos."""
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn in idle:
+            _close_quietly(conn)
+
+    def status(self) -> dict:
+        """Retourne l'état courant du pool (diagnostic)."""
+        with self._condition:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "idle": len(self._idle),
+                "checked_out": self._checked_out
+            }
+
+
+def get_pool() -> ConnectionPool:
+    """Retourne le pool de connexions (créé à la première demande)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def init_app(app):
+    """
+    Configure le pool depuis app.config et lie l'emprunt des connexions
+    au contexte applicatif Flask.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.dispose()
+        _pool = ConnectionPool(
+            size=int(app.config.get('DB_POOL_SIZE', POOL_SIZE)),
+            max_overflow=int(app.config.get('DB_POOL_MAX_OVERFLOW', POOL_MAX_OVERFLOW)),
+            timeout=float(app.config.get('DB_POOL_TIMEOUT', POOL_TIMEOUT))
+        )
+    app.teardown_appcontext(release_connection)
+
+
 def get_connection():
     """
-    Retourne une instance singleton de la connexion DB.
+    Retourne la connexion DB du contexte courant.
+    Dans une requête Flask, la connexion est empruntée au pool au premier appel
+    puis réutilisée jusqu'à la fin du contexte applicatif. Hors contexte Flask,
+    chaque thread conserve sa propre connexion jusqu'à release_connection().
     Utilise PostgreSQL si DATABASE_URL est définie, sinon SQLite.
     """
-    global _connection, _db_type
+    if has_app_context():
+        conn = g.get('_db_conn')
+        if conn is None:
+            conn = get_pool().checkout()
+            g._db_conn = conn
+        return conn
 
-    db_type = get_db_type()
+    conn = getattr(_thread_local, 'conn', None)
+    if conn is None:
+        conn = get_pool().checkout()
+        _thread_local.conn = conn
+    return conn
 
-    if db_type == 'postgresql':
-        import psycopg2
-        if _connection is None or _connection.closed:
-            database_url = os.environ.get('DATABASE_URL')
-            # Ajouter sslmode=require si non présent (requis pour Supabase)
-            if database_url and 'sslmode' not in database_url:
-                separator = '&' if '?' in database_url else '?'
-                database_url = f"{database_url}{separator}sslmode=require"
-            _connection = psycopg2.connect(database_url)
-            _connection.autocommit = False
+
+def release_connection(exc=None):
+    """Rend au pool la connexion empruntée par le contexte courant."""
+    if has_app_context():
+        conn = g.pop('_db_conn', None)
     else:
-        if _connection is None:
-            db_path = Path(__file__).parent.parent / "crm_data.db"
-            _connection = sqlite3.connect(str(db_path), check_same_thread=False)
-            _connection.row_factory = sqlite3.Row
-            _connection.execute("PRAGMA journal_mode=WAL")
-            _connection.execute("PRAGMA foreign_keys=ON")
+        conn = getattr(_thread_local, 'conn', None)
+        _thread_local.conn = None
 
-    return _connection
+    if conn is not None:
+        get_pool().checkin(conn)
 
 
 def init_database():
     """
     Initialise la base de données en créant le schéma.
     """
+    conn = None
     try:
         conn = get_connection()
         cursor = conn.cursor()
@@ -78,6 +276,8 @@ def init_database():
                 CREATE INDEX IF NOT EXISTS idx_deals_secteur ON deals(secteur);
                 CREATE INDEX IF NOT EXISTS idx_deals_date_echeance ON deals(date_echeance);
                 CREATE INDEX IF NOT EXISTS idx_deals_assignee ON deals(assignee);
+                CREATE INDEX IF NOT EXISTS idx_deals_client ON deals(client);
+                CREATE INDEX IF NOT EXISTS idx_deals_montant_brut ON deals(montant_brut);
 
                 CREATE TABLE IF NOT EXISTS connector_configs (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -87,6 +287,10 @@ def init_database():
                     table_name TEXT,
                     field_mapping TEXT,
                     is_active INTEGER DEFAULT 1,
+                    sync_interval_minutes INTEGER,
+                    next_sync_at TEXT,
+                    webhook_secret TEXT,
+                    pending_webhook_secret TEXT,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 );
 
@@ -102,7 +306,123 @@ def init_database():
                     started_at TIMESTAMP,
                     completed_at TIMESTAMP
                 );
+
+                CREATE TABLE IF NOT EXISTS import_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    source TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    rows_total INTEGER,
+                    rows_processed INTEGER DEFAULT 0,
+                    rows_imported INTEGER DEFAULT 0,
+                    rows_rejected INTEGER DEFAULT 0,
+                    cancel_requested INTEGER DEFAULT 0,
+                    result TEXT,
+                    error_message TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    started_at TIMESTAMP,
+                    completed_at TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_import_jobs_status ON import_jobs(status);
+
+                CREATE TABLE IF NOT EXISTS sync_watermarks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    provider TEXT NOT NULL,
+                    direction TEXT NOT NULL,
+                    watermark TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (provider, direction)
+                );
+                CREATE INDEX IF NOT EXISTS idx_deals_updated_at ON deals(updated_at);
+
+                CREATE TABLE IF NOT EXISTS sync_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    provider TEXT NOT NULL,
+                    direction TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'running',
+                    full_sync INTEGER DEFAULT 0,
+                    since TEXT,
+                    next_watermark TEXT,
+                    page_cursor TEXT,
+                    last_deal_id INTEGER,
+                    batches_committed INTEGER DEFAULT 0,
+                    records_processed INTEGER DEFAULT 0,
+                    records_created INTEGER DEFAULT 0,
+                    records_updated INTEGER DEFAULT 0,
+                    records_unchanged INTEGER DEFAULT 0,
+                    records_rejected INTEGER DEFAULT 0,
+                    job_id INTEGER,
+                    error_message TEXT,
+                    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    completed_at TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_sync_runs_provider ON sync_runs(provider, started_at);
+
+                CREATE TABLE IF NOT EXISTS sync_locks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    provider TEXT UNIQUE NOT NULL,
+                    owner TEXT NOT NULL,
+                    acquired_at TEXT NOT NULL,
+                    expires_at TEXT NOT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    modified_at TEXT NOT NULL
+                );
+                INSERT INTO data_versions (name, version, modified_at)
+                VALUES ('deals', 0, strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
+                ON CONFLICT (name) DO NOTHING;
+
+                CREATE TABLE IF NOT EXISTS sync_webhook_queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    provider TEXT NOT NULL,
+                    record_id TEXT NOT NULL,
+                    notifications INTEGER NOT NULL DEFAULT 1,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (provider, record_id)
+                );
+
+                CREATE TABLE IF NOT EXISTS deal_external_refs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    deal_id INTEGER NOT NULL REFERENCES deals(id) ON DELETE CASCADE,
+                    provider TEXT NOT NULL,
+                    external_id TEXT NOT NULL,
+                    content_hash TEXT,
+                    synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (deal_id, provider),
+                    UNIQUE (provider, external_id)
+                );
+
+                CREATE TABLE IF NOT EXISTS airtable_record_names (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    base_id TEXT NOT NULL,
+                    table_id TEXT NOT NULL,
+                    record_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    UNIQUE (base_id, table_id, record_id)
+                );
+
+                CREATE TABLE IF NOT EXISTS airtable_record_name_tables (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    base_id TEXT NOT NULL,
+                    table_id TEXT NOT NULL,
+                    full_refreshed_at TEXT NOT NULL,
+                    refreshed_at TEXT NOT NULL,
+                    UNIQUE (base_id, table_id)
+                );
             """)
+
+            # Colonnes ajoutées après la création initiale des tables (bases existantes)
+            for table, column, column_type in SQLITE_ADDED_COLUMNS:
+                cursor.execute(f"PRAGMA table_info({table})")
+                if column not in [row[1] for row in cursor.fetchall()]:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
             conn.commit()
         else:
             schema_path = Path(__file__).parent / "init_schema.sql"
@@ -112,20 +432,18 @@ def init_database():
             conn.commit()
 
     except Exception as e:
-        if _connection:
+        if conn is not None:
             try:
-                _connection.rollback()
+                conn.rollback()
             except Exception:
                 pass
         raise Exception(f"Erreur lors de l'initialisation de la base de données: {str(e)}")
 
 
 def close_connection():
-    """Ferme proprement la connexion database."""
-    global _connection
-    if _connection is not None:
-        try:
-            _connection.close()
-        except Exception:
-            pass
-    _connection = None
+    """Rend la connexion courante et ferme proprement les connexions du pool."""
+    global _pool
+    release_connection()
+    if _pool is not None:
+        _pool.dispose()
+    _pool = None
@@ -4,11 +4,61 @@ Fournit les fonctions d'insertion, lecture, mise à jour et suppression des donn
 Supporte PostgreSQL et SQLite.
 """
 
+import io
+import sqlite3
 import pandas as pd
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from utils.constants import WON_STATUSES, COLD_DEAL_THRESHOLD_DAYS
 from .connection import get_connection, get_db_type
-from .models import TABLE_NAME
+from .models import TABLE_NAME, SELECTABLE_COLUMNS, SORTABLE_COLUMNS
+from .snapshot import deal_snapshot
+
+
+# Version des données deals (table data_versions) : incrémentée dans la transaction de chaque
+# écriture, donc partagée par tous les processus workers (clés du cache analytics, ETags).
+DATA_VERSION_NAME = 'deals'
+
+
+def get_data_version_info() -> Tuple[int, datetime]:
+    """Retourne (version courante des données deals, horodatage UTC de la dernière écriture)."""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        ph = _placeholder()
+        cursor.execute(f"SELECT version, modified_at FROM data_versions WHERE name = {ph}", (DATA_VERSION_NAME,))
+        row = cursor.fetchone()
+        if row is None:
+            return 0, datetime.fromtimestamp(0, tz=timezone.utc)
+        modified_at = datetime.strptime(row[1], SYNC_TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+        return int(row[0]), modified_at
+    except Exception as e:
+        raise Exception(f"Erreur lecture version des données: {str(e)}")
+
+
+def get_data_version() -> int:
+    """Retourne la version courante des données deals."""
+    return get_data_version_info()[0]
+
+
+def get_data_modified_at() -> datetime:
+    """Retourne l'horodatage (UTC) de la dernière écriture des deals, tous processus confondus."""
+    return get_data_version_info()[1]
+
+
+def bump_data_version(cursor) -> int:
+    """
+    Incrémente la version des données deals dans la transaction d'écriture en cours
+    (à appeler avant son commit). Retourne la nouvelle version.
+    """
+    ph = _placeholder()
+    now = datetime.now(timezone.utc).strftime(SYNC_TIMESTAMP_FORMAT)
+    cursor.execute(
+        f"UPDATE data_versions SET version = version + 1, modified_at = {ph} WHERE name = {ph} RETURNING version",
+        (now, DATA_VERSION_NAME)
+    )
+    return int(cursor.fetchone()[0])
 
 
 def _placeholder():
@@ -41,28 +91,99 @@ def _row_to_dict(cursor, row) -> Dict[str, Any]:
     return result
 
 
+# Chargement en masse : à partir de BULK_COPY_THRESHOLD deals, PostgreSQL reçoit les lignes via
+# COPY FROM STDIN (par tranches de COPY_CHUNK_ROWS) ; en dessous, via execute_values paginé.
+BULK_COPY_THRESHOLD = 1000
+COPY_CHUNK_ROWS = 50000
+EXECUTE_VALUES_PAGE_SIZE = 1000
+
+# Limite historique de SQLite sur le nombre de paramètres d'une requête (< 3.32)
+SQLITE_DEFAULT_MAX_VARIABLES = 999
+
+
+def _copy_csv_value(value: Any) -> str:
+    """Formate une valeur pour COPY ... (FORMAT csv) : NULL = champ vide non quoté."""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    text = str(value)
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _copy_rows(cursor, columns: List[str], values: List[tuple]) -> None:
+    """Insère les lignes via COPY FROM STDIN (PostgreSQL), par tranches pour borner la mémoire."""
+    copy_sql = f"COPY {TABLE_NAME} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    for start in range(0, len(values), COPY_CHUNK_ROWS):
+        buffer = io.StringIO()
+        for row in values[start:start + COPY_CHUNK_ROWS]:
+            buffer.write(','.join(_copy_csv_value(v) for v in row))
+            buffer.write('\n')
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
+
+
+def _execute_values_rows(cursor, columns: List[str], values: List[tuple], table: str = TABLE_NAME) -> None:
+    """Insère les lignes par pages multi-lignes (PostgreSQL, petits lots)."""
+    from psycopg2.extras import execute_values
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+    execute_values(cursor, query, values, page_size=EXECUTE_VALUES_PAGE_SIZE)
+
+
+def _insert_multirow_sqlite(conn, cursor, columns: List[str], values: List[tuple],
+                            table: str = TABLE_NAME) -> None:
+    """
+    Insère les lignes par requêtes INSERT multi-lignes (SQLite), chacune remplie jusqu'à
+    la limite de paramètres : deux fois moins d'appels au moteur qu'executemany.
+    """
+    try:
+        max_variables = conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    except AttributeError:
+        max_variables = SQLITE_DEFAULT_MAX_VARIABLES
+    rows_per_statement = max(1, max_variables // len(columns))
+
+    row_placeholders = "(" + ", ".join("?" for _ in columns) + ")"
+    prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+    full_query = prefix + ", ".join([row_placeholders] * rows_per_statement)
+
+    for start in range(0, len(values), rows_per_statement):
+        batch = values[start:start + rows_per_statement]
+        query = full_query if len(batch) == rows_per_statement else \
+            prefix + ", ".join([row_placeholders] * len(batch))
+        cursor.execute(query, [value for row in batch for value in row])
+
+
 def insert_deals(deals_list: List[Dict[str, Any]]) -> int:
     """
-    Insère une liste de deals en base de données (insertion batch).
+    Insère une liste de deals en base de données (insertion batch, une seule transaction).
+    PostgreSQL : COPY pour les gros lots, execute_values sinon. SQLite : INSERT multi-lignes.
     """
     if not deals_list:
         return 0
 
     conn = get_connection()
     cursor = conn.cursor()
-    ph = _placeholder()
 
     try:
         columns = list(deals_list[0].keys())
-        placeholders = ", ".join([ph for _ in columns])
-        columns_str = ", ".join(columns)
-
-        insert_query = f"INSERT INTO {TABLE_NAME} ({columns_str}) VALUES ({placeholders})"
-
         values = [tuple(deal.get(col) for col in columns) for deal in deals_list]
 
-        cursor.executemany(insert_query, values)
-        conn.commit()
+        if get_db_type() == 'postgresql':
+            if len(values) >= BULK_COPY_THRESHOLD:
+                _copy_rows(cursor, columns, values)
+            else:
+                _execute_values_rows(cursor, columns, values)
+        else:
+            _insert_multirow_sqlite(conn, cursor, columns, values)
+
+        version = bump_data_version(cursor)
+        with deal_snapshot.committing():
+            conn.commit()
+            deal_snapshot.refresh(new_deals=True, version=version)
 
         return len(deals_list)
 
@@ -74,6 +195,209 @@ def insert_deals(deals_list: List[Dict[str, Any]]) -> int:
         raise Exception(f"Erreur lors de l'insertion des deals: {str(e)}")
 
 
+# Table temporaire (propre à la connexion) recevant un lot de deals à upserter
+UPSERT_STAGING_TABLE = "deal_upserts"
+
+
+def upsert_deals_by_client(deals_list: List[Dict[str, Any]], provider: Optional[str] = None,
+                           external_ids: Optional[List[str]] = None,
+                           content_hashes: Optional[List[str]] = None,
+                           skip_unchanged: bool = True) -> Tuple[int, int]:
+    """
+    Crée ou met à jour un lot de deals identifiés par leur client, en une transaction.
+
+    Le lot est chargé dans une table temporaire puis appliqué en requêtes ensemblistes :
+    rattachement au deal existant (le plus ancien en cas de doublons), UPDATE ... FROM
+    des deals existants, INSERT ... SELECT des nouveaux. Un client présent plusieurs
+    fois dans le lot prend les valeurs de sa dernière occurrence, comme lors d'un
+    traitement record par record.
+
+    Avec provider et external_ids (ID du record externe de chaque deal), un record est
+    d'abord rattaché au deal lié à son ID dans deal_external_refs, sinon par client à un
+    deal pas encore lié à ce provider ; deux records externes de même client donnent deux
+    deals. Les liens (et content_hashes, un hash par deal) des records appliqués sont
+    enregistrés et, si skip_unchanged, les records dont le hash est celui de la dernière
+    synchronisation du deal ne sont pas réécrits.
+
+    Args:
+        deals_list: Deals à appliquer (mêmes clés pour tous, dont 'client')
+        provider: Provider de synchronisation
+        external_ids: ID externe de chaque deal (_airtable_id, _notion_page_id)
+        content_hashes: Hash de contenu de chaque deal (compute_content_hash)
+        skip_unchanged: False pour réécrire tous les records (synchronisation complète)
+
+    Returns:
+        Tuple[int, int]: (nombre de deals créés, nombre de records appliqués en mise à jour) ;
+        les records inchangés ne sont comptés ni dans l'un ni dans l'autre, les doublons
+        d'un même lot (même client ou ID externe) une seule fois
+    """
+    if not deals_list:
+        return 0, 0
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+    staging = UPSERT_STAGING_TABLE
+    track_refs = provider is not None and external_ids is not None
+
+    try:
+        if get_db_type() == 'sqlite' and not conn.in_transaction:
+            # Verrou d'écriture pris d'emblée : en WAL, une transaction différée qui a déjà lu
+            # la base échoue sans attendre si une autre connexion a écrit entre-temps
+            cursor.execute("BEGIN IMMEDIATE")
+
+        columns = list(deals_list[0].keys())
+        columns_str = ", ".join(columns)
+
+        refs = external_ids if track_refs else [None] * len(deals_list)
+        hashes = content_hashes if track_refs and content_hashes is not None else [None] * len(deals_list)
+
+        # Dernière occurrence de chaque record externe (ou de chaque client, sans ID externe)
+        latest = {}
+        for deal, external_id, content_hash in zip(deals_list, refs, hashes):
+            latest[external_id or ('client', deal['client'])] = (deal, external_id, content_hash)
+        staged_columns = columns + ['seq', 'external_id', 'content_hash']
+        values = [tuple(deal.get(col) for col in columns) + (seq, external_id, content_hash)
+                  for seq, (deal, external_id, content_hash) in enumerate(latest.values())]
+
+        # Table de staging aux types de la table deals, plus l'ID du deal rattaché (ou réservé
+        # pour un deal à créer), l'ordre dans le lot, l'ID externe et le hash
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.execute(
+            f"CREATE TEMP TABLE {staging} AS "
+            f"SELECT {columns_str}, CAST(NULL AS INTEGER) AS deal_id, CAST(NULL AS INTEGER) AS is_new, "
+            f"CAST(NULL AS INTEGER) AS seq, "
+            f"CAST(NULL AS VARCHAR(255)) AS external_id, CAST(NULL AS VARCHAR(40)) AS content_hash "
+            f"FROM {TABLE_NAME} WHERE 1 = 0"
+        )
+        if get_db_type() == 'postgresql':
+            _execute_values_rows(cursor, staged_columns, values, table=staging)
+        else:
+            _insert_multirow_sqlite(conn, cursor, staged_columns, values, table=staging)
+
+        if track_refs:
+            cursor.execute(
+                f"UPDATE {staging} SET deal_id = (SELECT r.deal_id FROM deal_external_refs r "
+                f"WHERE r.provider = {ph} AND r.external_id = {staging}.external_id)",
+                (provider,)
+            )
+            cursor.execute(
+                f"UPDATE {staging} SET deal_id = (SELECT MIN(d.id) FROM {TABLE_NAME} d "
+                f"WHERE d.client = {staging}.client AND NOT EXISTS (SELECT 1 FROM deal_external_refs r "
+                f"WHERE r.deal_id = d.id AND r.provider = {ph})) WHERE deal_id IS NULL",
+                (provider,)
+            )
+            # Un deal n'est rattaché qu'à un record du lot : les suivants seront créés
+            cursor.execute(
+                f"UPDATE {staging} SET deal_id = NULL WHERE deal_id IS NOT NULL AND EXISTS "
+                f"(SELECT 1 FROM {staging} s2 WHERE s2.deal_id = {staging}.deal_id AND s2.seq < {staging}.seq)"
+            )
+        else:
+            cursor.execute(
+                f"UPDATE {staging} SET deal_id = "
+                f"(SELECT MIN(d.id) FROM {TABLE_NAME} d WHERE d.client = {staging}.client)"
+            )
+
+        unchanged = 0
+        if track_refs and skip_unchanged:
+            # Records identiques à la dernière synchronisation : aucune écriture
+            cursor.execute(
+                f"DELETE FROM {staging} WHERE EXISTS (SELECT 1 FROM deal_external_refs r "
+                f"WHERE r.deal_id = {staging}.deal_id AND r.provider = {ph} "
+                f"AND r.content_hash = {staging}.content_hash)",
+                (provider,)
+            )
+            unchanged = cursor.rowcount
+
+        set_clause = ", ".join(f"{col} = s.{col}" for col in columns)
+        cursor.execute(
+            f"UPDATE {TABLE_NAME} SET {set_clause}, updated_at = CURRENT_TIMESTAMP "
+            f"FROM {staging} s WHERE {TABLE_NAME}.id = s.deal_id"
+        )
+        updated_ids = []
+        if deal_snapshot.enabled:
+            cursor.execute(f"SELECT deal_id FROM {staging} WHERE deal_id IS NOT NULL")
+            updated_ids = [row[0] for row in cursor.fetchall()]
+
+        if track_refs:
+            # IDs des nouveaux deals réservés et attribués par seq avant l'insertion : l'ordre
+            # des lignes de RETURNING n'est pas garanti, l'ID réservé sert de clé de rattachement
+            cursor.execute(f"SELECT seq FROM {staging} WHERE deal_id IS NULL ORDER BY seq")
+            new_seqs = [row[0] for row in cursor.fetchall()]
+            created_ids = list(zip(_reserve_deal_ids(cursor, len(new_seqs)), new_seqs))
+            created = len(created_ids)
+
+            cursor.executemany(f"UPDATE {staging} SET deal_id = {ph}, is_new = 1 WHERE seq = {ph}", created_ids)
+            cursor.execute(
+                f"INSERT INTO {TABLE_NAME} (id, {columns_str}) "
+                f"SELECT deal_id, {columns_str} FROM {staging} WHERE is_new = 1 ORDER BY seq"
+            )
+
+            # Un ID externe relié à un autre deal (record re-rattaché) : lien périmé supprimé,
+            # sans quoi l'upsert sur (deal_id, provider) violerait UNIQUE (provider, external_id)
+            cursor.execute(
+                f"DELETE FROM deal_external_refs WHERE provider = {ph} AND EXISTS "
+                f"(SELECT 1 FROM {staging} s WHERE s.external_id = deal_external_refs.external_id "
+                f"AND s.deal_id IS NOT NULL AND s.deal_id <> deal_external_refs.deal_id)",
+                (provider,)
+            )
+            cursor.execute(
+                f"INSERT INTO deal_external_refs (deal_id, provider, external_id, content_hash) "
+                f"SELECT deal_id, {ph}, external_id, content_hash FROM {staging} "
+                f"WHERE deal_id IS NOT NULL AND external_id IS NOT NULL "
+                f"ON CONFLICT (deal_id, provider) DO UPDATE SET external_id = excluded.external_id, "
+                f"content_hash = excluded.content_hash, synced_at = CURRENT_TIMESTAMP",
+                (provider,)
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO {TABLE_NAME} ({columns_str}) "
+                f"SELECT {columns_str} FROM {staging} WHERE deal_id IS NULL ORDER BY seq"
+            )
+            created = cursor.rowcount
+
+        cursor.execute(f"DROP TABLE {staging}")
+        if len(values) > unchanged:
+            version = bump_data_version(cursor)
+            with deal_snapshot.committing():
+                conn.commit()
+                deal_snapshot.refresh(updated_ids, new_deals=created > 0, version=version)
+        else:
+            conn.commit()
+
+        return created, len(values) - created - unchanged
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur lors de l'upsert des deals: {str(e)}")
+
+
+def _reserve_deal_ids(cursor, count: int) -> List[int]:
+    """
+    Réserve count IDs de deals, croissants, pour des insertions avec ID explicite : valeurs
+    de la séquence PostgreSQL, ou suite du compteur AUTOINCREMENT SQLite (verrou d'écriture
+    de la transaction tenu jusqu'à l'insertion).
+    """
+    if count == 0:
+        return []
+    if get_db_type() == 'postgresql':
+        cursor.execute(
+            f"SELECT nextval(pg_get_serial_sequence('{TABLE_NAME}', 'id')) FROM generate_series(1, %s)",
+            (count,)
+        )
+        return sorted(row[0] for row in cursor.fetchall())
+
+    cursor.execute(
+        f"SELECT MAX(COALESCE((SELECT MAX(id) FROM {TABLE_NAME}), 0), "
+        f"COALESCE((SELECT seq FROM sqlite_sequence WHERE name = '{TABLE_NAME}'), 0))"
+    )
+    last_id = cursor.fetchone()[0]
+    return list(range(last_id + 1, last_id + 1 + count))
+
+
 def get_all_deals() -> pd.DataFrame:
     """Récupère tous les deals de la base de données."""
     try:
@@ -121,7 +445,10 @@ def insert_deal(deal_dict: Dict[str, Any]) -> Dict[str, Any]:
             cursor.execute(insert_query, values)
             new_id = cursor.lastrowid
 
-        conn.commit()
+        version = bump_data_version(cursor)
+        with deal_snapshot.committing():
+            conn.commit()
+            deal_snapshot.refresh([new_id], version=version)
         return get_deal_by_id(new_id)
 
     except Exception as e:
@@ -144,11 +471,16 @@ def update_deal(deal_id: int, deal_dict: Dict[str, Any]) -> Optional[Dict[str, A
 
     try:
         set_clauses = ", ".join([f"{col} = {ph}" for col in deal_dict.keys()])
+        if 'updated_at' not in deal_dict:
+            set_clauses += ", updated_at = CURRENT_TIMESTAMP"
         values = list(deal_dict.values()) + [deal_id]
 
         update_query = f"UPDATE {TABLE_NAME} SET {set_clauses} WHERE id = {ph}"
         cursor.execute(update_query, values)
-        conn.commit()
+        version = bump_data_version(cursor)
+        with deal_snapshot.committing():
+            conn.commit()
+            deal_snapshot.refresh([deal_id], version=version)
 
         return get_deal_by_id(deal_id)
 
@@ -172,7 +504,10 @@ def delete_deal(deal_id: int) -> bool:
 
     try:
         cursor.execute(f"DELETE FROM {TABLE_NAME} WHERE id = {ph}", (deal_id,))
-        conn.commit()
+        version = bump_data_version(cursor)
+        with deal_snapshot.committing():
+            conn.commit()
+            deal_snapshot.refresh([deal_id], version=version)
         return True
 
     except Exception as e:
@@ -183,54 +518,235 @@ def delete_deal(deal_id: int) -> bool:
         raise Exception(f"Erreur lors de la suppression du deal {deal_id}: {str(e)}")
 
 
+def _build_filter_conditions(params: Dict[str, Any]) -> Tuple[List[str], List[Any]]:
+    """Construit les conditions SQL (et leurs valeurs) correspondant aux filtres fournis."""
+    ph = _placeholder()
+    conditions = []
+    values = []
+
+    if params.get('statut'):
+        statuts = params['statut'] if isinstance(params['statut'], list) else [params['statut']]
+        placeholders = ", ".join([ph for _ in statuts])
+        conditions.append(f"statut IN ({placeholders})")
+        values.extend(statuts)
+
+    if params.get('secteur'):
+        secteurs = params['secteur'] if isinstance(params['secteur'], list) else [params['secteur']]
+        placeholders = ", ".join([ph for _ in secteurs])
+        conditions.append(f"secteur IN ({placeholders})")
+        values.extend(secteurs)
+
+    if params.get('assignee'):
+        assignees = params['assignee'] if isinstance(params['assignee'], list) else [params['assignee']]
+        placeholders = ", ".join([ph for _ in assignees])
+        conditions.append(f"assignee IN ({placeholders})")
+        values.extend(assignees)
+
+    if params.get('date_from'):
+        conditions.append(f"date_echeance >= {ph}")
+        values.append(params['date_from'])
+
+    if params.get('date_to'):
+        conditions.append(f"date_echeance <= {ph}")
+        values.append(params['date_to'])
+
+    if params.get('search'):
+        conditions.append(f"(LOWER(client) LIKE {ph} OR LOWER(notes) LIKE {ph})")
+        search_term = f"%{params['search'].lower()}%"
+        values.extend([search_term, search_term])
+
+    return conditions, values
+
+
+def _build_filter_clause(params: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    Construit la clause WHERE (et ses valeurs) correspondant aux filtres fournis.
+    Retourne une chaîne vide si aucun filtre n'est actif.
+    """
+    conditions, values = _build_filter_conditions(params)
+    if not conditions:
+        return "", values
+    return " WHERE " + " AND ".join(conditions), values
+
+
 def get_filtered_deals(params: Dict[str, Any]) -> pd.DataFrame:
     """Récupère les deals filtrés selon les paramètres fournis."""
     try:
         conn = get_connection()
-        ph = _placeholder()
-        query = f"SELECT * FROM {TABLE_NAME}"
-        conditions = []
-        values = []
+        where_clause, values = _build_filter_clause(params)
+        query = f"SELECT * FROM {TABLE_NAME}{where_clause}"
+
+        df = pd.read_sql_query(query, conn, params=values)
+        return _convert_decimals(df)
+
+    except Exception as e:
+        raise Exception(f"Erreur lors de la lecture filtrée des deals: {str(e)}")
+
 
-        if params.get('statut'):
-            statuts = params['statut'] if isinstance(params['statut'], list) else [params['statut']]
-            placeholders = ", ".join([ph for _ in statuts])
-            conditions.append(f"statut IN ({placeholders})")
-            values.extend(statuts)
-
-        if params.get('secteur'):
-            secteurs = params['secteur'] if isinstance(params['secteur'], list) else [params['secteur']]
-            placeholders = ", ".join([ph for _ in secteurs])
-            conditions.append(f"secteur IN ({placeholders})")
-            values.extend(secteurs)
-
-        if params.get('assignee'):
-            assignees = params['assignee'] if isinstance(params['assignee'], list) else [params['assignee']]
-            placeholders = ", ".join([ph for _ in assignees])
-            conditions.append(f"assignee IN ({placeholders})")
-            values.extend(assignees)
-
-        if params.get('date_from'):
-            conditions.append(f"date_echeance >= {ph}")
-            values.append(params['date_from'])
-
-        if params.get('date_to'):
-            conditions.append(f"date_echeance <= {ph}")
-            values.append(params['date_to'])
-
-        if params.get('search'):
-            conditions.append(f"(LOWER(client) LIKE {ph} OR LOWER(notes) LIKE {ph})")
-            search_term = f"%{params['search'].lower()}%"
-            values.extend([search_term, search_term])
+def get_deals_page(params: Dict[str, Any], limit: Optional[int] = None,
+                   after: Optional[Tuple[Any, int]] = None, sort: str = 'id',
+                   order: str = 'asc', fields: Optional[List[str]] = None
+                   ) -> Tuple[pd.DataFrame, int, Optional[Tuple[Any, int]]]:
+    """
+    Récupère une page de deals filtrés, triés et projetés côté SQL (pagination par curseur).
+
+    Args:
+        params: Filtres (mêmes clés que get_filtered_deals)
+        limit: Taille de page (None = tous les deals restants)
+        after: Clé (valeur de tri, id) du dernier deal de la page précédente
+        sort: Colonne de tri (parmi SORTABLE_COLUMNS)
+        order: 'asc' ou 'desc'
+        fields: Colonnes à retourner (parmi SELECTABLE_COLUMNS, id toujours inclus)
+
+    Returns:
+        Tuple (DataFrame de la page, nombre total de deals filtrés, clé de la page suivante ou None)
+    """
+    if sort not in SORTABLE_COLUMNS:
+        raise Exception(f"Colonne de tri non supportée: {sort}")
+    direction = 'DESC' if order == 'desc' else 'ASC'
+    columns = [c for c in SELECTABLE_COLUMNS if not fields or c in fields or c == 'id']
+
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        ph = _placeholder()
+        conditions, values = _build_filter_conditions(params)
 
+        # Total filtré (indépendant de la page courante)
+        count_query = f"SELECT COUNT(*) FROM {TABLE_NAME}"
+        if conditions:
+            count_query += " WHERE " + " AND ".join(conditions)
+        cursor.execute(count_query, values)
+        total = int(cursor.fetchone()[0])
+
+        # Condition keyset : deals situés après le curseur dans l'ordre (sort, id), NULLs en dernier
+        if after is not None:
+            last_value, last_id = after
+            op = '<' if direction == 'DESC' else '>'
+            if sort == 'id':
+                conditions.append(f"id {op} {ph}")
+                values.append(last_id)
+            elif last_value is None:
+                conditions.append(f"({sort} IS NULL AND id {op} {ph})")
+                values.append(last_id)
+            else:
+                conditions.append(f"({sort} IS NULL OR {sort} {op} {ph} OR ({sort} = {ph} AND id {op} {ph}))")
+                values.extend([last_value, last_value, last_id])
+
+        select_columns = columns if sort in columns else columns + [sort]
+        query = f"SELECT {', '.join(select_columns)} FROM {TABLE_NAME}"
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
+        if sort == 'id':
+            query += f" ORDER BY id {direction}"
+        else:
+            query += f" ORDER BY {sort} {direction} NULLS LAST, id {direction}"
+        if limit is not None:
+            # Une ligne de plus pour savoir s'il existe une page suivante
+            query += f" LIMIT {ph}"
+            values.append(limit + 1)
 
-        df = pd.read_sql_query(query, conn, params=values)
-        return _convert_decimals(df)
+        df = _convert_decimals(pd.read_sql_query(query, conn, params=values))
+
+        next_key = None
+        if limit is not None and len(df) > limit:
+            df = df.iloc[:limit]
+            last = df.iloc[-1]
+            last_value = last[sort]
+            next_key = (None if pd.isna(last_value) else last_value, int(last['id']))
+
+        return df[columns], total, next_key
 
     except Exception as e:
-        raise Exception(f"Erreur lors de la lecture filtrée des deals: {str(e)}")
+        raise Exception(f"Erreur lors de la lecture paginée des deals: {str(e)}")
+
+
+def get_deal_kpis(params: Optional[Dict[str, Any]] = None,
+                  cold_threshold_days: int = COLD_DEAL_THRESHOLD_DAYS) -> Dict[str, Any]:
+    """
+    Calcule les KPIs directement en SQL (sans charger les deals en mémoire).
+
+    Returns:
+        Dict avec nombre_deals, pipeline_pondere, panier_moyen, deals_gagnes,
+        vitesse_vente_moyenne (jours) et nb_cold_deals
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        ph = _placeholder()
+        where_clause, filter_values = _build_filter_clause(params or {})
+
+        won_placeholders = ", ".join([ph for _ in WON_STATUSES])
+        is_won = f"LOWER(TRIM(statut)) IN ({won_placeholders})"
+        if get_db_type() == 'postgresql':
+            duration_days = "EXTRACT(EPOCH FROM (updated_at - created_at)) / 86400"
+        else:
+            duration_days = "(julianday(updated_at) - julianday(created_at))"
+
+        query = f"""
+            SELECT
+                COUNT(*),
+                COALESCE(SUM(valeur_ponderee), 0),
+                COALESCE(AVG(montant_brut), 0),
+                COUNT(*) FILTER (WHERE {is_won}),
+                AVG({duration_days}) FILTER (WHERE {is_won} AND updated_at >= created_at),
+                COUNT(*) FILTER (WHERE NOT ({is_won}) AND updated_at < {ph})
+            FROM {TABLE_NAME}{where_clause}
+        """
+        threshold = (datetime.now() - timedelta(days=cold_threshold_days)).strftime('%Y-%m-%d %H:%M:%S')
+        values = list(WON_STATUSES) + list(WON_STATUSES) + list(WON_STATUSES) + [threshold] + filter_values
+
+        cursor.execute(query, values)
+        nombre, pipeline, panier, gagnes, vitesse, nb_cold = cursor.fetchone()
+
+        return {
+            "nombre_deals": int(nombre),
+            "pipeline_pondere": round(float(pipeline), 2),
+            "panier_moyen": round(float(panier), 2),
+            "deals_gagnes": int(gagnes),
+            "vitesse_vente_moyenne": round(float(vitesse), 1) if vitesse is not None else 0.0,
+            "nb_cold_deals": int(nb_cold)
+        }
+
+    except Exception as e:
+        raise Exception(f"Erreur lors du calcul des KPIs: {str(e)}")
+
+
+def get_db_timestamp() -> str:
+    """
+    Retourne l'horodatage courant selon l'horloge de la base, au format de la colonne
+    updated_at (watermark d'export comparable aux dates de modification des deals).
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        if get_db_type() == 'postgresql':
+            cursor.execute("SELECT LOCALTIMESTAMP")
+        else:
+            cursor.execute("SELECT CURRENT_TIMESTAMP")
+        return str(cursor.fetchone()[0])
+    except Exception as e:
+        raise Exception(f"Erreur lecture horodatage base: {str(e)}")
+
+
+def get_deals_updated_since(since: Optional[str] = None) -> pd.DataFrame:
+    """
+    Récupère les deals modifiés depuis un horodatage (tous les deals si since est None).
+
+    Args:
+        since: Horodatage retourné par get_db_timestamp() (borne incluse)
+    """
+    if since is None:
+        return get_all_deals()
+
+    try:
+        conn = get_connection()
+        ph = _placeholder()
+        query = f"SELECT * FROM {TABLE_NAME} WHERE updated_at >= {ph} ORDER BY id"
+        df = pd.read_sql_query(query, conn, params=(since,))
+        return _convert_decimals(df)
+    except Exception as e:
+        raise Exception(f"Erreur lecture deals modifiés depuis {since}: {str(e)}")
 
 
 def get_filter_options() -> Dict[str, List[str]]:
@@ -339,75 +855,979 @@ def upsert_connector_config(provider: str, data: Dict[str, Any]) -> Dict[str, An
         raise Exception(f"Erreur upsert config {provider}: {str(e)}")
 
 
-# --- CRUD sync_logs ---
+# Format des horodatages UTC de planification et de verrou (comparables comme chaînes)
+SYNC_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
 
-def insert_sync_log(data: Dict[str, Any]) -> Dict[str, Any]:
-    """Insère un log de synchronisation."""
+
+def claim_scheduled_sync(provider: str, now: str, next_sync_at: str) -> bool:
+    """
+    Réserve l'échéance de synchronisation planifiée d'un connecteur si elle est atteinte
+    (next_sync_at absent ou <= now) en la repoussant à next_sync_at ; horodatages au
+    format SYNC_TIMESTAMP_FORMAT. Plusieurs processus peuvent tenter la réservation :
+    un seul l'obtient.
+
+    Returns:
+        True si l'échéance a été réservée par cet appel
+    """
     conn = get_connection()
     cursor = conn.cursor()
     ph = _placeholder()
 
     try:
-        columns = list(data.keys())
-        placeholders = ", ".join([ph for _ in columns])
-        columns_str = ", ".join(columns)
-        values = tuple(data[col] for col in columns)
+        cursor.execute(
+            f"UPDATE connector_configs SET next_sync_at = {ph} "
+            f"WHERE provider = {ph} AND (next_sync_at IS NULL OR next_sync_at <= {ph})",
+            (next_sync_at, provider, now)
+        )
+        claimed = cursor.rowcount == 1
+        conn.commit()
+        return claimed
 
-        if get_db_type() == 'postgresql':
-            query = f"INSERT INTO sync_logs ({columns_str}) VALUES ({placeholders}) RETURNING id"
-            cursor.execute(query, values)
-            new_id = cursor.fetchone()[0]
-        else:
-            query = f"INSERT INTO sync_logs ({columns_str}) VALUES ({placeholders})"
-            cursor.execute(query, values)
-            new_id = cursor.lastrowid
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur planification synchronisation {provider}: {str(e)}")
 
-        conn.commit()
 
-        cursor.execute(f"SELECT * FROM sync_logs WHERE id = {ph}", (new_id,))
-        row = cursor.fetchone()
-        return _row_to_dict(cursor, row)
+# --- CRUD sync_locks ---
+
+def acquire_sync_lock(provider: str, owner: str, ttl_seconds: int) -> bool:
+    """
+    Prend le verrou de synchronisation d'un provider pour ttl_seconds (bail), s'il est
+    libre ou expiré (processus arrêté sans le rendre).
+
+    Returns:
+        True si le verrou a été obtenu par owner
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        now = datetime.now(timezone.utc)
+        now_str = now.strftime(SYNC_TIMESTAMP_FORMAT)
+        expires_at = (now + timedelta(seconds=ttl_seconds)).strftime(SYNC_TIMESTAMP_FORMAT)
+
+        cursor.execute(
+            f"INSERT INTO sync_locks (provider, owner, acquired_at, expires_at) VALUES ({ph}, {ph}, {ph}, {ph}) "
+            f"ON CONFLICT (provider) DO UPDATE SET owner = excluded.owner, "
+            f"acquired_at = excluded.acquired_at, expires_at = excluded.expires_at "
+            f"WHERE sync_locks.expires_at <= {ph}",
+            (provider, owner, now_str, expires_at, now_str)
+        )
+        acquired = cursor.rowcount == 1
+        conn.commit()
+        return acquired
 
     except Exception as e:
         try:
             conn.rollback()
         except Exception:
             pass
-        raise Exception(f"Erreur insertion sync_log: {str(e)}")
+        raise Exception(f"Erreur verrou synchronisation {provider}: {str(e)}")
 
 
-def get_sync_logs(limit: int = 50, provider_filter: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Récupère les derniers logs de synchronisation."""
+def release_sync_lock(provider: str, owner: str) -> None:
+    """Rend le verrou de synchronisation d'un provider (sans effet s'il a été repris entre-temps)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        ph = _placeholder()
+        cursor.execute(f"DELETE FROM sync_locks WHERE provider = {ph} AND owner = {ph}", (provider, owner))
+        conn.commit()
 
-        query = "SELECT * FROM sync_logs"
-        values = []
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur libération verrou synchronisation {provider}: {str(e)}")
 
-        if provider_filter:
-            query += f" WHERE provider = {ph}"
-            values.append(provider_filter)
 
-        query += f" ORDER BY started_at DESC LIMIT {ph}"
-        values.append(limit)
+# --- CRUD sync_webhook_queue ---
 
-        cursor.execute(query, values)
-        rows = cursor.fetchall()
-        return [_row_to_dict(cursor, row) for row in rows]
+def enqueue_webhook_records(provider: str, record_ids: List[str], watermark: Optional[str] = None) -> int:
+    """
+    Ajoute à la file d'import les records signalés modifiés par une notification webhook.
+    Un record déjà en file voit son compteur de notifications incrémenté et ses échecs
+    oubliés (record modifié : une lecture mise de côté est retentée).
+
+    Args:
+        watermark: Curseur webhook du provider (payloads lus) enregistré dans la même
+            transaction : il n'avance jamais sans que les records soient en file
+
+    Returns:
+        Le nombre de records distincts mis en file
+    """
+    record_ids = list(dict.fromkeys(record_id for record_id in record_ids if record_id))
+    if not record_ids and watermark is None:
+        return 0
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+    on_conflict = ("ON CONFLICT (provider, record_id) DO UPDATE SET "
+                   "notifications = sync_webhook_queue.notifications + 1, attempts = 0, last_error = NULL")
+    rows = [(provider, record_id) for record_id in record_ids]
+
+    try:
+        if rows and get_db_type() == 'postgresql':
+            from psycopg2.extras import execute_values
+            execute_values(
+                cursor,
+                f"INSERT INTO sync_webhook_queue (provider, record_id) VALUES %s {on_conflict}",
+                rows, page_size=EXECUTE_VALUES_PAGE_SIZE
+            )
+        elif rows:
+            cursor.executemany(
+                f"INSERT INTO sync_webhook_queue (provider, record_id) VALUES ({ph}, {ph}) {on_conflict}",
+                rows
+            )
+        if watermark is not None:
+            cursor.execute(
+                f"INSERT INTO sync_watermarks (provider, direction, watermark) VALUES ({ph}, 'webhook', {ph}) "
+                f"ON CONFLICT (provider, direction) DO UPDATE SET watermark = excluded.watermark, "
+                f"updated_at = CURRENT_TIMESTAMP",
+                (provider, watermark)
+            )
+        conn.commit()
+        return len(rows)
 
     except Exception as e:
-        raise Exception(f"Erreur lecture sync_logs: {str(e)}")
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur mise en file webhook {provider}: {str(e)}")
 
 
-def clear_all_deals() -> None:
-    """Supprime tous les deals de la table."""
+def get_webhook_queue(provider: str, limit: int, max_attempts: int,
+                      after_id: int = 0) -> List[Tuple[int, str, int]]:
+    """
+    Retourne les plus anciens records en file d'import webhook d'un provider, hors records
+    mis de côté (max_attempts lectures en échec).
+
+    Args:
+        after_id: Reprend la lecture après cette entrée (ID de file), pour parcourir la file
+            sans relire les records en échec
+
+    Returns:
+        Liste de tuples (id, record_id, notifications) à passer à delete_webhook_records
+    """
     try:
         conn = get_connection()
         cursor = conn.cursor()
-        cursor.execute(f"DELETE FROM {TABLE_NAME}")
-        conn.commit()
+        ph = _placeholder()
+        cursor.execute(
+            f"SELECT id, record_id, notifications FROM sync_webhook_queue "
+            f"WHERE provider = {ph} AND attempts < {ph} AND id > {ph} ORDER BY id LIMIT {ph}",
+            (provider, max_attempts, after_id, limit)
+        )
+        return [(row[0], row[1], row[2]) for row in cursor.fetchall()]
+    except Exception as e:
+        raise Exception(f"Erreur lecture file webhook {provider}: {str(e)}")
+
+
+def delete_webhook_records(provider: str, entries: List[Tuple[int, str, int]]) -> int:
+    """
+    Retire de la file les records importés. Un record notifié de nouveau depuis sa
+    lecture (compteur différent) reste en file pour être relu.
+
+    Returns:
+        Le nombre de records retirés
+    """
+    if not entries:
+        return 0
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        deleted = 0
+        for _, record_id, notifications in entries:
+            cursor.execute(
+                f"DELETE FROM sync_webhook_queue WHERE provider = {ph} AND record_id = {ph} AND notifications = {ph}",
+                (provider, record_id, notifications)
+            )
+            deleted += cursor.rowcount
+        conn.commit()
+        return deleted
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur suppression file webhook {provider}: {str(e)}")
+
+
+def fail_webhook_records(provider: str, failures: Dict[str, str]) -> None:
+    """
+    Enregistre l'échec de lecture de records en file (tentative comptée, dernière erreur) :
+    ils restent en file jusqu'au nombre maximal de tentatives, puis sont mis de côté.
+
+    Args:
+        failures: record_id → message d'erreur
+    """
+    if not failures:
+        return
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        cursor.executemany(
+            f"UPDATE sync_webhook_queue SET attempts = attempts + 1, last_error = {ph} "
+            f"WHERE provider = {ph} AND record_id = {ph}",
+            [(error[:1000], provider, record_id) for record_id, error in failures.items()]
+        )
+        conn.commit()
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur enregistrement échecs file webhook {provider}: {str(e)}")
+
+
+def clear_webhook_queue(provider: str) -> None:
+    """Vide la file webhook d'un provider (records d'une table distante qui n'est plus la source)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        cursor.execute(f"DELETE FROM sync_webhook_queue WHERE provider = {ph}", (provider,))
+        conn.commit()
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur suppression file webhook {provider}: {str(e)}")
+
+
+def count_webhook_queue(max_attempts: Optional[int] = None) -> Dict[str, int]:
+    """
+    Retourne le nombre de records en file d'import webhook par provider (hors records mis
+    de côté après max_attempts lectures en échec, si fourni).
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        ph = _placeholder()
+        if max_attempts is None:
+            cursor.execute("SELECT provider, COUNT(*) FROM sync_webhook_queue GROUP BY provider")
+        else:
+            cursor.execute(
+                f"SELECT provider, COUNT(*) FROM sync_webhook_queue WHERE attempts < {ph} GROUP BY provider",
+                (max_attempts,)
+            )
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    except Exception as e:
+        raise Exception(f"Erreur comptage file webhook: {str(e)}")
+
+
+# --- CRUD sync_logs ---
+
+def insert_sync_log(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Insère un log de synchronisation."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        columns = list(data.keys())
+        placeholders = ", ".join([ph for _ in columns])
+        columns_str = ", ".join(columns)
+        values = tuple(data[col] for col in columns)
+
+        if get_db_type() == 'postgresql':
+            query = f"INSERT INTO sync_logs ({columns_str}) VALUES ({placeholders}) RETURNING id"
+            cursor.execute(query, values)
+            new_id = cursor.fetchone()[0]
+        else:
+            query = f"INSERT INTO sync_logs ({columns_str}) VALUES ({placeholders})"
+            cursor.execute(query, values)
+            new_id = cursor.lastrowid
+
+        conn.commit()
+
+        cursor.execute(f"SELECT * FROM sync_logs WHERE id = {ph}", (new_id,))
+        row = cursor.fetchone()
+        return _row_to_dict(cursor, row)
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur insertion sync_log: {str(e)}")
+
+
+def get_sync_logs(limit: int = 50, provider_filter: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Récupère les derniers logs de synchronisation."""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        ph = _placeholder()
+
+        query = "SELECT * FROM sync_logs"
+        values = []
+
+        if provider_filter:
+            query += f" WHERE provider = {ph}"
+            values.append(provider_filter)
+
+        query += f" ORDER BY started_at DESC LIMIT {ph}"
+        values.append(limit)
+
+        cursor.execute(query, values)
+        rows = cursor.fetchall()
+        return [_row_to_dict(cursor, row) for row in rows]
+
+    except Exception as e:
+        raise Exception(f"Erreur lecture sync_logs: {str(e)}")
+
+
+# --- CRUD sync_watermarks ---
+
+def get_sync_watermark(provider: str, direction: str) -> Optional[str]:
+    """Retourne le watermark de la dernière synchronisation réussie (None si aucune)."""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        ph = _placeholder()
+        cursor.execute(
+            f"SELECT watermark FROM sync_watermarks WHERE provider = {ph} AND direction = {ph}",
+            (provider, direction)
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+    except Exception as e:
+        raise Exception(f"Erreur lecture watermark {provider}/{direction}: {str(e)}")
+
+
+def set_sync_watermark(provider: str, direction: str, watermark: str) -> None:
+    """Enregistre le watermark d'une synchronisation réussie."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        cursor.execute(
+            f"INSERT INTO sync_watermarks (provider, direction, watermark) VALUES ({ph}, {ph}, {ph}) "
+            f"ON CONFLICT (provider, direction) DO UPDATE SET watermark = excluded.watermark, "
+            f"updated_at = CURRENT_TIMESTAMP",
+            (provider, direction, watermark)
+        )
+        conn.commit()
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur enregistrement watermark {provider}/{direction}: {str(e)}")
+
+
+def clear_sync_watermarks(provider: str) -> None:
+    """Supprime les watermarks d'un provider (la prochaine synchronisation sera complète)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        cursor.execute(f"DELETE FROM sync_watermarks WHERE provider = {ph}", (provider,))
+        conn.commit()
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur suppression watermarks {provider}: {str(e)}")
+
+
+# --- CRUD sync_runs ---
+
+# Exécutions interrompues dont le checkpoint peut être repris : import ou export en erreur /
+# annulé, export partiel (deals en échec après le checkpoint). Un import partiel est allé au
+# bout de la lecture : ses records rejetés seront relus au prochain import.
+SYNC_RUN_RESUMABLE_CLAUSE = "(status IN ('error', 'cancelled') OR (direction = 'export' AND status = 'partial'))"
+
+
+def create_sync_run(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Crée une exécution de synchronisation (statut 'running') et la retourne."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        columns = list(data.keys())
+        placeholders = ", ".join([ph for _ in columns])
+        columns_str = ", ".join(columns)
+        values = tuple(data[col] for col in columns)
+
+        if get_db_type() == 'postgresql':
+            cursor.execute(f"INSERT INTO sync_runs ({columns_str}) VALUES ({placeholders}) RETURNING id", values)
+            new_id = cursor.fetchone()[0]
+        else:
+            cursor.execute(f"INSERT INTO sync_runs ({columns_str}) VALUES ({placeholders})", values)
+            new_id = cursor.lastrowid
+
+        conn.commit()
+        return get_sync_run(new_id)
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur création sync_run: {str(e)}")
+
+
+def get_sync_run(run_id: int) -> Optional[Dict[str, Any]]:
+    """Récupère une exécution de synchronisation par son ID."""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        ph = _placeholder()
+        cursor.execute(f"SELECT * FROM sync_runs WHERE id = {ph}", (run_id,))
+        row = cursor.fetchone()
+        return _row_to_dict(cursor, row)
+    except Exception as e:
+        raise Exception(f"Erreur lecture sync_run {run_id}: {str(e)}")
+
+
+def get_sync_runs(limit: int = 50, provider_filter: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Récupère les dernières exécutions de synchronisation."""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        ph = _placeholder()
+
+        query = "SELECT * FROM sync_runs"
+        values = []
+
+        if provider_filter:
+            query += f" WHERE provider = {ph}"
+            values.append(provider_filter)
+
+        query += f" ORDER BY started_at DESC, id DESC LIMIT {ph}"
+        values.append(limit)
+
+        cursor.execute(query, values)
+        rows = cursor.fetchall()
+        return [_row_to_dict(cursor, row) for row in rows]
+
+    except Exception as e:
+        raise Exception(f"Erreur lecture sync_runs: {str(e)}")
+
+
+def update_sync_run(run_id: int, data: Dict[str, Any]) -> None:
+    """Met à jour une exécution de synchronisation (checkpoint, compteurs, statut)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        set_parts = [f"{key} = {ph}" for key in data.keys()]
+        set_parts.append("updated_at = CURRENT_TIMESTAMP")
+        values = list(data.values()) + [run_id]
+
+        cursor.execute(f"UPDATE sync_runs SET {', '.join(set_parts)} WHERE id = {ph}", values)
+        conn.commit()
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur mise à jour sync_run {run_id}: {str(e)}")
+
+
+def claim_sync_run(run_id: int, stale_after: int) -> bool:
+    """
+    Repasse une exécution interrompue à l'état 'running' pour la reprendre : exécution
+    reprenable (SYNC_RUN_RESUMABLE_CLAUSE), ou 'running' sans checkpoint depuis
+    stale_after secondes (processus arrêté en cours de synchronisation).
+
+    Returns:
+        False si l'exécution n'est pas reprenable (terminée, ou reprise entre-temps)
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        if get_db_type() == 'postgresql':
+            stale_clause = f"updated_at < LOCALTIMESTAMP - {ph} * INTERVAL '1 second'"
+            stale_value = stale_after
+        else:
+            stale_clause = f"updated_at < datetime('now', {ph})"
+            stale_value = f"-{int(stale_after)} seconds"
+
+        cursor.execute(
+            f"UPDATE sync_runs SET status = 'running', error_message = NULL, "
+            f"completed_at = NULL, updated_at = CURRENT_TIMESTAMP "
+            f"WHERE id = {ph} AND ({SYNC_RUN_RESUMABLE_CLAUSE} OR (status = 'running' AND {stale_clause}))",
+            (run_id, stale_value)
+        )
+        claimed = cursor.rowcount == 1
+        conn.commit()
+        return claimed
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur reprise sync_run {run_id}: {str(e)}")
+
+
+def abandon_sync_runs(provider: str) -> None:
+    """Rend non reprenables les exécutions interrompues d'un provider (source modifiée)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        cursor.execute(
+            f"UPDATE sync_runs SET status = 'abandoned', updated_at = CURRENT_TIMESTAMP "
+            f"WHERE provider = {ph} AND {SYNC_RUN_RESUMABLE_CLAUSE}",
+            (provider,)
+        )
+        conn.commit()
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur abandon sync_runs {provider}: {str(e)}")
+
+
+# --- CRUD deal_external_refs ---
+
+def get_external_refs(provider: str) -> Dict[int, Dict[str, Any]]:
+    """
+    Retourne les liens des deals avec leurs records externes chez un provider.
+
+    Returns:
+        Dict deal_id → {'external_id', 'content_hash'}
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        ph = _placeholder()
+        cursor.execute(
+            f"SELECT deal_id, external_id, content_hash FROM deal_external_refs WHERE provider = {ph}",
+            (provider,)
+        )
+        return {row[0]: {'external_id': row[1], 'content_hash': row[2]} for row in cursor.fetchall()}
+    except Exception as e:
+        raise Exception(f"Erreur lecture liens externes {provider}: {str(e)}")
+
+
+def set_external_refs(provider: str, refs: List[Dict[str, Any]]) -> None:
+    """
+    Enregistre les liens deal ↔ record externe après une synchronisation.
+
+    Args:
+        provider: Provider concerné
+        refs: Liste de dicts deal_id, external_id, content_hash ; un record externe
+            n'est lié qu'à un deal (le dernier de la liste l'emporte)
+    """
+    if not refs:
+        return
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    latest = {}
+    for ref in refs:
+        latest[ref['external_id']] = ref
+    rows = [(ref['deal_id'], provider, ref['external_id'], ref.get('content_hash')) for ref in latest.values()]
+    on_conflict = ("ON CONFLICT (deal_id, provider) DO UPDATE SET external_id = excluded.external_id, "
+                   "content_hash = excluded.content_hash, synced_at = CURRENT_TIMESTAMP")
+
+    try:
+        # Un record externe précédemment lié à un autre deal change de deal
+        cursor.executemany(
+            f"DELETE FROM deal_external_refs WHERE provider = {ph} AND external_id = {ph} AND deal_id <> {ph}",
+            [(provider, external_id, deal_id) for deal_id, _, external_id, _ in rows]
+        )
+        if get_db_type() == 'postgresql':
+            from psycopg2.extras import execute_values
+            execute_values(
+                cursor,
+                f"INSERT INTO deal_external_refs (deal_id, provider, external_id, content_hash) "
+                f"VALUES %s {on_conflict}",
+                rows, page_size=EXECUTE_VALUES_PAGE_SIZE
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO deal_external_refs (deal_id, provider, external_id, content_hash) "
+                f"VALUES ({ph}, {ph}, {ph}, {ph}) {on_conflict}",
+                rows
+            )
+        conn.commit()
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur enregistrement liens externes {provider}: {str(e)}")
+
+
+def clear_external_refs(provider: str, hashes_only: bool = False) -> None:
+    """
+    Supprime les liens d'un provider (nouvelle source), ou seulement leurs hashes
+    (nouveau mapping : tous les records seront de nouveau écrits).
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        if hashes_only:
+            cursor.execute(f"UPDATE deal_external_refs SET content_hash = NULL WHERE provider = {ph}", (provider,))
+        else:
+            cursor.execute(f"DELETE FROM deal_external_refs WHERE provider = {ph}", (provider,))
+        conn.commit()
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur suppression liens externes {provider}: {str(e)}")
+
+
+# --- CRUD airtable_record_names ---
+
+def get_record_name_table_state(base_id: str, table_id: str) -> Optional[Dict[str, str]]:
+    """Retourne les horodatages de rafraîchissement d'une table du cache (None si jamais chargée)."""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        ph = _placeholder()
+        cursor.execute(
+            f"SELECT full_refreshed_at, refreshed_at FROM airtable_record_name_tables "
+            f"WHERE base_id = {ph} AND table_id = {ph}",
+            (base_id, table_id)
+        )
+        row = cursor.fetchone()
+        return {'full_refreshed_at': row[0], 'refreshed_at': row[1]} if row else None
+    except Exception as e:
+        raise Exception(f"Erreur lecture cache linked records {table_id}: {str(e)}")
+
+
+def get_record_names(base_id: str, table_id: str) -> Dict[str, str]:
+    """Retourne les noms en cache des records d'une table Airtable (ID record → nom)."""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        ph = _placeholder()
+        cursor.execute(
+            f"SELECT record_id, name FROM airtable_record_names WHERE base_id = {ph} AND table_id = {ph}",
+            (base_id, table_id)
+        )
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    except Exception as e:
+        raise Exception(f"Erreur lecture cache linked records {table_id}: {str(e)}")
+
+
+def save_record_names(base_id: str, table_id: str, names: Dict[str, str],
+                      refreshed_at: str, full: bool = False) -> None:
+    """
+    Enregistre les noms lus lors d'un rafraîchissement d'une table du cache.
+
+    Args:
+        base_id: Base Airtable
+        table_id: Table des records liés
+        names: ID record → nom lus
+        refreshed_at: Horodatage (ISO 8601 UTC) pris avant la lecture
+        full: Rafraîchissement complet : les noms précédents de la table sont remplacés
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+    rows = [(base_id, table_id, record_id, name) for record_id, name in names.items()]
+
+    try:
+        if full:
+            cursor.execute(
+                f"DELETE FROM airtable_record_names WHERE base_id = {ph} AND table_id = {ph}",
+                (base_id, table_id)
+            )
+        if rows:
+            on_conflict = "ON CONFLICT (base_id, table_id, record_id) DO UPDATE SET name = excluded.name"
+            if get_db_type() == 'postgresql':
+                from psycopg2.extras import execute_values
+                execute_values(
+                    cursor,
+                    f"INSERT INTO airtable_record_names (base_id, table_id, record_id, name) "
+                    f"VALUES %s {on_conflict}",
+                    rows, page_size=EXECUTE_VALUES_PAGE_SIZE
+                )
+            else:
+                cursor.executemany(
+                    f"INSERT INTO airtable_record_names (base_id, table_id, record_id, name) "
+                    f"VALUES ({ph}, {ph}, {ph}, {ph}) {on_conflict}",
+                    rows
+                )
+
+        full_update = "full_refreshed_at = excluded.full_refreshed_at, " if full else ""
+        cursor.execute(
+            f"INSERT INTO airtable_record_name_tables (base_id, table_id, full_refreshed_at, refreshed_at) "
+            f"VALUES ({ph}, {ph}, {ph}, {ph}) ON CONFLICT (base_id, table_id) DO UPDATE SET "
+            f"{full_update}refreshed_at = excluded.refreshed_at",
+            (base_id, table_id, refreshed_at, refreshed_at)
+        )
+        conn.commit()
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur enregistrement cache linked records {table_id}: {str(e)}")
+
+
+# --- CRUD import_jobs ---
+
+def create_import_job(kind: str, source: Optional[str] = None) -> Dict[str, Any]:
+    """Crée un job d'import en attente et le retourne."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        if get_db_type() == 'postgresql':
+            cursor.execute(
+                f"INSERT INTO import_jobs (kind, source, status) VALUES ({ph}, {ph}, 'pending') RETURNING id",
+                (kind, source)
+            )
+            new_id = cursor.fetchone()[0]
+        else:
+            cursor.execute(
+                f"INSERT INTO import_jobs (kind, source, status) VALUES ({ph}, {ph}, 'pending')",
+                (kind, source)
+            )
+            new_id = cursor.lastrowid
+
+        conn.commit()
+        return get_import_job(new_id)
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur création job d'import: {str(e)}")
+
+
+def get_import_job(job_id: int) -> Optional[Dict[str, Any]]:
+    """Récupère un job d'import par son ID."""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        ph = _placeholder()
+        cursor.execute(f"SELECT * FROM import_jobs WHERE id = {ph}", (job_id,))
+        row = cursor.fetchone()
+        return _row_to_dict(cursor, row)
+    except Exception as e:
+        raise Exception(f"Erreur lecture job d'import {job_id}: {str(e)}")
+
+
+def start_import_job(job_id: int) -> bool:
+    """
+    Passe un job en attente à l'état 'running'.
+
+    Returns:
+        False si le job a été annulé (ou démarré) entre-temps
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        cursor.execute(
+            f"UPDATE import_jobs SET status = 'running', started_at = {ph}, updated_at = CURRENT_TIMESTAMP "
+            f"WHERE id = {ph} AND status = 'pending'",
+            (datetime.now().isoformat(), job_id)
+        )
+        started = cursor.rowcount == 1
+        conn.commit()
+        return started
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur démarrage job d'import {job_id}: {str(e)}")
+
+
+def update_import_job(job_id: int, data: Dict[str, Any]) -> None:
+    """Met à jour les champs d'un job d'import (progression, statut, résultat)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        set_parts = [f"{key} = {ph}" for key in data.keys()]
+        set_parts.append("updated_at = CURRENT_TIMESTAMP")
+        values = list(data.values()) + [job_id]
+
+        cursor.execute(f"UPDATE import_jobs SET {', '.join(set_parts)} WHERE id = {ph}", values)
+        conn.commit()
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur mise à jour job d'import {job_id}: {str(e)}")
+
+
+def request_import_job_cancel(job_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Demande l'annulation d'un job d'import.
+    Un job en attente est annulé immédiatement ; un job en cours s'arrête au prochain lot.
+
+    Returns:
+        Le job mis à jour, None s'il n'existe pas
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        cursor.execute(
+            f"UPDATE import_jobs SET cancel_requested = {ph}, updated_at = CURRENT_TIMESTAMP "
+            f"WHERE id = {ph} AND status IN ('pending', 'running')",
+            (True, job_id)
+        )
+        cursor.execute(
+            f"UPDATE import_jobs SET status = 'cancelled', completed_at = {ph} "
+            f"WHERE id = {ph} AND status = 'pending'",
+            (datetime.now().isoformat(), job_id)
+        )
+        conn.commit()
+        return get_import_job(job_id)
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur annulation job d'import {job_id}: {str(e)}")
+
+
+def is_import_job_cancel_requested(job_id: int) -> bool:
+    """Indique si l'annulation d'un job d'import a été demandée."""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        ph = _placeholder()
+        cursor.execute(f"SELECT cancel_requested FROM import_jobs WHERE id = {ph}", (job_id,))
+        row = cursor.fetchone()
+        return bool(row[0]) if row else True
+    except Exception as e:
+        raise Exception(f"Erreur lecture job d'import {job_id}: {str(e)}")
+
+
+def touch_import_jobs(job_ids: List[int]) -> None:
+    """Battement de cœur : rafraîchit updated_at des jobs encore en attente ou en cours."""
+    if not job_ids:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        cursor.execute(
+            f"UPDATE import_jobs SET updated_at = CURRENT_TIMESTAMP "
+            f"WHERE id IN ({', '.join(ph for _ in job_ids)}) AND status IN ('pending', 'running')",
+            tuple(job_ids)
+        )
+        conn.commit()
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur battement de cœur des jobs d'import: {str(e)}")
+
+
+def fail_stale_import_jobs(stale_after: int, job_id: Optional[int] = None) -> int:
+    """
+    Passe en erreur les jobs 'pending' ou 'running' sans mise à jour depuis stale_after
+    secondes : le processus qui les exécutait (et rafraîchissait updated_at) est arrêté.
+
+    Args:
+        stale_after: Délai sans battement de cœur (secondes)
+        job_id: Limite la vérification à ce job (tous les jobs sinon)
+
+    Returns:
+        Le nombre de jobs passés en erreur
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    ph = _placeholder()
+
+    try:
+        if get_db_type() == 'postgresql':
+            stale_clause = f"updated_at < LOCALTIMESTAMP - {ph} * INTERVAL '1 second'"
+            stale_value = stale_after
+        else:
+            stale_clause = f"updated_at < datetime('now', {ph})"
+            stale_value = f"-{int(stale_after)} seconds"
+
+        query = (
+            f"UPDATE import_jobs SET status = 'error', error_message = {ph}, completed_at = {ph}, "
+            f"updated_at = CURRENT_TIMESTAMP WHERE status IN ('pending', 'running') AND {stale_clause}"
+        )
+        values = ["Job interrompu (processus arrêté)", datetime.now().isoformat(), stale_value]
+        if job_id is not None:
+            query += f" AND id = {ph}"
+            values.append(job_id)
+        cursor.execute(query, tuple(values))
+        failed = cursor.rowcount
+        conn.commit()
+        return failed
+
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise Exception(f"Erreur détection des jobs d'import interrompus: {str(e)}")
+
+
+def clear_all_deals() -> None:
+    """Supprime tous les deals de la table."""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"DELETE FROM {TABLE_NAME}")
+        version = bump_data_version(cursor)
+        with deal_snapshot.committing():
+            conn.commit()
+            deal_snapshot.clear(version)
 
     except Exception as e:
         try:
@@ -21,6 +21,8 @@ CREATE INDEX IF NOT EXISTS idx_deals_statut ON deals(statut);
 CREATE INDEX IF NOT EXISTS idx_deals_secteur ON deals(secteur);
 CREATE INDEX IF NOT EXISTS idx_deals_date_echeance ON deals(date_echeance);
 CREATE INDEX IF NOT EXISTS idx_deals_assignee ON deals(assignee);
+CREATE INDEX IF NOT EXISTS idx_deals_client ON deals(client);
+CREATE INDEX IF NOT EXISTS idx_deals_montant_brut ON deals(montant_brut);
 
 -- Tables connecteurs API
 CREATE TABLE IF NOT EXISTS connector_configs (
@@ -31,9 +33,24 @@ CREATE TABLE IF NOT EXISTS connector_configs (
     table_name VARCHAR(255),
     field_mapping TEXT,
     is_active BOOLEAN DEFAULT TRUE,
+    sync_interval_minutes INTEGER,
+    next_sync_at VARCHAR(32),
+    webhook_secret TEXT,
+    pending_webhook_secret TEXT,
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Synchronisation planifiée (colonnes ajoutées aux bases existantes) : intervalle en
+-- minutes (NULL = désactivée) et prochaine échéance (ISO 8601 UTC)
+ALTER TABLE connector_configs ADD COLUMN IF NOT EXISTS sync_interval_minutes INTEGER;
+ALTER TABLE connector_configs ADD COLUMN IF NOT EXISTS next_sync_at VARCHAR(32);
+
+-- Secret de vérification des notifications webhook (colonne ajoutée aux bases existantes)
+ALTER TABLE connector_configs ADD COLUMN IF NOT EXISTS webhook_secret TEXT;
+-- Jeton de vérification reçu (requête non signée) : jamais utilisé pour vérifier une
+-- signature tant que l'administrateur ne l'a pas confirmé comme webhook_secret
+ALTER TABLE connector_configs ADD COLUMN IF NOT EXISTS pending_webhook_secret TEXT;
+
 CREATE TABLE IF NOT EXISTS sync_logs (
     id SERIAL PRIMARY KEY,
     provider VARCHAR(50) NOT NULL,
@@ -46,3 +63,133 @@ CREATE TABLE IF NOT EXISTS sync_logs (
     started_at TIMESTAMP,
     completed_at TIMESTAMP
 );
+
+-- Jobs d'import en arrière-plan (CSV, Airtable, Notion)
+CREATE TABLE IF NOT EXISTS import_jobs (
+    id SERIAL PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,
+    source VARCHAR(255),
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    rows_total INTEGER,
+    rows_processed INTEGER DEFAULT 0,
+    rows_imported INTEGER DEFAULT 0,
+    rows_rejected INTEGER DEFAULT 0,
+    cancel_requested BOOLEAN DEFAULT FALSE,
+    result TEXT,
+    error_message TEXT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    started_at TIMESTAMP,
+    completed_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_jobs_status ON import_jobs(status);
+
+-- Watermarks de synchronisation incrémentale (dernier import / export réussi par provider)
+CREATE TABLE IF NOT EXISTS sync_watermarks (
+    id SERIAL PRIMARY KEY,
+    provider VARCHAR(50) NOT NULL,
+    direction VARCHAR(20) NOT NULL,
+    watermark VARCHAR(64) NOT NULL,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    UNIQUE (provider, direction)
+);
+
+CREATE INDEX IF NOT EXISTS idx_deals_updated_at ON deals(updated_at);
+
+-- Exécutions de synchronisation avec checkpoint (reprise après échec) : curseur de la
+-- prochaine page à importer, ou dernier deal exporté, après le dernier lot validé
+CREATE TABLE IF NOT EXISTS sync_runs (
+    id SERIAL PRIMARY KEY,
+    provider VARCHAR(50) NOT NULL,
+    direction VARCHAR(20) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    full_sync BOOLEAN DEFAULT FALSE,
+    since VARCHAR(64),
+    next_watermark VARCHAR(64),
+    page_cursor TEXT,
+    last_deal_id INTEGER,
+    batches_committed INTEGER DEFAULT 0,
+    records_processed INTEGER DEFAULT 0,
+    records_created INTEGER DEFAULT 0,
+    records_updated INTEGER DEFAULT 0,
+    records_unchanged INTEGER DEFAULT 0,
+    records_rejected INTEGER DEFAULT 0,
+    job_id INTEGER,
+    error_message TEXT,
+    started_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    completed_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_runs_provider ON sync_runs(provider, started_at);
+
+-- Verrou de synchronisation par provider (bail expirant, partagé entre processus)
+CREATE TABLE IF NOT EXISTS sync_locks (
+    id SERIAL PRIMARY KEY,
+    provider VARCHAR(50) UNIQUE NOT NULL,
+    owner VARCHAR(64) NOT NULL,
+    acquired_at VARCHAR(32) NOT NULL,
+    expires_at VARCHAR(32) NOT NULL
+);
+
+-- Version des données deals, incrémentée dans la transaction de chaque écriture :
+-- partagée par tous les processus (clés du cache analytics, ETags)
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    modified_at VARCHAR(32) NOT NULL
+);
+INSERT INTO data_versions (name, version, modified_at)
+VALUES ('deals', 0, to_char(NOW() AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS"Z"'))
+ON CONFLICT (name) DO NOTHING;
+
+-- Records signalés modifiés par webhook, en attente d'import : un record notifié de nouveau
+-- avant son traitement voit son compteur incrémenté (il sera relu après la modification).
+-- attempts / last_error : lectures en échec ; au-delà du maximum, le record est mis de côté
+-- jusqu'à sa prochaine notification
+CREATE TABLE IF NOT EXISTS sync_webhook_queue (
+    id SERIAL PRIMARY KEY,
+    provider VARCHAR(50) NOT NULL,
+    record_id VARCHAR(255) NOT NULL,
+    notifications INTEGER NOT NULL DEFAULT 1,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    received_at TIMESTAMP DEFAULT NOW(),
+    UNIQUE (provider, record_id)
+);
+
+ALTER TABLE sync_webhook_queue ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE sync_webhook_queue ADD COLUMN IF NOT EXISTS last_error TEXT;
+
+-- Correspondance deal ↔ record externe par provider (ID externe, hash du contenu synchronisé)
+CREATE TABLE IF NOT EXISTS deal_external_refs (
+    id SERIAL PRIMARY KEY,
+    deal_id INTEGER NOT NULL REFERENCES deals(id) ON DELETE CASCADE,
+    provider VARCHAR(50) NOT NULL,
+    external_id VARCHAR(255) NOT NULL,
+    content_hash VARCHAR(40),
+    synced_at TIMESTAMP DEFAULT NOW(),
+    UNIQUE (deal_id, provider),
+    UNIQUE (provider, external_id)
+);
+
+-- Cache des noms des linked records Airtable (ID record → valeur du champ primaire)
+CREATE TABLE IF NOT EXISTS airtable_record_names (
+    id SERIAL PRIMARY KEY,
+    base_id VARCHAR(255) NOT NULL,
+    table_id VARCHAR(255) NOT NULL,
+    record_id VARCHAR(255) NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (base_id, table_id, record_id)
+);
+
+-- Dernier rafraîchissement de chaque table du cache (complet ou incrémental)
+CREATE TABLE IF NOT EXISTS airtable_record_name_tables (
+    id SERIAL PRIMARY KEY,
+    base_id VARCHAR(255) NOT NULL,
+    table_id VARCHAR(255) NOT NULL,
+    full_refreshed_at VARCHAR(32) NOT NULL,
+    refreshed_at VARCHAR(32) NOT NULL,
+    UNIQUE (base_id, table_id)
+);
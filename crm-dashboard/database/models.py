@@ -36,3 +36,20 @@ OPTIONAL_COLUMNS = [
     "assignee",
     "notes"
 ]
+
+# Colonnes exposables via GET /api/deals?fields=
+SELECTABLE_COLUMNS = COLUMNS + [
+    "created_at",
+    "updated_at"
+]
+
+# Colonnes indexées, utilisables pour le tri et la pagination par curseur
+SORTABLE_COLUMNS = [
+    "id",
+    "client",
+    "statut",
+    "montant_brut",
+    "secteur",
+    "date_echeance",
+    "assignee"
+]
@@ -0,0 +1,426 @@
+"""
+Snapshot mémoire (colonnes NumPy) de la table deals, propre au processus.
+
+Optionnel (DEAL_SNAPSHOT_ENABLED=1) : chargé une fois au démarrage puis tenu à jour par
+les fonctions d'écriture de crud.py, qui relisent les deals qu'elles ont modifiés. Les
+filtres des analytics (statut, secteur, assignee, dates, recherche) sont alors des
+masques booléens sur des tableaux en mémoire, sans requête ni conversion des Decimal.
+
+Les statuts, secteurs et assignees sont stockés en codes entiers (dictionnaire de
+valeurs, -1 pour NULL) ; les deals supprimés sont marqués morts puis compactés.
+Le snapshot porte la version des données (table data_versions) qu'il reflète : une
+lecture avec une version plus récente, par exemple après l'écriture d'un autre worker,
+recharge toute la table.
+"""
+
+import logging
+import os
+import re
+import threading
+from contextlib import nullcontext
+from datetime import date
+from typing import Any, ContextManager, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .connection import get_connection, get_db_type
+from .models import TABLE_NAME
+
+logger = logging.getLogger(__name__)
+
+DEAL_SNAPSHOT_ENABLED = os.environ.get('DEAL_SNAPSHOT_ENABLED', '0').lower() in ('1', 'true', 'yes')
+
+# Colonnes numériques (NUMERIC PostgreSQL → float) et colonnes codées par dictionnaire
+FLOAT_COLUMNS = ('montant_brut', 'probabilite', 'valeur_ponderee')
+CATEGORY_COLUMNS = ('statut', 'secteur', 'assignee')
+# Colonnes du filtre de recherche, conservées en minuscules dans un texte par deal ;
+# les séparateurs empêchent une correspondance à cheval sur deux champs ou deux deals
+SEARCH_COLUMNS = ('client', 'notes')
+FIELD_SEPARATOR = '\x00'
+ROW_SEPARATOR = '\x01'
+
+# IDs relus par requête (sous la limite de variables SQLite)
+REFRESH_CHUNK_SIZE = 500
+# Capacité initiale des tableaux (doublée quand elle est atteinte)
+MIN_CAPACITY = 1024
+
+
+class _CategoryColumn:
+    """Colonne codée : codes int32 (-1 = NULL) et valeurs distinctes dans l'ordre d'apparition."""
+
+    def __init__(self, capacity: int):
+        self.codes = np.full(capacity, -1, dtype=np.int32)
+        self.values: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def code(self, value: Any) -> int:
+        if value is None:
+            return -1
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Valeurs des codes (objet) ; le None final est atteint par le code -1."""
+        return np.array(self.values + [None], dtype=object)[codes]
+
+    def mask(self, codes: np.ndarray, values: Iterable[Any]) -> np.ndarray:
+        """Codes égaux à l'une des valeurs : table de correspondance code → booléen."""
+        lookup = np.zeros(len(self.values) + 1, dtype=bool)
+        lookup[[self.index[value] for value in values if value in self.index]] = True
+        return lookup[codes]
+
+    def present(self, codes: np.ndarray) -> List[str]:
+        """Valeurs non vides présentes au moins une fois, triées."""
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.values))
+        return sorted(value for value, count in zip(self.values, counts) if count and value != '')
+
+
+def _to_floats(values: Iterable[Any]) -> np.ndarray:
+    """Montants en float64 (Decimal PostgreSQL convertis, NULL → NaN)."""
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+
+
+def _date_texts(values: Iterable[Any]) -> np.ndarray:
+    """
+    Dates d'échéance sous forme de texte (date PostgreSQL en ISO 8601, '' si NULL) : comparées
+    aux filtres comme le fait la requête SQL, en chaînes, sans conversion des valeurs saisies.
+    """
+    return np.array(['' if value is None else value.isoformat() if isinstance(value, date) else str(value)
+                     for value in values], dtype=str)
+
+
+class DealSnapshot:
+    """
+    Copie en colonnes de la table deals, lue et modifiée sous un même verrou.
+
+    Args:
+        enabled: Snapshot utilisé par les analytics et tenu à jour par les écritures
+    """
+
+    def __init__(self, enabled: bool = DEAL_SNAPSHOT_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.RLock()
+        # Version des données reflétée (None : à recharger)
+        self._version: Optional[int] = None
+        self.loads = 0
+        self.refreshes = 0
+        self._reset([], [], 0)
+
+    # --- Stockage ---
+
+    def _reset(self, columns: List[str], rows: List[tuple], capacity: int) -> None:
+        """Remplace le contenu du snapshot par les lignes fournies."""
+        capacity = max(MIN_CAPACITY, capacity)
+        self._columns = list(columns)
+        self._size = 0
+        self._dead = 0
+        self._max_id = 0
+        self._positions: Dict[int, int] = {}
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._date_texts = np.full(capacity, '', dtype=str)
+        self._floats = {col: np.full(capacity, np.nan) for col in FLOAT_COLUMNS if col in columns}
+        self._categories = {col: _CategoryColumn(capacity) for col in CATEGORY_COLUMNS if col in columns}
+        self._objects = {col: np.empty(capacity, dtype=object) for col in columns
+                         if col != 'id' and col not in self._floats and col not in self._categories}
+        self._haystacks = np.full(capacity, '', dtype=object)
+        self._search_index = None
+        self._append(rows)
+
+    def _grow(self, needed: int) -> None:
+        """Double la capacité des tableaux jusqu'à pouvoir contenir `needed` lignes."""
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+
+        def resized(array, fill):
+            grown = np.full(capacity, fill, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            return grown
+
+        self._ids = resized(self._ids, 0)
+        self._alive = resized(self._alive, False)
+        self._date_texts = resized(self._date_texts, '')
+        self._floats = {col: resized(array, np.nan) for col, array in self._floats.items()}
+        for column in self._categories.values():
+            column.codes = resized(column.codes, -1)
+        self._objects = {col: resized(array, None) for col, array in self._objects.items()}
+        self._haystacks = resized(self._haystacks, '')
+
+    def _write(self, positions: np.ndarray, rows: List[tuple]) -> None:
+        """Écrit des lignes de la table (ordre des colonnes du SELECT) aux positions données."""
+        values = dict(zip(self._columns, zip(*rows)))
+        self._alive[positions] = True
+        if 'date_echeance' in values:
+            texts = _date_texts(values['date_echeance'])
+            if texts.dtype.itemsize > self._date_texts.dtype.itemsize:
+                self._date_texts = self._date_texts.astype(texts.dtype)
+            self._date_texts[positions] = texts
+        for col, array in self._floats.items():
+            array[positions] = _to_floats(values[col])
+        for col, column in self._categories.items():
+            column.codes[positions] = [column.code(value) for value in values[col]]
+        for col, array in self._objects.items():
+            array[positions] = values[col]
+        searched = [values[col] for col in SEARCH_COLUMNS if col in values]
+        self._haystacks[positions] = [
+            FIELD_SEPARATOR.join(value.lower() if isinstance(value, str) else '' for value in fields)
+            for fields in zip(*searched)
+        ]
+        self._search_index = None
+
+    def _append(self, rows: List[tuple]) -> None:
+        if not rows:
+            return
+        start, end = self._size, self._size + len(rows)
+        self._grow(end)
+        id_index = self._columns.index('id')
+        ids = np.fromiter((row[id_index] for row in rows), dtype=np.int64, count=len(rows))
+        self._ids[start:end] = ids
+        self._positions.update(zip(ids.tolist(), range(start, end)))
+        self._max_id = max(self._max_id, int(ids.max()))
+        self._size = end
+        self._write(np.arange(start, end), rows)
+
+    def _remove(self, deal_id: int) -> None:
+        position = self._positions.pop(deal_id, None)
+        if position is not None:
+            self._alive[position] = False
+            self._dead += 1
+
+    def _compact(self) -> None:
+        """Retire les lignes mortes quand elles représentent plus de la moitié du snapshot."""
+        if self._dead < max(MIN_CAPACITY, self._size // 2):
+            return
+        keep = np.flatnonzero(self._alive[:self._size])
+        size = len(keep)
+        self._ids[:size] = self._ids[keep]
+        self._alive[:size] = True
+        self._alive[size:] = False
+        self._date_texts[:size] = self._date_texts[keep]
+        for array in (*self._floats.values(), *self._objects.values(), self._haystacks):
+            array[:size] = array[keep]
+        for column in self._categories.values():
+            column.codes[:size] = column.codes[keep]
+        self._size = size
+        self._dead = 0
+        self._search_index = None
+        self._positions = {int(deal_id): position for position, deal_id in enumerate(self._ids[:size])}
+
+    # --- Lecture de la base ---
+
+    def _fetch(self, where: str = "", values: Iterable[Any] = ()) -> tuple:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT * FROM {TABLE_NAME}{where} ORDER BY id", tuple(values))
+        columns = [desc[0] for desc in cursor.description]
+        return columns, cursor.fetchall()
+
+    def load(self, version: int) -> int:
+        """
+        Charge (ou recharge) toute la table deals. Retourne le nombre de deals.
+
+        Args:
+            version: Version des données lue avant le chargement (les lignes lues sont au
+                moins aussi récentes ; au pire, la lecture suivante recharge inutilement)
+        """
+        with self._lock:
+            try:
+                columns, rows = self._fetch()
+            except Exception as e:
+                raise Exception(f"Erreur lors du chargement du snapshot des deals: {str(e)}")
+            self._reset(columns, rows, len(rows) * 2)
+            self._version = version
+            self.loads += 1
+            return self._size
+
+    def _ensure_current(self, version: int) -> None:
+        if self._version is None or self._version < version:
+            self.load(version)
+
+    def committing(self) -> ContextManager:
+        """
+        Verrou à tenir autour du commit d'une écriture et du refresh qui suit : aucune lecture
+        ne voit la nouvelle version avant que le snapshot l'ait appliquée. À prendre après la
+        mise à jour de la version en base (jamais l'inverse, sous peine d'interblocage).
+        """
+        return self._lock if self.enabled else nullcontext()
+
+    def refresh(self, deal_ids: Iterable[int] = (), new_deals: bool = False, version: int = 0) -> None:
+        """
+        Relit des deals après une écriture commitée : ceux de deal_ids (retirés s'ils n'existent
+        plus) et, avec new_deals, ceux créés depuis le dernier deal connu. Appliqué seulement si
+        le snapshot est à la version précédant celle de l'écriture ; sinon (écriture d'un autre
+        worker intercalée, échec de relecture), il est rechargé à la lecture suivante.
+        """
+        if not self.enabled:
+            return
+        deal_ids = list(dict.fromkeys(int(deal_id) for deal_id in deal_ids))
+        ph = "%s" if get_db_type() == 'postgresql' else "?"
+
+        with self._lock:
+            if self._version is None or self._version != version - 1:
+                self._version = None
+                return
+            try:
+                rows = []
+                for start in range(0, len(deal_ids), REFRESH_CHUNK_SIZE):
+                    chunk = deal_ids[start:start + REFRESH_CHUNK_SIZE]
+                    _, chunk_rows = self._fetch(f" WHERE id IN ({', '.join(ph for _ in chunk)})", chunk)
+                    rows.extend(chunk_rows)
+                if new_deals:
+                    _, new_rows = self._fetch(f" WHERE id > {ph}", (self._max_id,))
+                    rows.extend(new_rows)
+            except Exception as e:
+                logger.warning(f"Snapshot des deals invalidé (relecture impossible): {str(e)}")
+                self._version = None
+                return
+
+            id_index = self._columns.index('id')
+            found = set()
+            updated, positions, appended = [], [], []
+            for row in rows:
+                deal_id = int(row[id_index])
+                if deal_id in found:
+                    continue
+                found.add(deal_id)
+                position = self._positions.get(deal_id)
+                if position is None:
+                    appended.append(row)
+                else:
+                    updated.append(row)
+                    positions.append(position)
+            if updated:
+                self._write(np.array(positions), updated)
+            self._append(appended)
+            for deal_id in deal_ids:
+                if deal_id not in found:
+                    self._remove(deal_id)
+            self._compact()
+            self._version = version
+            self.refreshes += 1
+
+    def clear(self, version: int) -> None:
+        """
+        Vide le snapshot après une suppression commitée de tous les deals : rien à relire, l'état
+        vide est exact à cette version quelle que soit la version précédente.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if not self._columns:
+                self._version = None
+                return
+            self._reset(self._columns, [], 0)
+            self._version = version
+            self.refreshes += 1
+
+    def invalidate(self) -> None:
+        """Force le rechargement complet à la prochaine lecture."""
+        with self._lock:
+            self._version = None
+
+    # --- Requêtes ---
+
+    def _mask(self, params: Dict[str, Any]) -> np.ndarray:
+        """Masque des deals vivants correspondant aux filtres (mêmes clés que get_filtered_deals)."""
+        size = self._size
+        mask = self._alive[:size].copy()
+
+        for key in CATEGORY_COLUMNS:
+            if params.get(key) and key in self._categories:
+                wanted = params[key] if isinstance(params[key], list) else [params[key]]
+                column = self._categories[key]
+                mask &= column.mask(column.codes[:size], wanted)
+
+        # Comparaison de chaînes, comme date_echeance >= %s en SQL ; NULL n'est jamais retenu
+        if (params.get('date_from') or params.get('date_to')) and 'date_echeance' in self._objects:
+            dates = self._date_texts[:size]
+            mask &= np.not_equal(self._objects['date_echeance'][:size], None)
+            if params.get('date_from'):
+                mask &= dates >= str(params['date_from'])
+            if params.get('date_to'):
+                mask &= dates <= str(params['date_to'])
+
+        if params.get('search'):
+            mask &= self._search_mask(params['search'].lower())
+
+        return mask
+
+    def _search_mask(self, term: str) -> np.ndarray:
+        """
+        Deals dont un champ de recherche contient le terme : une seule recherche dans le texte
+        concaténé des deals (reconstruit après écriture), occurrences ramenées à leur ligne.
+        """
+        size = self._size
+        matches = np.zeros(size, dtype=bool)
+        if FIELD_SEPARATOR in term or ROW_SEPARATOR in term:
+            return matches
+        if self._search_index is None:
+            haystacks = self._haystacks[:size].tolist()
+            lengths = np.fromiter(map(len, haystacks), dtype=np.int64, count=size) + len(ROW_SEPARATOR)
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if size else np.zeros(0, dtype=np.int64)
+            self._search_index = (ROW_SEPARATOR.join(haystacks), starts)
+        text, starts = self._search_index
+        offsets = [match.start() for match in re.finditer(re.escape(term), text)]
+        if offsets:
+            matches[np.searchsorted(starts, offsets, side='right') - 1] = True
+        return matches
+
+    def select(self, params: Optional[Dict[str, Any]], version: int) -> pd.DataFrame:
+        """
+        Deals filtrés, au format de get_filtered_deals (colonnes de la table, montants en float).
+
+        Args:
+            params: Filtres (statut, secteur, assignee, date_from, date_to, search)
+            version: Version courante des données (get_data_version), rechargement si plus récente
+        """
+        with self._lock:
+            self._ensure_current(version)
+            positions = np.flatnonzero(self._mask(params or {}))
+            data = {}
+            for col in self._columns:
+                if col == 'id':
+                    data[col] = self._ids[positions]
+                elif col in self._floats:
+                    data[col] = self._floats[col][positions]
+                elif col in self._categories:
+                    column = self._categories[col]
+                    data[col] = column.decode(column.codes[positions])
+                else:
+                    data[col] = self._objects[col][positions]
+        return pd.DataFrame(data, columns=self._columns)
+
+    def filter_options(self, version: int) -> Dict[str, List[str]]:
+        """Statuts, secteurs et assignees présents (même format que get_filter_options)."""
+        with self._lock:
+            self._ensure_current(version)
+            alive = self._alive[:self._size]
+
+            def present(col):
+                column = self._categories.get(col)
+                return column.present(column.codes[:self._size][alive]) if column else []
+
+            return {"statuts": present('statut'), "secteurs": present('secteur'), "assignees": present('assignee')}
+
+    def stats(self) -> Dict[str, Any]:
+        """État du snapshot (exposé par GET /api/analytics/cache)."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "loaded": self._version is not None,
+                "version": self._version,
+                "deals": self._size - self._dead,
+                "loads": self.loads,
+                "refreshes": self.refreshes,
+            }
+
+
+# Instance du processus (désactivée sauf DEAL_SNAPSHOT_ENABLED=1)
+deal_snapshot = DealSnapshot()
@@ -0,0 +1,563 @@
+"""
+Serveur local imitant les API Airtable et Notion utilisées par les connecteurs.
+
+Permet d'exercer AirtableConnector / NotionConnector (tests manuels, benchmark_sync.py)
+sans les services réels :
+- Airtable : lecture paginée (pageSize <= 100, offset expirant, fields[], filtres
+  IS_AFTER(LAST_MODIFIED_TIME(), ...) et OR(RECORD_ID()='...', ...)), écritures par lots
+  de 10 records au plus, schéma de la base (meta API) avec une table liée (People) au
+  champ Assignee, payloads d'un webhook (changements de la table Deals)
+- Notion : database, query paginée (page_size <= 100, next_cursor / has_more, filtre
+  last_edited_time on_or_after), lecture, création et mise à jour de pages
+- modification de records "à la source" (modify_records) pour exercer les webhooks
+- limitation de débit optionnelle par provider : 429 avec en-tête Retry-After
+- latence optionnelle ajoutée à chaque réponse (temps de réponse des API réelles)
+- compteurs de requêtes par provider (débit mesuré par le benchmark)
+
+Usage:
+    python fake_connector_server.py --records 1000 --port 8765
+    AIRTABLE_API_BASE=http://127.0.0.1:8765/v0 NOTION_API_BASE=http://127.0.0.1:8765/v1 python app.py
+"""
+
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+AIRTABLE_BATCH_LIMIT = 10
+MAX_PAGE_SIZE = 100
+# Durée de validité d'un offset / curseur de pagination (Airtable : quelques minutes)
+ITERATOR_TTL = 300
+RETRY_AFTER_SECONDS = 1
+
+DEALS_TABLE_ID = 'tblDeals'
+DEALS_TABLE_NAME = 'Deals'
+PEOPLE_TABLE_ID = 'tblPeople'
+PEOPLE_TABLE_NAME = 'People'
+# Webhook Airtable unique de la base et database Notion des pages générées
+AIRTABLE_WEBHOOK_ID = 'achFakeWebhook0001'
+NOTION_DATABASE_ID = '0f4e2a8c-6b1d-4e7a-9c3f-2d5b8a1e7c90'
+WEBHOOK_PAYLOADS_PAGE_SIZE = 50
+
+STATUSES = ['Lead', 'Qualified', 'Negotiation', 'Won', 'In progress']
+SECTORS = ['SaaS', 'Retail', 'Industrie', 'Santé', None]
+PEOPLE = ['Alexandre Dubois', 'Marie Laurent', 'Thomas Bernard', 'Julie Martin']
+
+_FORMULA_SINCE = re.compile(r"IS_AFTER\(LAST_MODIFIED_TIME\(\),\s*'([^']+)'\)")
+_FORMULA_RECORD_IDS = re.compile(r"OR\((RECORD_ID\(\)='rec\w+'(?:,\s*RECORD_ID\(\)='rec\w+')*)\)")
+_FORMULA_RECORD_ID = re.compile(r"RECORD_ID\(\)='(rec\w+)'")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _timestamp(value: datetime) -> str:
+    return value.strftime('%Y-%m-%dT%H:%M:%S.') + f"{value.microsecond // 1000:03d}Z"
+
+
+def _parse_timestamp(value: str) -> datetime:
+    value = value.replace('Z', '+00:00')
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class _RateLimiter:
+    """
+    Quota moyen de `rate` requêtes par seconde avec rafale de `rate` requêtes (seau de
+    jetons, comme le quota moyen annoncé par les providers) : au-delà, la requête est refusée.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = max(rate, 1.0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(max(self.rate, 1.0), self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+class FakeProviderState:
+    """Données et compteurs d'un serveur factice (tables Airtable, database Notion)."""
+
+    def __init__(self, rate_limits: Optional[Dict[str, float]] = None, latency: float = 0.0):
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.rate_limiters = {provider: _RateLimiter(rate) for provider, rate in (rate_limits or {}).items() if rate}
+        self.airtable: Dict[str, Dict[str, Dict[str, Any]]] = {DEALS_TABLE_ID: {}, PEOPLE_TABLE_ID: {}}
+        self.notion: Dict[str, Dict[str, Any]] = {}
+        self.webhook_payloads: List[Dict[str, Any]] = []
+        self.iterators: Dict[str, Tuple[float, List[str]]] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._ids = itertools.count(1)
+
+    # --- Données ---
+
+    def _new_airtable_id(self) -> str:
+        return f"rec{next(self._ids):014d}"
+
+    def reset(self, records: int = 0, people: int = len(PEOPLE)) -> None:
+        """Remplace les données par `records` deals générés (Airtable et Notion) et remet les compteurs à zéro."""
+        with self.lock:
+            self.iterators.clear()
+            self.stats.clear()
+            self.webhook_payloads = []
+            # Données générées la veille : une lecture incrémentale ne voit que les modifications
+            now = _timestamp(_now() - timedelta(days=1))
+
+            people_table = {}
+            for i in range(people):
+                record_id = self._new_airtable_id()
+                name = PEOPLE[i % len(PEOPLE)] if i < len(PEOPLE) else f"Commercial {i}"
+                people_table[record_id] = {'id': record_id, 'createdTime': now, 'modified': now,
+                                           'fields': {'Name': name}}
+            people_ids = list(people_table)
+
+            deals_table = {}
+            notion_pages = {}
+            for i in range(records):
+                fields = {
+                    'Name': f"Client {i}",
+                    'Status': STATUSES[i % len(STATUSES)],
+                    'Amount': 1000 + (i % 500) * 37.5,
+                    'Sector': SECTORS[i % len(SECTORS)],
+                    'Due Date': f"2026-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}",
+                    'Notes': f"Note {i}" if i % 10 == 0 else None,
+                }
+                fields = {key: value for key, value in fields.items() if value is not None}
+
+                record_id = self._new_airtable_id()
+                airtable_fields = dict(fields)
+                if people_ids:
+                    airtable_fields['Assignee'] = [people_ids[i % len(people_ids)]]
+                deals_table[record_id] = {'id': record_id, 'createdTime': now, 'modified': now,
+                                          'fields': airtable_fields}
+
+                page_id = str(uuid.uuid4())
+                notion_fields = dict(fields)
+                if people_ids:
+                    notion_fields['Assignee'] = people_table[people_ids[i % len(people_ids)]]['fields']['Name']
+                notion_pages[page_id] = {'id': page_id, 'last_edited_time': now,
+                                         'parent': {'type': 'database_id', 'database_id': NOTION_DATABASE_ID},
+                                         'properties': _notion_properties(notion_fields)}
+
+            self.airtable = {DEALS_TABLE_ID: deals_table, PEOPLE_TABLE_ID: people_table}
+            self.notion = notion_pages
+
+    def record_airtable_change(self, record_id: str, created: bool = False) -> None:
+        """Ajoute un payload de webhook signalant la création / modification d'un deal (verrou tenu)."""
+        key = 'createdRecordsById' if created else 'changedRecordsById'
+        self.webhook_payloads.append({
+            'timestamp': _timestamp(_now()),
+            'baseTransactionNumber': len(self.webhook_payloads) + 1,
+            'changedTablesById': {DEALS_TABLE_ID: {key: {record_id: {}}}}
+        })
+
+    def modify_records(self, count: int, amount_delta: float = 100.0) -> Tuple[List[str], List[str]]:
+        """
+        Modifie le montant des `count` premiers deals (comme un utilisateur à la source) :
+        payloads du webhook Airtable ajoutés, last_edited_time des pages Notion avancé.
+
+        Returns:
+            Tuple (IDs des records Airtable, IDs des pages Notion) modifiés
+        """
+        with self.lock:
+            now = _timestamp(_now())
+            record_ids = list(self.airtable[DEALS_TABLE_ID])[:count]
+            for record_id in record_ids:
+                record = self.airtable[DEALS_TABLE_ID][record_id]
+                record['fields']['Amount'] = record['fields'].get('Amount', 0) + amount_delta
+                record['modified'] = now
+                self.record_airtable_change(record_id)
+
+            page_ids = list(self.notion)[:count]
+            for page_id in page_ids:
+                page = self.notion[page_id]
+                amount = page['properties'].get('Amount', {}).get('number') or 0
+                page['properties']['Amount'] = _notion_property('Amount', amount + amount_delta)
+                page['last_edited_time'] = now
+            return record_ids, page_ids
+
+    def count(self, provider: str, key: str) -> None:
+        with self.lock:
+            stats = self.stats.setdefault(provider, {})
+            stats[key] = stats.get(key, 0) + 1
+
+    def snapshot_stats(self) -> Dict[str, Dict[str, int]]:
+        with self.lock:
+            return {provider: dict(stats) for provider, stats in self.stats.items()}
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.stats.clear()
+
+    # --- Pagination ---
+
+    def page(self, ids_factory, cursor: Optional[str], page_size: int) -> Tuple[List[str], Optional[str]]:
+        """
+        Retourne une page d'IDs et le curseur suivant. Le premier appel fige la liste des IDs
+        (itérateur) ; un curseur inconnu ou expiré lève KeyError.
+        """
+        now = time.monotonic()
+        with self.lock:
+            for key in [key for key, (created, _) in self.iterators.items() if now - created > ITERATOR_TTL]:
+                del self.iterators[key]
+
+            if cursor:
+                iterator_id, _, position = cursor.partition('/')
+                created, ids = self.iterators[iterator_id]
+                start = int(position)
+            else:
+                iterator_id = f"itr{uuid.uuid4().hex[:12]}"
+                ids = ids_factory()
+                self.iterators[iterator_id] = (now, ids)
+                start = 0
+
+            end = start + page_size
+            if end >= len(ids):
+                del self.iterators[iterator_id]
+                return ids[start:], None
+            return ids[start:end], f"{iterator_id}/{end}"
+
+
+def _notion_property(name: str, value: Any) -> Dict[str, Any]:
+    if name == 'Name':
+        return {'type': 'title', 'title': [{'text': {'content': str(value)}, 'plain_text': str(value)}]}
+    if name == 'Amount':
+        return {'type': 'number', 'number': value}
+    if name == 'Status':
+        return {'type': 'select', 'select': {'name': value}}
+    if name == 'Due Date':
+        return {'type': 'date', 'date': {'start': value}}
+    return {'type': 'rich_text', 'rich_text': [{'text': {'content': str(value)}, 'plain_text': str(value)}]}
+
+
+def _notion_properties(fields: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: _notion_property(name, value) for name, value in fields.items()}
+
+
+def _normalize_notion_properties(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Ajoute le type aux propriétés reçues (les requêtes d'écriture ne le précisent pas)."""
+    normalized = {}
+    for name, prop in properties.items():
+        prop_type = next((key for key in ('title', 'rich_text', 'number', 'date', 'select', 'status',
+                                          'multi_select', 'checkbox') if key in prop), None)
+        normalized[name] = {'type': prop_type, **prop} if prop_type else prop
+    return normalized
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    """Routes /v0 (Airtable) et /v1 (Notion) du serveur factice."""
+
+    protocol_version = 'HTTP/1.1'
+    # En-têtes et corps écrits séparément : sans TCP_NODELAY, l'ACK retardé ajoute ~40 ms par requête
+    disable_nagle_algorithm = True
+    server: 'FakeConnectorServer'
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- Réponses ---
+
+    def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status: int, error_type: str, message: str = '') -> None:
+        self._send(status, {'error': {'type': error_type, 'message': message}})
+
+    def _json_body(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+    # --- Dispatch ---
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def _dispatch(self, method: str) -> None:
+        state = self.server.state
+        url = urlparse(self.path)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        provider = {'v0': 'airtable', 'v1': 'notion'}.get(parts[0] if parts else '')
+        if provider is None:
+            return self._error(404, 'NOT_FOUND')
+
+        state.count(provider, 'requests')
+        state.count(provider, method)
+        limiter = state.rate_limiters.get(provider)
+        if limiter is not None and not limiter.allow():
+            state.count(provider, 'throttled')
+            return self._send(429, {'error': {'type': 'RATE_LIMIT_REACHED'}},
+                              {'Retry-After': str(RETRY_AFTER_SECONDS)})
+
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._error(401, 'AUTHENTICATION_REQUIRED')
+
+        if state.latency:
+            time.sleep(state.latency)
+
+        try:
+            if provider == 'airtable':
+                self._airtable(method, parts[1:], parse_qs(url.query))
+            else:
+                self._notion(method, parts[1:])
+        except (ValueError, KeyError) as e:
+            self._error(422, 'INVALID_REQUEST', str(e))
+
+    # --- Airtable ---
+
+    def _airtable_table(self, table: str) -> Optional[str]:
+        return {DEALS_TABLE_ID: DEALS_TABLE_ID, DEALS_TABLE_NAME: DEALS_TABLE_ID,
+                PEOPLE_TABLE_ID: PEOPLE_TABLE_ID, PEOPLE_TABLE_NAME: PEOPLE_TABLE_ID}.get(table)
+
+    def _airtable(self, method: str, parts: List[str], query: Dict[str, List[str]]) -> None:
+        state = self.server.state
+
+        if parts[:2] == ['meta', 'bases'] and len(parts) == 4 and parts[3] == 'tables':
+            return self._send(200, {'tables': [
+                {'id': DEALS_TABLE_ID, 'name': DEALS_TABLE_NAME, 'primaryFieldId': 'fldName', 'fields': [
+                    {'id': 'fldName', 'name': 'Name', 'type': 'singleLineText'},
+                    {'id': 'fldStatus', 'name': 'Status', 'type': 'singleSelect'},
+                    {'id': 'fldAmount', 'name': 'Amount', 'type': 'currency'},
+                    {'id': 'fldSector', 'name': 'Sector', 'type': 'singleLineText'},
+                    {'id': 'fldDueDate', 'name': 'Due Date', 'type': 'date'},
+                    {'id': 'fldAssignee', 'name': 'Assignee', 'type': 'multipleRecordLinks',
+                     'options': {'linkedTableId': PEOPLE_TABLE_ID}},
+                    {'id': 'fldNotes', 'name': 'Notes', 'type': 'multilineText'},
+                ]},
+                {'id': PEOPLE_TABLE_ID, 'name': PEOPLE_TABLE_NAME, 'primaryFieldId': 'fldPeopleName', 'fields': [
+                    {'id': 'fldPeopleName', 'name': 'Name', 'type': 'singleLineText'},
+                ]},
+            ]})
+
+        if parts[:1] == ['bases'] and len(parts) == 5 and parts[2] == 'webhooks' and parts[4] == 'payloads':
+            if parts[3] != AIRTABLE_WEBHOOK_ID:
+                return self._error(404, 'NOT_FOUND')
+            cursor = max(int(query.get('cursor', ['1'])[0]), 1)
+            with state.lock:
+                payloads = state.webhook_payloads[cursor - 1:cursor - 1 + WEBHOOK_PAYLOADS_PAGE_SIZE]
+                might_have_more = cursor - 1 + len(payloads) < len(state.webhook_payloads)
+            return self._send(200, {'payloads': payloads, 'cursor': cursor + len(payloads),
+                                    'mightHaveMore': might_have_more})
+
+        table_id = self._airtable_table(parts[1]) if len(parts) == 2 else None
+        if table_id is None:
+            return self._error(404, 'TABLE_NOT_FOUND')
+        table = state.airtable[table_id]
+
+        if method == 'GET':
+            return self._airtable_list(table, query)
+
+        records = self._json_body().get('records', [])
+        if not records or len(records) > AIRTABLE_BATCH_LIMIT:
+            return self._error(422, 'INVALID_RECORDS',
+                               f"Entre 1 et {AIRTABLE_BATCH_LIMIT} records par requête")
+
+        now = _timestamp(_now())
+        written = []
+        with state.lock:
+            for rec in records:
+                if method == 'POST':
+                    record_id = state._new_airtable_id()
+                    table[record_id] = {'id': record_id, 'createdTime': now, 'modified': now,
+                                        'fields': dict(rec.get('fields', {}))}
+                else:
+                    record_id = rec.get('id')
+                    if record_id not in table:
+                        return self._error(422, 'ROW_DOES_NOT_EXIST', f"Record {record_id} introuvable")
+                    table[record_id]['fields'].update(rec.get('fields', {}))
+                    table[record_id]['modified'] = now
+                if table_id == DEALS_TABLE_ID:
+                    state.record_airtable_change(record_id, created=method == 'POST')
+                written.append({'id': record_id, 'createdTime': table[record_id]['createdTime'],
+                                'fields': table[record_id]['fields']})
+        self._send(200, {'records': written})
+
+    def _airtable_list(self, table: Dict[str, Dict[str, Any]], query: Dict[str, List[str]]) -> None:
+        page_size = min(int(query.get('pageSize', [MAX_PAGE_SIZE])[0]), MAX_PAGE_SIZE)
+        fields = query.get('fields[]')
+        formula = query.get('filterByFormula', [None])[0]
+        since = None
+        record_ids = None
+        if formula:
+            match = _FORMULA_SINCE.fullmatch(formula.strip())
+            ids_match = _FORMULA_RECORD_IDS.fullmatch(formula.strip())
+            if match:
+                since = _parse_timestamp(match.group(1))
+            elif ids_match:
+                record_ids = _FORMULA_RECORD_ID.findall(ids_match.group(1))
+            else:
+                return self._error(422, 'INVALID_FILTER_BY_FORMULA')
+
+        def _ids():
+            if record_ids is not None:
+                return [record_id for record_id in record_ids if record_id in table]
+            if since is None:
+                return list(table)
+            return [record_id for record_id, rec in table.items() if _parse_timestamp(rec['modified']) > since]
+
+        try:
+            ids, offset = self.server.state.page(_ids, query.get('offset', [None])[0], page_size)
+        except (KeyError, ValueError):
+            return self._error(422, 'LIST_RECORDS_ITERATOR_NOT_AVAILABLE')
+
+        records = []
+        for record_id in ids:
+            rec = table.get(record_id)
+            if rec is None:
+                continue
+            record_fields = rec['fields'] if not fields else {k: v for k, v in rec['fields'].items() if k in fields}
+            records.append({'id': rec['id'], 'createdTime': rec['createdTime'], 'fields': record_fields})
+
+        body = {'records': records}
+        if offset:
+            body['offset'] = offset
+        self._send(200, body)
+
+    # --- Notion ---
+
+    def _notion(self, method: str, parts: List[str]) -> None:
+        state = self.server.state
+
+        if parts[:1] == ['databases'] and len(parts) == 2 and method == 'GET':
+            return self._send(200, {'object': 'database', 'id': parts[1],
+                                    'title': [{'plain_text': DEALS_TABLE_NAME}]})
+
+        if parts[:1] == ['databases'] and len(parts) == 3 and parts[2] == 'query' and method == 'POST':
+            body = self._json_body()
+            page_size = min(int(body.get('page_size', MAX_PAGE_SIZE)), MAX_PAGE_SIZE)
+            since = (body.get('filter') or {}).get('last_edited_time', {}).get('on_or_after')
+            since = _parse_timestamp(since) if since else None
+
+            def _ids():
+                if since is None:
+                    return list(state.notion)
+                return [page_id for page_id, page in state.notion.items()
+                        if _parse_timestamp(page['last_edited_time']) >= since]
+
+            try:
+                ids, cursor = state.page(_ids, body.get('start_cursor'), page_size)
+            except (KeyError, ValueError):
+                return self._error(400, 'validation_error', 'start_cursor invalide')
+
+            results = [{'object': 'page', **state.notion[page_id]} for page_id in ids if page_id in state.notion]
+            return self._send(200, {'object': 'list', 'results': results,
+                                    'has_more': cursor is not None, 'next_cursor': cursor})
+
+        if parts[:1] == ['pages'] and len(parts) == 2 and method == 'GET':
+            with state.lock:
+                page = state.notion.get(parts[1])
+                page = dict(page) if page is not None else None
+            if page is None:
+                return self._error(404, 'object_not_found')
+            return self._send(200, {'object': 'page', 'archived': False, 'in_trash': False, **page})
+
+        if parts == ['pages'] and method == 'POST':
+            body = self._json_body()
+            page_id = str(uuid.uuid4())
+            database_id = (body.get('parent') or {}).get('database_id') or NOTION_DATABASE_ID
+            page = {'id': page_id, 'last_edited_time': _timestamp(_now()),
+                    'parent': {'type': 'database_id', 'database_id': database_id},
+                    'properties': _normalize_notion_properties(body.get('properties', {}))}
+            with state.lock:
+                state.notion[page_id] = page
+            return self._send(200, {'object': 'page', **page})
+
+        if parts[:1] == ['pages'] and len(parts) == 2 and method == 'PATCH':
+            body = self._json_body()
+            with state.lock:
+                page = state.notion.get(parts[1])
+                if page is None:
+                    return self._error(404, 'object_not_found')
+                page['properties'].update(_normalize_notion_properties(body.get('properties', {})))
+                page['last_edited_time'] = _timestamp(_now())
+            return self._send(200, {'object': 'page', **page})
+
+        self._error(404, 'object_not_found')
+
+
+class FakeConnectorServer(ThreadingHTTPServer):
+    """Serveur HTTP factice Airtable (/v0) et Notion (/v1), exécutable dans un thread."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 rate_limits: Optional[Dict[str, float]] = None, latency: float = 0.0):
+        super().__init__((host, port), FakeProviderHandler)
+        self.state = FakeProviderState(rate_limits, latency)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeConnectorServer':
+        """Démarre le serveur dans un thread d'arrière-plan."""
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-connector-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur factice Airtable / Notion")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--records', type=int, default=1000, help="Deals générés au démarrage (défaut: 1000)")
+    parser.add_argument('--airtable-rate', type=float, default=5.0,
+                        help="Requêtes/s acceptées avant 429 côté Airtable (0 : illimité)")
+    parser.add_argument('--notion-rate', type=float, default=3.0,
+                        help="Requêtes/s acceptées avant 429 côté Notion (0 : illimité)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Latence ajoutée à chaque réponse (ms)")
+    args = parser.parse_args()
+
+    server = FakeConnectorServer(args.host, args.port,
+                                 rate_limits={'airtable': args.airtable_rate, 'notion': args.notion_rate},
+                                 latency=args.latency / 1000)
+    server.state.reset(args.records)
+    print(f"Serveur factice sur {server.base_url} ({args.records} deals)")
+    print(f"  AIRTABLE_API_BASE={server.base_url}/v0  (table '{DEALS_TABLE_NAME}', base quelconque)")
+    print(f"  NOTION_API_BASE={server.base_url}/v1    (database {NOTION_DATABASE_ID})")
+    print(f"  Webhook Airtable : {AIRTABLE_WEBHOOK_ID}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,31 @@
 
 const API_BASE = '/api';
 
+// Réponses GET mémorisées avec leur ETag : le validateur est renvoyé en If-None-Match
+// et un 304 réutilise le corps déjà reçu (ni sérialisation serveur, ni transfert)
+const ETAG_CACHE_MAX = 50;
+const etagCache = new Map();
+
+async function fetchConditional(url) {
+    const cached = etagCache.get(url);
+    const response = await fetch(url, {
+        headers: cached ? { 'If-None-Match': cached.etag } : {}
+    });
+    if (response.status === 304 && cached) {
+        return cached;
+    }
+    const entry = { result: await response.json(), headers: response.headers };
+    const etag = response.headers.get('ETag');
+    if (etag && entry.result.success) {
+        etagCache.delete(url);
+        etagCache.set(url, { ...entry, etag });
+        if (etagCache.size > ETAG_CACHE_MAX) {
+            etagCache.delete(etagCache.keys().next().value);
+        }
+    }
+    return entry;
+}
+
 function buildQueryString(filters) {
     if (!filters) return '';
     const params = new URLSearchParams();
@@ -26,8 +51,7 @@ function buildQueryString(filters) {
 
 async function fetchDeals(filters) {
     try {
-        const response = await fetch(`${API_BASE}/deals${buildQueryString(filters)}`);
-        const result = await response.json();
+        const { result } = await fetchConditional(`${API_BASE}/deals${buildQueryString(filters)}`);
         if (!result.success) throw new Error(result.error);
         return result.data;
     } catch (error) {
@@ -36,10 +60,31 @@ async function fetchDeals(filters) {
     }
 }
 
+async function fetchDealsPage(filters, options) {
+    try {
+        const params = new URLSearchParams(buildQueryString(filters).slice(1));
+        const opts = options || {};
+        if (opts.limit) params.append('limit', opts.limit);
+        if (opts.cursor) params.append('cursor', opts.cursor);
+        if (opts.sort) params.append('sort', opts.sort);
+        if (opts.order) params.append('order', opts.order);
+        if (opts.fields && opts.fields.length) params.append('fields', opts.fields.join(','));
+        const { result, headers } = await fetchConditional(`${API_BASE}/deals?${params.toString()}`);
+        if (!result.success) throw new Error(result.error);
+        return {
+            deals: result.data,
+            total: parseInt(headers.get('X-Total-Count') || result.data.length, 10),
+            nextCursor: headers.get('X-Next-Cursor')
+        };
+    } catch (error) {
+        console.error('Erreur fetchDealsPage:', error);
+        throw error;
+    }
+}
+
 async function fetchKPIs(filters) {
     try {
-        const response = await fetch(`${API_BASE}/kpis${buildQueryString(filters)}`);
-        const result = await response.json();
+        const { result } = await fetchConditional(`${API_BASE}/kpis${buildQueryString(filters)}`);
         if (!result.success) throw new Error(result.error);
         return result.data;
     } catch (error) {
@@ -50,8 +95,7 @@ async function fetchKPIs(filters) {
 
 async function fetchSectorAnalytics(filters) {
     try {
-        const response = await fetch(`${API_BASE}/analytics/sectors${buildQueryString(filters)}`);
-        const result = await response.json();
+        const { result } = await fetchConditional(`${API_BASE}/analytics/sectors${buildQueryString(filters)}`);
         if (!result.success) throw new Error(result.error);
         return result.data;
     } catch (error) {
@@ -62,8 +106,7 @@ async function fetchSectorAnalytics(filters) {
 
 async function fetchDeadlines(filters) {
     try {
-        const response = await fetch(`${API_BASE}/analytics/deadlines${buildQueryString(filters)}`);
-        const result = await response.json();
+        const { result } = await fetchConditional(`${API_BASE}/analytics/deadlines${buildQueryString(filters)}`);
         if (!result.success) throw new Error(result.error);
         return result.data;
     } catch (error) {
@@ -74,8 +117,7 @@ async function fetchDeadlines(filters) {
 
 async function fetchPerformance(filters) {
     try {
-        const response = await fetch(`${API_BASE}/analytics/performance${buildQueryString(filters)}`);
-        const result = await response.json();
+        const { result } = await fetchConditional(`${API_BASE}/analytics/performance${buildQueryString(filters)}`);
         if (!result.success) throw new Error(result.error);
         return result.data;
     } catch (error) {
@@ -86,8 +128,7 @@ async function fetchPerformance(filters) {
 
 async function fetchVelocity(filters) {
     try {
-        const response = await fetch(`${API_BASE}/analytics/velocity${buildQueryString(filters)}`);
-        const result = await response.json();
+        const { result } = await fetchConditional(`${API_BASE}/analytics/velocity${buildQueryString(filters)}`);
         if (!result.success) throw new Error(result.error);
         return result.data;
     } catch (error) {
@@ -98,8 +139,7 @@ async function fetchVelocity(filters) {
 
 async function fetchColdDeals(filters) {
     try {
-        const response = await fetch(`${API_BASE}/analytics/cold-deals${buildQueryString(filters)}`);
-        const result = await response.json();
+        const { result } = await fetchConditional(`${API_BASE}/analytics/cold-deals${buildQueryString(filters)}`);
         if (!result.success) throw new Error(result.error);
         return result.data;
     } catch (error) {
@@ -108,10 +148,23 @@ async function fetchColdDeals(filters) {
     }
 }
 
+async function fetchDashboard(filters, panels) {
+    try {
+        const params = new URLSearchParams(buildQueryString(filters).slice(1));
+        if (panels && panels.length) params.append('panels', panels.join(','));
+        const qs = params.toString();
+        const { result } = await fetchConditional(`${API_BASE}/dashboard${qs ? '?' + qs : ''}`);
+        if (!result.success) throw new Error(result.error);
+        return result.data;
+    } catch (error) {
+        console.error('Erreur fetchDashboard:', error);
+        throw error;
+    }
+}
+
 async function fetchFilterOptions() {
     try {
-        const response = await fetch(`${API_BASE}/filters/options`);
-        const result = await response.json();
+        const { result } = await fetchConditional(`${API_BASE}/filters/options`);
         if (!result.success) throw new Error(result.error);
         return result.data;
     } catch (error) {
@@ -166,7 +219,7 @@ async function deleteDeal(id) {
     }
 }
 
-async function uploadCSV(file) {
+async function uploadCSV(file, onProgress) {
     try {
         const formData = new FormData();
         formData.append('file', file);
@@ -176,9 +229,71 @@ async function uploadCSV(file) {
         });
         const result = await response.json();
         if (!result.success) throw new Error(result.error);
-        return result.data;
+
+        // L'import s'exécute en arrière-plan : attendre la fin du job
+        const job = await waitForJob(result.data.id, onProgress);
+        if (job.status === 'cancelled') throw new Error('Import annulé');
+        if (job.status === 'error') throw new Error(job.error_message || 'Erreur lors de l\'import');
+        return job.result;
     } catch (error) {
         console.error('Erreur uploadCSV:', error);
         throw error;
     }
 }
+
+// --- Jobs d'import en arrière-plan ---
+
+const JOB_POLL_INTERVAL_MS = 1000;
+// Suivi abandonné si le job ne progresse plus (statut et lignes traitées inchangés) pendant ce délai
+const JOB_STALL_TIMEOUT_MS = 10 * 60 * 1000;
+const JOB_FINAL_STATUSES = ['success', 'partial', 'error', 'cancelled'];
+
+async function fetchJob(id) {
+    try {
+        const response = await fetch(`${API_BASE}/jobs/${id}`);
+        const result = await response.json();
+        if (!result.success) throw new Error(result.error);
+        return result.data;
+    } catch (error) {
+        console.error('Erreur fetchJob:', error);
+        throw error;
+    }
+}
+
+async function cancelJob(id) {
+    try {
+        const response = await fetch(`${API_BASE}/jobs/${id}/cancel`, { method: 'POST' });
+        const result = await response.json();
+        if (!result.success) throw new Error(result.error);
+        return result.data;
+    } catch (error) {
+        console.error('Erreur cancelJob:', error);
+        throw error;
+    }
+}
+
+/**
+ * Interroge un job jusqu'à son état terminal
+ * @param {number} id - ID du job
+ * @param {Function} onProgress - Appelée avec le job à chaque interrogation (optionnel)
+ * @returns {Promise<Object>} Job terminé
+ * @throws {Error} Si le job ne progresse plus pendant JOB_STALL_TIMEOUT_MS
+ */
+async function waitForJob(id, onProgress) {
+    let lastState = null;
+    let lastChange = Date.now();
+    while (true) {
+        const job = await fetchJob(id);
+        if (onProgress) onProgress(job);
+        if (JOB_FINAL_STATUSES.includes(job.status)) return job;
+
+        const state = `${job.status}:${job.rows_processed}`;
+        if (state !== lastState) {
+            lastState = state;
+            lastChange = Date.now();
+        } else if (Date.now() - lastChange > JOB_STALL_TIMEOUT_MS) {
+            throw new Error(`Le job ${id} ne progresse plus depuis ${JOB_STALL_TIMEOUT_MS / 60000} minutes : suivi interrompu`);
+        }
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+}
@@ -9,9 +9,9 @@ function formatEuro(value) {
     return new Intl.NumberFormat('fr-FR', { style: 'currency', currency: 'EUR', maximumFractionDigits: 0 }).format(value);
 }
 
-async function initSectorCharts(filters) {
+async function initSectorCharts(filters, preloaded) {
     try {
-        const data = await fetchSectorAnalytics(filters);
+        const data = preloaded || await fetchSectorAnalytics(filters);
 
         // Graphique Montants Totaux par Secteur
         const ctxMontants = document.getElementById('chart-montants-secteurs');
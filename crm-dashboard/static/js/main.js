@@ -34,9 +34,9 @@ function getStatutBadge(statut) {
     return `<span class="statut-badge px-2 py-0.5 rounded-full text-xs font-medium ${classes}">${statut}</span>`;
 }
 
-async function loadKPIs(filters) {
+async function loadKPIs(filters, preloaded) {
     try {
-        const data = await fetchKPIs(filters);
+        const data = preloaded || await fetchKPIs(filters);
         document.getElementById('kpi-pipeline').textContent = data.pipeline_pondere_formatted;
         document.getElementById('kpi-panier').textContent = data.panier_moyen_formatted;
         document.getElementById('kpi-nb-deals').textContent = data.nombre_deals;
@@ -58,15 +58,26 @@ async function loadKPIs(filters) {
     }
 }
 
-async function loadDealsTable(filters) {
+// Pagination du tableau des deals (curseur renvoyé par l'API)
+const DEALS_PAGE_SIZE = 100;
+let loadedDeals = [];
+let dealsNextCursor = null;
+
+async function loadDealsTable(filters, append) {
     try {
-        const deals = await fetchDeals(filters);
+        const sortParams = typeof getDealsSortParams === 'function' ? getDealsSortParams() : {};
+        const page = await fetchDealsPage(filters, {
+            limit: DEALS_PAGE_SIZE,
+            cursor: append ? dealsNextCursor : null,
+            sort: sortParams.sort,
+            order: sortParams.order
+        });
+        dealsNextCursor = page.nextCursor;
+        loadedDeals = append ? loadedDeals.concat(page.deals) : page.deals;
+        const deals = loadedDeals;
         const tbody = document.getElementById('table-deals');
 
-        // Sauvegarder les deals pour le tri (si la fonction existe dans table-sort.js)
-        if (typeof saveDealsForSorting === 'function') {
-            saveDealsForSorting(deals);
-        }
+        updateDealsPagination(deals.length, page.total);
 
         if (!deals || deals.length === 0) {
             tbody.innerHTML = '<tr><td colspan="7" class="px-4 py-4 text-gray-400 text-center">Aucun deal. Importez un CSV ou créez un deal manuellement.</td></tr>';
@@ -112,9 +123,21 @@ async function loadDealsTable(filters) {
     }
 }
 
-async function loadDeadlines(filters) {
+function updateDealsPagination(nbLoaded, total) {
+    const container = document.getElementById('deals-pagination');
+    if (!container) return;
+    if (total <= DEALS_PAGE_SIZE) {
+        container.classList.add('hidden');
+        return;
+    }
+    document.getElementById('deals-pagination-info').textContent = `${nbLoaded} / ${total} deals affichés`;
+    document.getElementById('btn-load-more-deals').classList.toggle('hidden', !dealsNextCursor);
+    container.classList.remove('hidden');
+}
+
+async function loadDeadlines(filters, preloaded) {
     try {
-        const data = await fetchDeadlines(filters);
+        const data = preloaded || await fetchDeadlines(filters);
 
         // Alerte retards
         const alert = document.getElementById('alert-overdue');
@@ -162,16 +185,27 @@ async function loadDeadlines(filters) {
 
 async function refreshDashboard(filters) {
     currentFilters = filters || null;
+
+    // Un seul appel /api/dashboard pour les analytics (deals filtrés lus une fois côté serveur),
+    // le tableau des deals est paginé séparément via /api/deals
+    let panels = {};
+    try {
+        panels = await fetchDashboard(filters, ['kpis', 'sectors', 'performance', 'deadlines', 'velocity', 'cold_deals']);
+    } catch (error) {
+        // Repli : chaque panel interroge son propre endpoint
+        console.error('Erreur refreshDashboard:', error);
+    }
+
     const tasks = [
-        loadKPIs(filters),
+        loadKPIs(filters, panels.kpis),
         loadDealsTable(filters),
-        initSectorCharts(filters),
-        initPerformanceChart(filters),
-        loadDeadlines(filters)
+        initSectorCharts(filters, panels.sectors),
+        initPerformanceChart(filters, panels.performance),
+        loadDeadlines(filters, panels.deadlines)
     ];
     // Phase 3 V2
-    if (typeof loadVelocity === 'function') tasks.push(loadVelocity(filters));
-    if (typeof loadColdDeals === 'function') tasks.push(loadColdDeals(filters));
+    if (typeof loadVelocity === 'function') tasks.push(loadVelocity(filters, panels.velocity));
+    if (typeof loadColdDeals === 'function') tasks.push(loadColdDeals(filters, panels.cold_deals));
     await Promise.all(tasks);
 }
 
@@ -182,4 +216,9 @@ document.addEventListener('DOMContentLoaded', function() {
     const filters = savedFilters ? JSON.parse(savedFilters) : null;
     currentFilters = filters;
     refreshDashboard(filters);
+
+    const btnLoadMore = document.getElementById('btn-load-more-deals');
+    if (btnLoadMore) {
+        btnLoadMore.addEventListener('click', () => loadDealsTable(currentFilters, true));
+    }
 });
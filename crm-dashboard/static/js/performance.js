@@ -4,9 +4,9 @@
 
 let performanceChart = null;
 
-async function initPerformanceChart(filters) {
+async function initPerformanceChart(filters, preloaded) {
     try {
-        const data = await fetchPerformance(filters);
+        const data = preloaded || await fetchPerformance(filters);
         const canvas = document.getElementById('chart-performance');
         const emptyMsg = document.getElementById('performance-chart-empty');
 
@@ -10,9 +10,9 @@ let kpiData = null;
 /**
  * Vitesse de Vente - Chargement et affichage
  */
-async function loadVelocity(filters) {
+async function loadVelocity(filters, preloaded) {
     try {
-        const data = await fetchVelocity(filters);
+        const data = preloaded || await fetchVelocity(filters);
 
         // KPI vitesse moyenne
         const kpiEl = document.getElementById('kpi-velocity');
@@ -153,9 +153,9 @@ function initWhatIfSimulator(data) {
 /**
  * Deals Froids - Chargement et affichage
  */
-async function loadColdDeals(filters) {
+async function loadColdDeals(filters, preloaded) {
     try {
-        const data = await fetchColdDeals(filters);
+        const data = preloaded || await fetchColdDeals(filters);
 
         // Badge compteur dans le titre
         const badge = document.getElementById('cold-deals-badge');
@@ -10,8 +10,11 @@ document.addEventListener('DOMContentLoaded', function() {
     const spinner = document.getElementById('upload-spinner');
     const successMsg = document.getElementById('upload-success');
     const errorMsg = document.getElementById('upload-error');
+    const progressText = document.getElementById('upload-progress');
+    const btnCancel = document.getElementById('btn-cancel-upload');
 
     let selectedFile = null;
+    let currentJobId = null;
     const MAX_SIZE = 200 * 1024 * 1024; // 200MB
 
     function showFileName(file) {
@@ -80,7 +83,7 @@ document.addEventListener('DOMContentLoaded', function() {
         spinner.classList.remove('hidden');
 
         try {
-            const result = await uploadCSV(selectedFile);
+            const result = await uploadCSV(selectedFile, showProgress);
             successMsg.textContent = `Import réussi : ${result.nb_imported} deal(s) ajouté(s)`;
             if (result.nb_errors > 0) {
                 successMsg.textContent += ` (${result.nb_errors} erreur(s) ignorée(s))`;
@@ -100,6 +103,34 @@ document.addEventListener('DOMContentLoaded', function() {
             btnUpload.disabled = false;
         } finally {
             spinner.classList.add('hidden');
+            progressText.classList.add('hidden');
+            btnCancel.classList.add('hidden');
+            currentJobId = null;
+        }
+    });
+
+    // Progression du job d'import (lignes traitées, rejetées, temps restant)
+    function showProgress(job) {
+        currentJobId = job.id;
+        btnCancel.classList.toggle('hidden', job.status !== 'pending' && job.status !== 'running');
+        let text = `${job.rows_processed} ligne(s) traitée(s)`;
+        if (job.rows_total) text += ` / ${job.rows_total}`;
+        if (job.rows_rejected) text += `, ${job.rows_rejected} rejetée(s)`;
+        if (job.eta_seconds !== null) text += ` — ${Math.ceil(job.eta_seconds)} s restantes`;
+        progressText.textContent = text;
+        progressText.classList.remove('hidden');
+    }
+
+    // Annulation de l'import en cours
+    btnCancel.addEventListener('click', async function() {
+        if (!currentJobId) return;
+        btnCancel.disabled = true;
+        try {
+            await cancelJob(currentJobId);
+        } catch (error) {
+            // Job déjà terminé : le polling affichera son résultat
+        } finally {
+            btnCancel.disabled = false;
         }
     });
 });